@@ -0,0 +1,27 @@
+-- migrate: no-transaction
+-- Índices das chaves estrangeiras e das consultas mais frequentes dos repositórios.
+-- O PostgreSQL não cria índices para FKs automaticamente; sem eles toda listagem
+-- por contrato (relatórios, pendências, arquivos) percorre a tabela inteira.
+
+-- relatorio_repo.get_relatorios_by_contrato_id: WHERE contrato_id = ? ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_relatoriofiscal_contrato ON relatoriofiscal (contrato_id, created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_relatoriofiscal_pendencia ON relatoriofiscal (pendencia_id);
+
+-- pendencia_repo.get_pendencias_by_contrato_id: WHERE contrato_id = ? ORDER BY data_prazo
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pendenciarelatorio_contrato ON pendenciarelatorio (contrato_id, data_prazo);
+
+-- arquivo_repo.find_arquivos_by_contrato_id: WHERE contrato_id = ? ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_arquivo_contrato ON arquivo (contrato_id, created_at DESC);
+
+-- Contratos por responsável/contratado, sempre filtrados por ativo
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_gestor_ativo ON contrato (gestor_id) WHERE ativo;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_fiscal_ativo ON contrato (fiscal_id) WHERE ativo;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_fiscal_substituto_ativo ON contrato (fiscal_substituto_id) WHERE ativo;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_contratado_ativo ON contrato (contratado_id) WHERE ativo;
+
+-- Listagens de usuários e contratados: WHERE ativo ORDER BY nome, id (também atende o cursor)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_usuario_nome_ativo ON usuario (nome, id) WHERE ativo;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contratado_nome_ativo ON contratado (nome, id) WHERE ativo;
+
+-- relatoriofiscal.arquivo_id e usuario.email (login) já têm o índice das
+-- restrições UNIQUE; um índice a mais só encareceria as escritas.
@@ -0,0 +1,22 @@
+-- migrate: no-transaction
+-- Índices que atendem os filtros da listagem de contratos (contrato_repo.FILTERS).
+-- Todos são parciais em "ativo", pois a listagem só considera contratos ativos.
+-- Verifique com: flask check-filter-indexes
+
+-- Necessário para o índice de trigramas usado no filtro "objeto" (ILIKE '%termo%')
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- gestor_id, fiscal_id e contratado_id já foram indexados em 0001
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_modalidade_ativo ON contrato (modalidade_id) WHERE ativo;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_status_ativo ON contrato (status_id) WHERE ativo;
+
+-- Igualdade e prefixo sem diferenciar maiúsculas: lower(coluna) = x / LIKE 'x%'
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_nr_contrato_lower ON contrato (lower(nr_contrato) text_pattern_ops) WHERE ativo;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_pae_lower ON contrato (lower(pae) text_pattern_ops) WHERE ativo;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_objeto_trgm ON contrato USING gin (objeto gin_trgm_ops) WHERE ativo;
+
+-- Filtros por intervalo; (coluna, id) também atende a ordenação e a paginação por cursor
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_data_inicio_ativo ON contrato (data_inicio, id) WHERE ativo;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_data_fim_ativo ON contrato (data_fim, id) WHERE ativo;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_valor_global_ativo ON contrato (valor_global) WHERE ativo;
@@ -0,0 +1,42 @@
+-- migrate: no-transaction
+-- Busca textual em contratos (GET /contratos/busca).
+-- A coluna "busca" guarda o tsvector de nr_contrato, objeto, termos_contratuais
+-- e do nome do contratado, mantido por triggers e indexado com GIN.
+
+ALTER TABLE contrato ADD COLUMN IF NOT EXISTS busca tsvector;
+
+CREATE OR REPLACE FUNCTION contrato_busca_atualizar() RETURNS trigger AS $$
+BEGIN
+  NEW.busca :=
+    setweight(to_tsvector('portuguese', coalesce(NEW.nr_contrato, '')), 'A') ||
+    setweight(to_tsvector('portuguese', coalesce(NEW.objeto, '')), 'B') ||
+    setweight(to_tsvector('portuguese', coalesce(
+      (SELECT nome FROM contratado WHERE id = NEW.contratado_id), '')), 'C') ||
+    setweight(to_tsvector('portuguese', coalesce(NEW.termos_contratuais, '')), 'D');
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_contrato_busca ON contrato;
+CREATE TRIGGER trg_contrato_busca
+  BEFORE INSERT OR UPDATE OF nr_contrato, objeto, termos_contratuais, contratado_id ON contrato
+  FOR EACH ROW EXECUTE FUNCTION contrato_busca_atualizar();
+
+-- Quando o nome do contratado muda, recalcula a busca dos contratos dele
+CREATE OR REPLACE FUNCTION contratado_nome_atualizar_busca() RETURNS trigger AS $$
+BEGIN
+  UPDATE contrato SET contratado_id = contratado_id WHERE contratado_id = NEW.id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_contratado_nome_busca ON contratado;
+CREATE TRIGGER trg_contratado_nome_busca
+  AFTER UPDATE OF nome ON contratado
+  FOR EACH ROW WHEN (OLD.nome IS DISTINCT FROM NEW.nome)
+  EXECUTE FUNCTION contratado_nome_atualizar_busca();
+
+-- Preenche a coluna para os contratos já existentes (dispara o trigger)
+UPDATE contrato SET contratado_id = contratado_id WHERE busca IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_busca ON contrato USING gin (busca) WHERE ativo;
@@ -0,0 +1,12 @@
+-- Tokens JWT revogados (logout), compartilhados entre os workers.
+-- Os registros só precisam existir até a expiração do token; os expirados
+-- são removidos periodicamente pela aplicação.
+CREATE TABLE IF NOT EXISTS token_revogado (
+  jti varchar(64) PRIMARY KEY,
+  usuario_id integer REFERENCES usuario (id),
+  expira_em timestamptz NOT NULL,
+  revogado_em timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_token_revogado_expira_em ON token_revogado (expira_em);
+CREATE INDEX IF NOT EXISTS idx_token_revogado_revogado_em ON token_revogado (revogado_em);
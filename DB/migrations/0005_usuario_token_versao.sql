@@ -0,0 +1,4 @@
+-- Versão dos tokens do usuário: incrementada na desativação, troca de perfil
+-- ou reset de senha pelo administrador. Tokens emitidos com versão anterior
+-- (claim "ver") deixam de ser aceitos.
+ALTER TABLE usuario ADD COLUMN IF NOT EXISTS token_versao integer NOT NULL DEFAULT 0;
@@ -0,0 +1,16 @@
+-- migrate: no-transaction
+-- Listagem de contratos restrita ao usuário (contrato_repo.visibility_clause):
+-- Gestor filtra por gestor_id, Fiscal por fiscal_id OU fiscal_substituto_id.
+-- Para o Gestor, com a ordenação padrão (data_fim, id) no índice, a página
+-- sai do índice já na ordem certa. Para o Fiscal o OR vira um BitmapOr dos
+-- dois índices abaixo seguido de uma ordenação: os índices evitam varrer a
+-- tabela, mas os contratos do usuário são ordenados por inteiro a cada página
+-- (custo proporcional à carteira dele, não ao total de contratos).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_gestor_data_fim ON contrato (gestor_id, data_fim, id) WHERE ativo;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_fiscal_data_fim ON contrato (fiscal_id, data_fim, id) WHERE ativo;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contrato_fiscal_substituto_data_fim ON contrato (fiscal_substituto_id, data_fim, id) WHERE ativo;
+
+-- Os índices de coluna única de 0001 ficam cobertos pelos compostos acima
+DROP INDEX CONCURRENTLY IF EXISTS idx_contrato_gestor_ativo;
+DROP INDEX CONCURRENTLY IF EXISTS idx_contrato_fiscal_ativo;
+DROP INDEX CONCURRENTLY IF EXISTS idx_contrato_fiscal_substituto_ativo;
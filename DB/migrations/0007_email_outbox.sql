@@ -0,0 +1,22 @@
+-- Fila de e-mails (outbox). As rotas gravam o e-mail na mesma transação da
+-- alteração que o originou; o despachante (flask email-dispatcher) envia
+-- em lotes, com novas tentativas e espera exponencial entre elas.
+CREATE TABLE IF NOT EXISTS email_outbox (
+  id bigserial PRIMARY KEY,
+  destinatario varchar NOT NULL,
+  assunto varchar NOT NULL,
+  corpo text NOT NULL,
+  status varchar(10) NOT NULL DEFAULT 'pendente'
+    CHECK (status IN ('pendente', 'enviado', 'falhou')),
+  tentativas integer NOT NULL DEFAULT 0,
+  -- Próximo envio permitido; enquanto um despachante trabalha na mensagem,
+  -- é o fim da sua reserva (lease)
+  proxima_tentativa_em timestamptz NOT NULL DEFAULT now(),
+  ultimo_erro text,
+  criado_em timestamptz NOT NULL DEFAULT now(),
+  enviado_em timestamptz
+);
+
+-- Só as mensagens pendentes são consultadas pelo despachante
+CREATE INDEX IF NOT EXISTS idx_email_outbox_pendente
+  ON email_outbox (proxima_tentativa_em, id) WHERE status = 'pendente';
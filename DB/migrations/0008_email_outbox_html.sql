@@ -0,0 +1,2 @@
+-- Parte HTML dos e-mails da fila (enviada junto com o texto, multipart/alternative)
+ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS corpo_html text;
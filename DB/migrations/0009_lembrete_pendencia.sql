@@ -0,0 +1,27 @@
+-- Agenda de lembretes de prazo das pendências. Cada pendência ganha, ao ser
+-- criada, uma linha por dia de antecedência configurado (por modalidade, em
+-- modalidade.dias_lembrete; NULL usa o padrão da aplicação). A verificação
+-- diária passa a ser uma consulta indexada "lembretes de hoje ainda não
+-- enviados", e enviado_em torna a execução idempotente.
+ALTER TABLE modalidade ADD COLUMN IF NOT EXISTS dias_lembrete integer[];
+
+CREATE TABLE IF NOT EXISTS lembrete_pendencia (
+  id bigserial PRIMARY KEY,
+  pendencia_id integer NOT NULL REFERENCES pendenciarelatorio (id) ON DELETE CASCADE,
+  dias_antes integer NOT NULL CHECK (dias_antes >= 0),
+  data_envio date NOT NULL,
+  enviado_em timestamptz,
+  UNIQUE (pendencia_id, dias_antes)
+);
+
+CREATE INDEX IF NOT EXISTS idx_lembrete_pendencia_a_enviar
+  ON lembrete_pendencia (data_envio) WHERE enviado_em IS NULL;
+
+-- Pendências já abertas recebem a agenda padrão (15, 5, 3 e 0 dias antes)
+INSERT INTO lembrete_pendencia (pendencia_id, dias_antes, data_envio)
+SELECT p.id, d.dias, p.data_prazo - d.dias
+FROM pendenciarelatorio p
+JOIN statuspendencia sp ON sp.id = p.status_pendencia_id
+CROSS JOIN LATERAL unnest(ARRAY[15, 5, 3, 0]) AS d(dias)
+WHERE sp.nome = 'Pendente' AND p.data_prazo - d.dias >= CURRENT_DATE
+ON CONFLICT (pendencia_id, dias_antes) DO NOTHING;
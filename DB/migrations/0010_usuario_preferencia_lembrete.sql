@@ -0,0 +1,5 @@
+-- Como cada usuário recebe os lembretes de prazo do dia: 'resumo' junta todas
+-- as pendências do dia num único e-mail; 'individual' mantém um e-mail por
+-- pendência.
+ALTER TABLE usuario ADD COLUMN IF NOT EXISTS preferencia_lembrete varchar(20) NOT NULL DEFAULT 'resumo'
+  CHECK (preferencia_lembrete IN ('resumo', 'individual'));
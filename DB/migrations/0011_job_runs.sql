@@ -0,0 +1,20 @@
+-- Histórico das tarefas agendadas (flask scheduler). Além de servir de
+-- auditoria, guarda o estado que sobrevive a reinícios: ao assumir, o
+-- agendador consulta a última execução bem-sucedida para decidir se perdeu
+-- o horário e precisa recuperar os dias em atraso.
+CREATE TABLE IF NOT EXISTS job_runs (
+  id bigserial PRIMARY KEY,
+  job varchar(100) NOT NULL,
+  agendada_para timestamptz,
+  recuperacao boolean NOT NULL DEFAULT FALSE,
+  executor varchar(255),
+  status varchar(20) NOT NULL DEFAULT 'executando'
+    CHECK (status IN ('executando', 'sucesso', 'erro')),
+  iniciada_em timestamptz NOT NULL DEFAULT now(),
+  terminada_em timestamptz,
+  linhas_processadas integer NOT NULL DEFAULT 0,
+  emails_enviados integer NOT NULL DEFAULT 0,
+  erro text
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job ON job_runs (job, id DESC);
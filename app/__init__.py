@@ -1,21 +1,27 @@
 # app/__init__.py
 from datetime import timedelta
 import os
+import click
 from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from . import db
+from . import db, token_revocation
 from .routes import (
     usuario_routes, contratado_routes, modalidade_routes, 
     status_routes, perfil_routes, contrato_routes,
     pendencia_routes, status_pendencia_routes, status_relatorio_routes, 
-    relatorio_routes, arquivo_routes, auth_routes
+    relatorio_routes, arquivo_routes, auth_routes, admin_routes,
+    referencia_routes
 )
 
 def create_app(test_config=None):
     app = Flask(__name__, instance_relative_config=True)
     app.config["JWT_SECRET_KEY"] = os.getenv('JWT_SECRET_KEY') 
     jwt = JWTManager(app)
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return token_revocation.is_token_revoked(jwt_payload)
     
     
     CORS(app, resources={r"/*": {"origins": "*"}})
@@ -40,6 +46,8 @@ def create_app(test_config=None):
     app.register_blueprint(relatorio_routes.bp)
     app.register_blueprint(arquivo_routes.bp)
     app.register_blueprint(auth_routes.bp)
+    app.register_blueprint(admin_routes.bp)
+    app.register_blueprint(referencia_routes.bp)
 
     @app.cli.command("seed-db")
     def seed_db_command():
@@ -47,4 +55,74 @@ def create_app(test_config=None):
         from . import seeder
         seeder.seed_data()
         print("Comando 'seed-db' executado.")
+
+    @app.cli.command("check-filter-indexes")
+    def check_filter_indexes_command():
+        """Confere se os índices usados pelos filtros de contratos existem."""
+        from .filters import check_indexes
+        from .repository import contrato_repo
+        missing = check_indexes(db.get_db_connection(), 'contrato', contrato_repo.FILTERS)
+        if not missing:
+            print("Todos os filtros de contrato estão cobertos por índices válidos.")
+            return
+        for param, index in missing:
+            print(f"Filtro '{param}' sem índice: '{index}' não existe ou é inválido.")
+        raise SystemExit(1)
+
+    @app.cli.command("db-migrate")
+    @click.option('--target', type=int, default=None, help='Aplica até esta versão (inclusive).')
+    def db_migrate_command(target):
+        """Aplica as migrações pendentes de DB/migrations."""
+        from . import migrations
+        conn = migrations.connect()
+        try:
+            applied = migrations.migrate(conn, target=target)
+        except migrations.MigrationError as e:
+            print(f"Erro: {e}")
+            raise SystemExit(1)
+        finally:
+            conn.close()
+        if not applied:
+            print("Nenhuma migração pendente.")
+
+    @app.cli.command("db-status")
+    def db_status_command():
+        """Mostra a situação de cada migração."""
+        from . import migrations
+        conn = migrations.connect()
+        try:
+            migrations.ensure_table(conn)
+            states = migrations.status(conn)
+        finally:
+            conn.close()
+        for s in states:
+            detalhe = f" em {s['aplicada_em']:%Y-%m-%d %H:%M} ({s['duracao_ms']} ms)" if s['aplicada_em'] else ''
+            print(f"{s['versao']:04d}_{s['nome']}: {s['estado']}{detalhe}")
+        if any(s['estado'] != 'aplicada' for s in states):
+            raise SystemExit(1)
+
+    @app.cli.command("email-dispatcher")
+    @click.option('--once', is_flag=True, help='Envia o que estiver pronto e termina.')
+    @click.option('--workers', type=int, default=None,
+                  help='Threads de envio (padrão: EMAIL_OUTBOX_WORKERS).')
+    def email_dispatcher_command(once, workers):
+        """Envia os e-mails da fila (email_outbox), com novas tentativas."""
+        from . import email_outbox
+        try:
+            email_outbox.run_dispatcher(once=once, workers=workers or email_outbox.WORKERS)
+        except KeyboardInterrupt:
+            print("Despachante de e-mails encerrado.")
+
+    @app.cli.command("scheduler")
+    @click.option('--once', is_flag=True, help='Roda a verificação de prazos agora e termina.')
+    def scheduler_command(once):
+        """Roda as tarefas agendadas; entre várias réplicas, só uma fica ativa."""
+        from . import scheduler
+        if once:
+            scheduler.check_deadlines()
+            return
+        try:
+            scheduler.run_scheduler(app)
+        except KeyboardInterrupt:
+            print("Agendador encerrado.")
     return app
\ No newline at end of file
@@ -1,7 +1,8 @@
 # app/auth_decorators.py
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt
+from app.repository import contrato_repo
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 
 def admin_required():
     def wrapper(fn):
@@ -27,3 +28,48 @@ def fiscal_required():
         return decorator
     return wrapper
 
+def current_scope():
+    """
+    Identidade e perfil do token atual, no formato usado pelos repositórios
+    para restringir os contratos visíveis (contrato_repo.visibility_clause).
+    """
+    return {'usuario_id': int(get_jwt_identity()), 'perfil': get_jwt().get('perfil')}
+
+# Papéis de um usuário em relação a um contrato e a coluna correspondente
+CONTRATO_PAPEIS = {
+    'gestor': 'gestor_id',
+    'fiscal': 'fiscal_id',
+    'fiscal_substituto': 'fiscal_substituto_id',
+}
+
+def contrato_membership(contrato_id, *papeis):
+    """
+    Verifica se o usuário do token ocupa um dos `papeis` no contrato.
+    Retorna None se pode seguir ou a resposta de erro (404/403).
+    Administrador sempre pode. Usa o cache de contrato_repo.find_membros.
+    """
+    claims = get_jwt()
+    if claims.get("perfil") == "Administrador":
+        return None
+    membros = contrato_repo.find_membros(contrato_id) if contrato_id is not None else None
+    if membros is None:
+        return jsonify({"error": "Contrato não encontrado"}), 404
+    usuario_id = int(get_jwt_identity())
+    if not any(membros[CONTRATO_PAPEIS[papel]] == usuario_id for papel in papeis):
+        return jsonify({"error": "Acesso restrito aos responsáveis pelo contrato"}), 403
+    return None
+
+def contrato_member_required(*papeis, arg='contrato_id'):
+    """
+    Exige que o usuário seja um dos `papeis` do contrato indicado no
+    parâmetro `arg` da rota. Deve ficar abaixo de jwt_required/fiscal_required.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            erro = contrato_membership(kwargs.get(arg), *papeis)
+            if erro is not None:
+                return erro
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
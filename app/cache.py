@@ -0,0 +1,179 @@
+# app/cache.py
+"""
+Cache em memória (por processo) das tabelas de apoio: perfil, status,
+modalidade, statusrelatorio e statuspendencia.
+
+Cada tabela é carregada inteira na primeira consulta e indexada por id e
+por nome. O cache é invalidado pelos repositórios quando a tabela muda
+(depois do commit) e expira após LOOKUP_CACHE_TTL segundos, o que cobre as
+alterações feitas por outros workers.
+
+`TTLCache` é o cache genérico por chave usado para registros individuais
+(ex.: o perfil do usuário em /auth/profile).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import g, has_app_context
+from psycopg2.extras import RealDictCursor
+from app.db import get_db_connection, after_commit
+
+LOOKUP_CACHE_TTL = float(os.getenv('LOOKUP_CACHE_TTL', 300))
+
+
+class TTLCache:
+    """
+    Cache chave -> valor com expiração e limite de tamanho (descarta o menos
+    usado recentemente). Seguro para uso entre threads do mesmo processo.
+    """
+
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if time.monotonic() >= expires_at:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class LookupTable:
+    """
+    Tabela de apoio em cache. Com `active_only`, linhas com ativo = FALSE
+    ficam de fora, como nas consultas originais de status e modalidade.
+    """
+
+    def __init__(self, table, active_only=False, ttl=None):
+        self.table = table
+        self.active_only = active_only
+        self.ttl = LOOKUP_CACHE_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self.loads = 0
+
+    def _load(self):
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(f"SELECT * FROM {self.table} ORDER BY nome")
+        rows = [dict(row) for row in cursor.fetchall()]
+        cursor.close()
+        self.loads += 1
+
+        if self.active_only:
+            rows = [row for row in rows if row.get('ativo', True)]
+        by_id = {row['id']: row for row in rows}
+        by_name = {}
+        for row in rows:
+            by_name.setdefault(row['nome'], row)
+        # Versão derivada do conteúdo: igual em todos os workers enquanto a tabela não muda
+        content = json.dumps(rows, default=str, sort_keys=True, separators=(',', ':'))
+        version = hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+        return rows, by_id, by_name, version
+
+    def _changed_in_this_transaction(self):
+        return has_app_context() and self.table in g.get('lookup_tables_changed', ())
+
+    def _get_snapshot(self):
+        # Alterações ainda não confirmadas não podem ir para o cache compartilhado
+        if self._changed_in_this_transaction():
+            return self._load()
+
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now < self._expires_at:
+            return snapshot
+
+        generation = self._generation
+        snapshot = self._load()
+        with self._lock:
+            # Se alguém invalidou durante a carga, o que lemos pode estar velho
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._expires_at = now + self.ttl
+        return snapshot
+
+    def all(self):
+        rows = self._get_snapshot()[0]
+        return [dict(row) for row in rows]
+
+    def by_id(self, item_id):
+        try:
+            item_id = int(item_id)
+        except (TypeError, ValueError):
+            return None
+        row = self._get_snapshot()[1].get(item_id)
+        return dict(row) if row is not None else None
+
+    def by_name(self, nome):
+        row = self._get_snapshot()[2].get(nome)
+        return dict(row) if row is not None else None
+
+    def version(self):
+        """Hash do conteúdo atual da tabela, usado como ETag."""
+        return self._get_snapshot()[3]
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+
+    def changed(self):
+        """
+        Chamado pelos repositórios ao alterar a tabela, antes do commit.
+        Até a transação terminar as leituras vão direto ao banco; depois do
+        commit o cache é descartado e recarregado na próxima consulta.
+        """
+        self.invalidate()
+        g.setdefault('lookup_tables_changed', set()).add(self.table)
+        after_commit(self.invalidate)
+
+
+perfis = LookupTable('perfil')
+status = LookupTable('status', active_only=True)
+modalidades = LookupTable('modalidade', active_only=True)
+status_relatorio = LookupTable('statusrelatorio')
+status_pendencia = LookupTable('statuspendencia')
+
+
+LOOKUP_TABLES = {
+    'perfis': perfis,
+    'status': status,
+    'modalidades': modalidades,
+    'status_relatorio': status_relatorio,
+    'status_pendencia': status_pendencia,
+}
+
+
+def combined_version():
+    """Versão única do conjunto das tabelas de apoio (ETag de /referencias)."""
+    versions = ':'.join(f"{name}={table.version()}" for name, table in LOOKUP_TABLES.items())
+    return hashlib.sha256(versions.encode('utf-8')).hexdigest()[:32]
@@ -1,20 +1,265 @@
 # app/db.py
 import os
+import threading
+import time
+from collections import deque
 import psycopg2
-from psycopg2 import pool
-from flask import g
-from dotenv import load_dotenv, find_dotenv 
+from psycopg2 import extensions, pool
+from flask import g, has_request_context, request, current_app, jsonify
+from dotenv import load_dotenv, find_dotenv
 
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv(find_dotenv())
 
 
+class PoolTimeout(pool.PoolError):
+    """Nenhuma conexão ficou livre dentro do tempo de espera configurado."""
+
+
+class PoolExhausted(pool.PoolError):
+    """A fila de espera por conexões já está no limite configurado."""
+
+
+class ConnectionPool:
+    """
+    Pool de conexões thread-safe e limitado.
+
+    Quando todas as conexões estão em uso, quem pede uma conexão entra numa
+    fila de espera (limitada por `max_waiting`) e aguarda até `timeout`
+    segundos antes de receber PoolTimeout. As conexões são verificadas na
+    retirada: sockets mortos são descartados e conexões mais velhas que
+    `max_age` são recicladas.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=30.0, max_waiting=100,
+                 max_age=1800.0, ping_after=60.0, **connect_kwargs):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Limites do pool inválidos: min deve estar entre 0 e max, e max deve ser >= 1")
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_waiting = max_waiting
+        self.max_age = max_age
+        self.ping_after = ping_after
+        self._connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = deque()     # (conn, criada_em, devolvida_em)
+        self._in_use = {}        # id(conn) -> (conn, criada_em, retirada_em)
+        self._size = 0           # conexões abertas + conexões sendo abertas
+        self._waiting = 0
+        self._closed = False
+        self.pid = os.getpid()
+
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'rejected': 0,
+            'waits': 0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'max_in_use': 0,
+            'max_waiting': 0,
+        }
+        # Janela das últimas medições (em segundos) para os percentis
+        self._checkout_latencies = deque(maxlen=1024)
+        self._wait_times = deque(maxlen=1024)
+
+        for _ in range(minconn):
+            with self._cond:
+                self._size += 1
+            conn = self._connect()
+            with self._cond:
+                self._idle.append((conn, time.monotonic(), time.monotonic()))
+
+    def _connect(self):
+        try:
+            conn = psycopg2.connect(**self._connect_kwargs)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['connections_created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Fecha uma conexão e libera a vaga dela. Deve ser chamada com o lock."""
+        self._size -= 1
+        self._stats['connections_discarded'] += 1
+        self._cond.notify()
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, created_at, idle_since, now):
+        if conn.closed:
+            return False
+        if self.max_age and now - created_at > self.max_age:
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if self.ping_after is not None and now - idle_since > self.ping_after:
+            # Conexão parada há muito tempo: confirma que o socket ainda responde
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except Exception:
+                return False
+        return True
+
+    def getconn(self, timeout=None):
+        """
+        Retira uma conexão do pool, esperando até `timeout` segundos
+        (padrão: o timeout do pool) se todas estiverem em uso.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise pool.PoolError("O pool de conexões está fechado")
+
+                if not self._idle and self._size >= self.maxconn:
+                    if self._waiting >= self.max_waiting:
+                        self._stats['rejected'] += 1
+                        raise PoolExhausted(
+                            f"Fila de espera por conexões cheia ({self.max_waiting} aguardando)"
+                        )
+                    self._waiting += 1
+                    self._stats['max_waiting'] = max(self._stats['max_waiting'], self._waiting)
+                    waited = True
+                    try:
+                        while not self._idle and self._size >= self.maxconn and not self._closed:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                self._stats['timeouts'] += 1
+                                raise PoolTimeout(
+                                    f"Nenhuma conexão disponível após {timeout:.1f}s "
+                                    f"({self.maxconn} em uso)"
+                                )
+                            self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                    continue
+
+                if self._idle:
+                    conn, created_at, idle_since = self._idle.pop()
+                    new_conn = False
+                else:
+                    self._size += 1
+                    conn, created_at, idle_since = None, None, None
+                    new_conn = True
+
+            # Abertura e health-check acontecem fora do lock
+            if new_conn:
+                conn = self._connect()
+                created_at = idle_since = time.monotonic()
+            else:
+                if not self._is_healthy(conn, created_at, idle_since, time.monotonic()):
+                    with self._cond:
+                        self._discard(conn)
+                    continue
+
+            now = time.monotonic()
+            with self._cond:
+                self._in_use[id(conn)] = (conn, created_at, now)
+                self._stats['checkouts'] += 1
+                self._stats['max_in_use'] = max(self._stats['max_in_use'], len(self._in_use))
+                self._checkout_latencies.append(now - started)
+                if waited:
+                    self._stats['waits'] += 1
+                    self._wait_times.append(now - started)
+            return conn
+
+    def putconn(self, conn, close=False):
+        """Devolve uma conexão ao pool, descartando-a se estiver quebrada."""
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            raise pool.PoolError("Conexão não pertence a este pool")
+
+        _, created_at, _ = entry
+        if not close and not conn.closed:
+            # Garante que nenhuma transação aberta volte para o pool
+            try:
+                status = conn.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                close = True
+
+        with self._cond:
+            if close or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+                self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Métricas do pool para dimensionamento (latências em milissegundos)."""
+        with self._cond:
+            latencies = sorted(self._checkout_latencies)
+            waits = sorted(self._wait_times)
+            data = dict(self._stats)
+            data.update({
+                'min': self.minconn,
+                'max': self.maxconn,
+                'timeout_s': self.timeout,
+                'size': self._size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+            })
+
+        def percentile(values, p):
+            if not values:
+                return 0.0
+            index = min(len(values) - 1, int(round(p * (len(values) - 1))))
+            return round(values[index] * 1000, 3)
+
+        data['checkout_ms'] = {
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': percentile(latencies, 1.0),
+        }
+        data['wait_ms'] = {
+            'p50': percentile(waits, 0.50),
+            'p95': percentile(waits, 0.95),
+            'p99': percentile(waits, 0.99),
+            'max': percentile(waits, 1.0),
+        }
+        return data
+
+
 conn_pool = None
+_pool_lock = threading.Lock()
+# Pools herdados do processo pai após um fork. Mantemos a referência para que
+# o coletor de lixo não feche (e derrube no servidor) os sockets do processo pai.
+_inherited_pools = []
 
-def init_pool():
-    global conn_pool
-    conn_pool = psycopg2.pool.SimpleConnectionPool(
-        1, 20, # min e max de conexões
+def connection_params():
+    """Parâmetros de conexão lidos do .env."""
+    return dict(
         user=os.getenv('DB_USER'),
         password=os.getenv('DB_PASSWORD'),
         host=os.getenv('DB_HOST'),
@@ -22,19 +267,138 @@ def init_pool():
         database=os.getenv('DB_NAME')
     )
 
+def init_pool():
+    global conn_pool
+    conn_pool = ConnectionPool(
+        int(os.getenv('DB_POOL_MIN', 1)),
+        int(os.getenv('DB_POOL_MAX', 20)),
+        timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        max_waiting=int(os.getenv('DB_POOL_MAX_WAITING', 100)),
+        max_age=float(os.getenv('DB_POOL_MAX_AGE', 1800)),
+        ping_after=float(os.getenv('DB_POOL_PING_AFTER', 60)),
+        **connection_params()
+    )
+
+def get_pool():
+    # Depois de um fork (workers do gunicorn) cada processo precisa do seu
+    # próprio pool: sockets herdados do processo pai não podem ser compartilhados.
+    if conn_pool is None or conn_pool.pid != os.getpid():
+        with _pool_lock:
+            if conn_pool is None or conn_pool.pid != os.getpid():
+                if conn_pool is not None:
+                    _inherited_pools.append(conn_pool)
+                init_pool()
+    return conn_pool
+
+def get_pool_stats():
+    """Métricas do pool do processo atual."""
+    stats = get_pool().stats()
+    stats['pid'] = os.getpid()
+    return stats
+
+# Métodos HTTP que não alteram dados rodam como transação somente leitura
+READ_ONLY_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
 def get_db_connection():
     # Pega uma conexão do pool
     if 'db_conn' not in g:
-        g.db_conn = conn_pool.getconn()
+        conn = get_pool().getconn()
+        if has_request_context():
+            # Unidade de trabalho: uma única transação para toda a requisição,
+            # confirmada ou desfeita uma vez só ao final (ver finish_unit_of_work).
+            conn.readonly = request.method in READ_ONLY_METHODS
+            g.db_unit_of_work = True
+        g.db_conn = conn
     return g.db_conn
 
+def in_unit_of_work():
+    return has_request_context() and g.get('db_unit_of_work', False)
+
+def commit(conn):
+    """
+    Confirma a transação. Dentro de uma requisição não faz nada: a
+    unidade de trabalho confirma tudo de uma vez ao final.
+    """
+    if not in_unit_of_work():
+        conn.commit()
+        _run_after_commit()
+
+def rollback(conn):
+    """
+    Desfaz a transação. Dentro de uma requisição também marca a unidade de
+    trabalho para ser desfeita, mesmo que a rota continue executando.
+    """
+    conn.rollback()
+    g.pop('db_after_commit', None)
+    if in_unit_of_work():
+        g.db_rollback_only = True
+
+def after_commit(callback):
+    """
+    Agenda `callback` para rodar depois que a transação atual for confirmada
+    (ex.: apagar um arquivo do disco). É descartado se houver rollback.
+    Sem transação aberta, roda na hora.
+    """
+    if g.get('db_conn') is None:
+        callback()
+        return
+    g.setdefault('db_after_commit', []).append(callback)
+
+def _run_after_commit():
+    for callback in g.pop('db_after_commit', []):
+        try:
+            callback()
+        except Exception as e:
+            current_app.logger.error(f"Erro em callback pós-commit: {e}")
+
+def finish_unit_of_work(response):
+    """
+    Encerra a transação da requisição antes da resposta sair: confirma em
+    caso de sucesso e desfaz em respostas de erro (status >= 400) ou se algum
+    repositório pediu rollback. Uma falha no commit vira resposta 500.
+    """
+    conn = g.get('db_conn')
+    if conn is None or not g.get('db_unit_of_work') or conn.closed:
+        return response
+
+    g.db_unit_of_work = False
+    if response.status_code >= 400 or g.get('db_rollback_only'):
+        conn.rollback()
+        g.pop('db_after_commit', None)
+        return response
+
+    try:
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        g.pop('db_after_commit', None)
+        current_app.logger.error(f"Falha ao confirmar a transação da requisição: {e}")
+        error_response = jsonify({'error': f'Erro ao confirmar a transação: {e}'})
+        error_response.status_code = 500
+        return error_response
+
+    _run_after_commit()
+    return response
+
 def close_db_connection(e=None):
     # Devolve a conexão para o pool
     db_conn = g.pop('db_conn', None)
+    g.pop('db_after_commit', None)
     if db_conn is not None:
-        conn_pool.putconn(db_conn)
+        if not db_conn.closed:
+            try:
+                if g.pop('db_unit_of_work', False):
+                    # A requisição terminou com exceção antes do after_request
+                    db_conn.rollback()
+                db_conn.readonly = None
+            except Exception:
+                get_pool().putconn(db_conn, close=True)
+                return
+        get_pool().putconn(db_conn)
 
 def init_app(app):
-    # Registra a função close_db_connection para ser chamada ao final de cada request
+    # Confirma a unidade de trabalho antes de enviar a resposta e devolve
+    # a conexão ao pool ao final de cada request
+    app.after_request(finish_unit_of_work)
     app.teardown_appcontext(close_db_connection)
-    init_pool()
\ No newline at end of file
+    init_pool()
@@ -0,0 +1,349 @@
+# app/email_outbox.py
+"""
+Fila de e-mails transacional (outbox).
+
+As rotas não falam com o servidor SMTP: `enqueue_email` grava a mensagem na
+tabela email_outbox pela conexão da requisição, então ela só passa a existir
+se a alteração que a originou for confirmada (e some junto num rollback). A
+resposta sai assim que o commit termina.
+
+O despachante (`flask email-dispatcher`) drena a fila em lotes. Cada lote é
+reservado com FOR UPDATE SKIP LOCKED e uma reserva (lease) de
+EMAIL_OUTBOX_LEASE segundos, confirmada antes do envio: vários despachantes
+podem rodar juntos sem pegar a mesma mensagem, e nenhuma transação fica
+aberta esperando o SMTP. Se o processo morrer no meio do envio, a reserva
+expira e a mensagem é tentada de novo (entrega "pelo menos uma vez").
+Cada lote é entregue numa única sessão SMTP reaproveitada (ver
+email_utils.SMTPTransport). Um lote que demora (servidor lento, teto de
+msg/s baixo) renova a reserva das mensagens que faltam a cada terço de
+EMAIL_OUTBOX_LEASE, então a reserva só precisa cobrir o envio de uma
+mensagem, não o do lote inteiro. Falhas são reagendadas com espera exponencial;
+depois de EMAIL_OUTBOX_MAX_ATTEMPTS tentativas a mensagem fica com status
+'falhou'. Com o servidor SMTP suspenso pelo disjuntor, o lote volta para a
+fila sem gastar tentativas.
+
+Um NOTIFY entregue no commit acorda o despachante na hora; sem ele, a fila
+é consultada a cada EMAIL_OUTBOX_POLL_INTERVAL segundos.
+
+Dentro de um despachante, EMAIL_OUTBOX_WORKERS threads drenam a fila ao
+mesmo tempo, cada uma com sua conexão e seus lotes, dividindo o pool de
+sessões SMTP (SMTP_POOL_SIZE deve ser pelo menos o número de threads). Uma
+mensagem lenta segura só a sua thread. O teto de mensagens por segundo
+(SMTP_MAX_PER_SECOND) vale para o processo inteiro.
+"""
+import os
+import random
+import select
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from app import db, email_templates
+from app.email_utils import CircuitOpen, get_transport
+
+BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 8))
+RETRY_BASE = float(os.getenv('EMAIL_OUTBOX_RETRY_BASE', 30))
+RETRY_MAX = float(os.getenv('EMAIL_OUTBOX_RETRY_MAX', 3600))
+LEASE_SECONDS = float(os.getenv('EMAIL_OUTBOX_LEASE', 300))
+POLL_INTERVAL = float(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', 5))
+WORKERS = int(os.getenv('EMAIL_OUTBOX_WORKERS', 4))
+
+NOTIFY_CHANNEL = 'email_outbox'
+
+
+def enqueue_email(to_email, subject, body, html=None):
+    """
+    Coloca um e-mail na fila, na transação atual. Dentro de uma requisição é
+    confirmado pela unidade de trabalho; fora dela, quem chama faz o commit.
+    """
+    conn = db.get_db_connection()
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO email_outbox (destinatario, assunto, corpo, corpo_html) VALUES (%s, %s, %s, %s) RETURNING id",
+            (to_email, subject, body, html)
+        )
+        email_id = cursor.fetchone()[0]
+        # Só é entregue no commit; NOTIFYs iguais na mesma transação viram um só
+        cursor.execute("SELECT pg_notify(%s, '')", (NOTIFY_CHANNEL,))
+    return email_id
+
+
+def enqueue_notification(to_email, modelo, **contexto):
+    """Renderiza o modelo de e-mail (ver app.email_templates) e o coloca na fila."""
+    email = email_templates.render(modelo, **contexto)
+    return enqueue_email(to_email, email.assunto, email.texto, email.html)
+
+
+# --- Despachante ---
+
+def retry_delay(attempts):
+    """Espera, em segundos, depois da tentativa número `attempts` que falhou."""
+    delay = min(RETRY_MAX, RETRY_BASE * 2 ** (attempts - 1))
+    # Espalha as novas tentativas para não voltarem todas juntas
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_batch(conn, limit=BATCH_SIZE):
+    """Reserva até `limit` mensagens prontas para envio e confirma a reserva."""
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("""
+                UPDATE email_outbox o
+                SET tentativas = o.tentativas + 1,
+                    proxima_tentativa_em = now() + make_interval(secs => %s)
+                FROM (
+                    SELECT id FROM email_outbox
+                    WHERE status = 'pendente' AND proxima_tentativa_em <= now()
+                    ORDER BY proxima_tentativa_em, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ) lote
+                WHERE o.id = lote.id
+                RETURNING o.id, o.destinatario, o.assunto, o.corpo, o.corpo_html, o.tentativas
+            """, (LEASE_SECONDS, limit))
+            emails = cursor.fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return sorted(emails, key=lambda e: e['id'])
+
+
+def renew_lease(conn, email_ids):
+    """Estende a reserva de mensagens ainda não enviadas de um lote em andamento."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE email_outbox SET proxima_tentativa_em = now() + make_interval(secs => %s)
+            WHERE id = ANY(%s) AND status = 'pendente'
+        """, (LEASE_SECONDS, list(email_ids)))
+    conn.commit()
+
+
+def mark_sent(conn, email_ids):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE email_outbox SET status = 'enviado', enviado_em = now(), ultimo_erro = NULL
+            WHERE id = ANY(%s)
+        """, (list(email_ids),))
+    conn.commit()
+
+
+def release(conn, email_ids, delay):
+    """Devolve mensagens à fila sem contar a tentativa (servidor SMTP suspenso)."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE email_outbox
+            SET tentativas = tentativas - 1, proxima_tentativa_em = now() + make_interval(secs => %s)
+            WHERE id = ANY(%s)
+        """, (delay, list(email_ids)))
+    conn.commit()
+
+
+def mark_failed(conn, email, error):
+    """Reagenda a mensagem ou, sem tentativas restantes, marca como 'falhou'."""
+    exhausted = email['tentativas'] >= MAX_ATTEMPTS
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE email_outbox
+            SET status = %s, ultimo_erro = %s,
+                proxima_tentativa_em = now() + make_interval(secs => %s)
+            WHERE id = %s
+        """, ('falhou' if exhausted else 'pendente', str(error)[:2000],
+              0 if exhausted else retry_delay(email['tentativas']), email['id']))
+    conn.commit()
+    return exhausted
+
+
+def dispatch_batch(conn, transport=None, limit=BATCH_SIZE, log=print):
+    """
+    Envia um lote da fila numa única sessão SMTP. Retorna (reservadas,
+    enviadas, falhas).
+    """
+    transport = transport or get_transport()
+    emails = claim_batch(conn, limit)
+    if not emails:
+        return 0, 0, 0
+    renewed_at = time.monotonic()
+
+    def renew(i):
+        # Sem renovar, a reserva venceria no meio do lote e outro
+        # despachante pegaria (e entregaria de novo) as mesmas mensagens
+        nonlocal renewed_at
+        if time.monotonic() - renewed_at >= LEASE_SECONDS / 3:
+            renew_lease(conn, [e['id'] for e in emails[i:]])
+            renewed_at = time.monotonic()
+
+    try:
+        results = transport.send_many(
+            [(e['destinatario'], e['assunto'], e['corpo'], e['corpo_html']) for e in emails],
+            before_each=renew
+        )
+    except psycopg2.Error:
+        raise
+    except Exception as e:
+        # Erro inesperado do transporte: sem saber o que saiu, o lote inteiro
+        # conta como falha e é reagendado, em vez de derrubar o despachante
+        log(f"Erro inesperado ao enviar um lote de {len(emails)} e-mail(s): {e!r}")
+        results = [e] * len(emails)
+
+    sent = [e['id'] for e, error in zip(emails, results) if error is None]
+    if sent:
+        mark_sent(conn, sent)
+    suspended = [(e, error) for e, error in zip(emails, results) if isinstance(error, CircuitOpen)]
+    if suspended:
+        release(conn, [e['id'] for e, _ in suspended], max(error.retry_after for _, error in suspended))
+    failed = 0
+    for email, error in zip(emails, results):
+        if error is None or isinstance(error, CircuitOpen):
+            continue
+        failed += 1
+        if mark_failed(conn, email, error):
+            log(f"E-mail {email['id']} para {email['destinatario']} descartado "
+                f"após {email['tentativas']} tentativa(s): {error}")
+    return len(emails) - len(suspended), len(sent), failed
+
+
+def drain(conn, transport=None, limit=BATCH_SIZE, log=print):
+    """Envia lotes até não sobrar mensagem pronta. Retorna (enviadas, falhas)."""
+    total_sent = total_failed = 0
+    while True:
+        claimed, sent, failed = dispatch_batch(conn, transport, limit, log)
+        total_sent += sent
+        total_failed += failed
+        if claimed < limit:
+            return total_sent, total_failed
+
+
+def connect(listen=False):
+    """Conexão dedicada do despachante; com `listen`, recebe os NOTIFY da fila."""
+    conn = psycopg2.connect(**db.connection_params())
+    if listen:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+    return conn
+
+
+def _wait_for_notify(listener, timeout):
+    if select.select([listener], [], [], timeout)[0]:
+        listener.poll()
+        listener.notifies.clear()
+
+
+class Dispatcher:
+    """
+    Drena a fila com `workers` threads. Cada thread mantém a própria conexão
+    (psycopg2 não divide uma conexão entre transações simultâneas) e chama
+    `drain`; o SKIP LOCKED de claim_batch garante que não peguem o mesmo lote.
+    """
+
+    def __init__(self, workers=WORKERS, transport=None, limit=BATCH_SIZE, log=print):
+        self.workers = max(1, workers)
+        self.transport = transport or get_transport()
+        self.limit = limit
+        self.log = log
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='email-dispatcher')
+        self._local = threading.local()
+        self._conns = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.closed:
+            conn = self._local.conn = connect()
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _drain_worker(self):
+        conn = self._connection()
+        try:
+            return drain(conn, self.transport, self.limit, self.log)
+        except psycopg2.Error:
+            # Conexão em estado desconhecido: a próxima rodada abre outra
+            if not conn.closed:
+                conn.close()
+            raise
+        except Exception as e:
+            # Um defeito num lote não pode parar o envio de todos os e-mails:
+            # as mensagens reservadas voltam à fila quando a reserva expirar
+            self.log(f"Erro inesperado no despachante de e-mails: {e!r}")
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                conn.close()
+            return 0, 0
+
+    def drain(self):
+        """
+        Uma rodada: todas as threads drenam até a fila esvaziar. Retorna
+        {'enviados', 'falhas', 'duracao_s'}; um erro de banco em qualquer
+        thread é relançado depois que as outras terminam.
+        """
+        started = time.monotonic()
+        futures = [self._executor.submit(self._drain_worker) for _ in range(self.workers)]
+        sent = failed = 0
+        error = None
+        for future in futures:
+            try:
+                worker_sent, worker_failed = future.result()
+            except psycopg2.Error as e:
+                error = error or e
+                continue
+            sent += worker_sent
+            failed += worker_failed
+        if error is not None:
+            raise error
+        return {'enviados': sent, 'falhas': failed, 'duracao_s': time.monotonic() - started}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._conns:
+                if not conn.closed:
+                    conn.close()
+            self._conns.clear()
+
+
+def run_dispatcher(once=False, transport=None, workers=WORKERS, log=print):
+    """
+    Laço do despachante. Com `once`, drena a fila uma vez e retorna (útil em
+    cron); senão espera novas mensagens até ser interrompido.
+    """
+    dispatcher = Dispatcher(workers, transport, log=log)
+    listener = None
+    try:
+        while True:
+            try:
+                if listener is None and not once:
+                    listener = connect(listen=True)
+                stats = dispatcher.drain()
+                if stats['enviados'] or stats['falhas']:
+                    duration = stats['duracao_s']
+                    log(f"Fila de e-mails: {stats['enviados']} enviado(s), {stats['falhas']} falha(s) "
+                        f"em {duration:.1f}s ({stats['enviados'] / max(duration, 1e-6):.1f} msg/s)")
+                if once:
+                    return stats
+                _wait_for_notify(listener, POLL_INTERVAL)
+            except psycopg2.Error as e:
+                if once:
+                    raise
+                # Banco fora do ar: reconecta depois de uma pausa
+                log(f"Erro de banco no despachante de e-mails: {e}")
+                if listener is not None and not listener.closed:
+                    listener.close()
+                listener = None
+                time.sleep(POLL_INTERVAL)
+            except Exception as e:
+                if once:
+                    raise
+                # Defeito inesperado: registra e segue drenando a fila
+                log(f"Erro inesperado no despachante de e-mails: {e!r}")
+                time.sleep(POLL_INTERVAL)
+    finally:
+        dispatcher.close()
+        dispatcher.transport.close()
+        if listener is not None and not listener.closed:
+            listener.close()
@@ -0,0 +1,102 @@
+# app/email_templates.py
+"""
+Modelos (Jinja2) dos e-mails de notificação, em app/templates/email.
+
+Cada notificação tem um assunto (em ASSUNTOS) e dois arquivos,
+`<nome>.txt` e `<nome>.html`, enviados juntos como multipart/alternative.
+Os modelos são compilados uma vez por processo, na primeira vez em que
+são usados; `render_many` renderiza um lote de destinatários com um
+contexto comum, sem passar pelo carregador de modelos a cada mensagem.
+"""
+import os
+import threading
+from collections import namedtuple
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'templates', 'email')
+
+ASSUNTOS = {
+    'contrato_designacao': "Você foi designado como {{ papel }} de um novo contrato",
+    'pendencia_nova': "Nova pendência de relatório registrada para você",
+    'relatorio_rejeitado': "Relatório Rejeitado - Contrato {{ contrato.nr_contrato }}",
+    'lembrete_prazo': "Lembrete de Prazo: Pendência do Contrato {{ nr_contrato }}",
+    'lembrete_resumo': "Lembrete de Prazo: {{ lembretes|length }} pendências de relatório",
+}
+
+RenderedEmail = namedtuple('RenderedEmail', 'assunto texto html')
+
+
+def _data(value):
+    return value.strftime('%d/%m/%Y') if value else ''
+
+
+def _competencia(value):
+    return value.strftime('%m/%Y') if value else ''
+
+
+class EmailTemplates:
+    def __init__(self, directory=TEMPLATES_DIR):
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            # Só o HTML é escapado; texto e assunto vão como estão
+            autoescape=select_autoescape(['html'], default_for_string=False),
+            # Tags de bloco não deixam linhas vazias nem indentação no texto
+            trim_blocks=True,
+            lstrip_blocks=True,
+            undefined=StrictUndefined,
+            auto_reload=False,
+        )
+        self.env.filters['data'] = _data
+        self.env.filters['competencia'] = _competencia
+        self._lock = threading.Lock()
+        self._compiled = {}
+
+    def _get(self, modelo):
+        compiled = self._compiled.get(modelo)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.get(modelo)
+                if compiled is None:
+                    if modelo not in ASSUNTOS:
+                        raise KeyError(f"Modelo de e-mail desconhecido: {modelo}")
+                    compiled = (
+                        self.env.from_string(ASSUNTOS[modelo]),
+                        self.env.get_template(f"{modelo}.txt"),
+                        self.env.get_template(f"{modelo}.html"),
+                    )
+                    self._compiled[modelo] = compiled
+        return compiled
+
+    def preload(self):
+        """Compila todos os modelos de uma vez (ex.: antes de um lote grande)."""
+        for modelo in ASSUNTOS:
+            self._get(modelo)
+
+    def render(self, modelo, **contexto):
+        assunto, texto, html = self._get(modelo)
+        return RenderedEmail(assunto.render(contexto).strip(), texto.render(contexto), html.render(contexto))
+
+    def render_many(self, modelo, contextos, **comum):
+        """
+        Renderiza a mesma notificação para vários destinatários. `comum` vale
+        para todos; cada item de `contextos` acrescenta (ou sobrescreve) os
+        dados do seu destinatário. Retorna a lista na mesma ordem.
+        """
+        assunto, texto, html = self._get(modelo)
+        emails = []
+        for contexto in contextos:
+            dados = dict(comum)
+            dados.update(contexto)
+            emails.append(RenderedEmail(assunto.render(dados).strip(), texto.render(dados), html.render(dados)))
+        return emails
+
+
+templates = EmailTemplates()
+
+
+def render(modelo, **contexto):
+    return templates.render(modelo, **contexto)
+
+
+def render_many(modelo, contextos, **comum):
+    return templates.render_many(modelo, contextos, **comum)
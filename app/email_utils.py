@@ -1,41 +1,391 @@
 # app/email_utils.py
+"""
+Envio de e-mails por SMTP.
+
+`SMTPTransport` mantém sessões SMTP já autenticadas abertas e as reutiliza:
+o aperto de mão TLS e o login acontecem uma vez por sessão, não por
+mensagem. Uma sessão derrubada pelo servidor é reaberta e o envio repetido
+uma vez. `send_many` entrega um lote inteiro numa única sessão.
+
+Falhas de conexão seguidas abrem um disjuntor (circuit breaker): enquanto
+ele estiver aberto, os envios falham na hora com CircuitOpen em vez de cada
+chamada esperar o timeout do socket. Depois de SMTP_CIRCUIT_RESET segundos
+uma tentativa é liberada para testar o servidor.
+
+Com SMTP_MAX_PER_SECOND, um balde de fichas (token bucket) compartilhado
+pelas threads do processo limita a taxa de envio, para não estourar o
+limite do provedor.
+
+As rotas não chamam este módulo: usam email_outbox.enqueue_email, e quem
+envia é o despachante da fila.
+"""
 import smtplib
 import os
+import threading
+import time
+from collections import deque
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def send_email(to_email, subject, body):
+
+class EmailConfigError(Exception):
+    """As variáveis de ambiente SMTP não foram definidas."""
+
+
+class CircuitOpen(Exception):
+    """O servidor SMTP falhou repetidamente; envios suspensos por um tempo."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Servidor SMTP indisponível; nova tentativa em {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+# Recusas de uma mensagem específica: a sessão continua utilizável
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                  smtplib.SMTPDataError, smtplib.SMTPNotSupportedError)
+# Demais erros (SMTPException é subclasse de OSError): problema com o servidor/conexão
+CONNECTION_ERRORS = (OSError,)
+
+
+class CircuitBreaker:
     """
-    Função para enviar um e-mail usando as configurações do .env.
+    Abre depois de `failure_threshold` falhas seguidas e fica aberto por
+    `reset_timeout` segundos; então deixa passar uma tentativa (meio-aberto),
+    que fecha o disjuntor se der certo ou o reabre se falhar.
     """
-    # Carrega as configurações do ambiente
-    smtp_server = os.getenv('SMTP_SERVER')
-    smtp_port = int(os.getenv('SMTP_PORT', 587))
-    sender_email = os.getenv('SENDER_EMAIL')
-    sender_password = os.getenv('SENDER_PASSWORD')
 
-    if not all([smtp_server, sender_email, sender_password]):
-        print("ERRO DE CONFIGURAÇÃO: As variáveis de ambiente SMTP não foram definidas.")
-        return
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'fechado'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'meio-aberto'
+            return 'aberto'
+
+    def before_call(self):
+        """Levanta CircuitOpen se a chamada não deve nem ser tentada."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial_running:
+                raise CircuitOpen(max(remaining, 0.0))
+            self._trial_running = True
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release(self):
+        """A tentativa liberada terminou sem dizer nada sobre o servidor."""
+        with self._lock:
+            self._trial_running = False
+
+
+class TokenBucket:
+    """
+    Limita a taxa a `rate` fichas por segundo, permitindo rajadas de até
+    `burst`. `acquire` bloqueia até haver uma ficha. Seguro entre threads.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Session:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPTransport:
+    """
+    Pool de até `pool_size` sessões SMTP autenticadas, seguro entre threads.
+    Sessões paradas há mais de `idle_timeout` segundos ou que já enviaram
+    `max_per_session` mensagens são encerradas e reabertas. Com
+    `rate_limiter` (TokenBucket), cada mensagem espera sua ficha.
+    """
 
-    try:
-        # Cria a mensagem
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
+    def __init__(self, host, port, sender, password=None, starttls=True, timeout=30.0,
+                 pool_size=4, idle_timeout=60.0, max_per_session=100,
+                 failure_threshold=5, reset_timeout=30.0, rate_limiter=None):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_per_session = max_per_session
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self.stats = {'sessions_opened': 0, 'reconnects': 0, 'sent': 0, 'failed': 0}
+
+    # --- Sessões ---
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()  # Habilita segurança
+            if self.password:
+                smtp.login(self.sender, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        with self._lock:
+            self.stats['sessions_opened'] += 1
+        return smtp
+
+    def _open(self):
+        return _Session(self._connect())
+
+    @staticmethod
+    def _close(session):
+        try:
+            session.smtp.quit()
+        except Exception:
+            session.smtp.close()
+
+    def _acquire(self):
+        """Sessão reutilizável do pool ou uma nova. Chamada com uma vaga reservada."""
+        while True:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                return self._open()
+            if time.monotonic() - session.last_used > self.idle_timeout:
+                # O servidor provavelmente já encerrou a sessão por inatividade
+                self._close(session)
+                continue
+            return session
+
+    def _release(self, session):
+        session.last_used = time.monotonic()
+        if session.messages >= self.max_per_session:
+            self._close(session)
+            return
+        with self._lock:
+            self._idle.append(session)
+
+    def close(self):
+        """Encerra as sessões ociosas."""
+        with self._lock:
+            sessions = list(self._idle)
+            self._idle.clear()
+        for session in sessions:
+            self._close(session)
+
+    # --- Envio ---
+
+    def _build_message(self, to_email, subject, body, html=None):
+        # Com HTML, o cliente de e-mail escolhe entre as duas versões
+        msg = MIMEMultipart('alternative' if html else 'mixed')
+        msg['From'] = self.sender
         msg['To'] = to_email
         msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-
-        # Conecta ao servidor e envia
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()  # Habilita segurança
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, to_email, text)
-        server.quit()
-        print(f"Email enviado com sucesso para {to_email}")
-    except Exception as e:
-        print(f"Falha ao enviar email para {to_email}: {e}")
\ No newline at end of file
+        msg.attach(MIMEText(body, 'plain', 'utf-8'))
+        if html:
+            msg.attach(MIMEText(html, 'html', 'utf-8'))
+        return msg.as_string()
+
+    def _deliver(self, session, to_email, message):
+        """Envia na sessão dada; se a conexão tiver caído, reabre uma vez e repete."""
+        if session.messages >= self.max_per_session:
+            # Muitos servidores limitam as mensagens por conexão
+            self._close(session)
+            session.smtp = self._connect()
+            session.messages = 0
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        try:
+            session.smtp.sendmail(self.sender, to_email, message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self._close(session)
+            with self._lock:
+                self.stats['reconnects'] += 1
+            session.smtp = self._connect()
+            session.messages = 0
+            # O reenvio também conta para o teto de msg/s
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            session.smtp.sendmail(self.sender, to_email, message)
+        session.messages += 1
+
+    def send_many(self, messages, before_each=None):
+        """
+        Envia uma sequência de (destinatario, assunto, corpo[, html])
+        reutilizando a mesma sessão. Retorna uma lista com None (enviado) ou a exceção de
+        cada mensagem, na mesma ordem; uma mensagem inválida falha sozinha.
+        Se a conexão falhar ou o disjuntor abrir no meio do lote, as
+        mensagens restantes recebem o mesmo erro. `before_each(i)`, se
+        dado, é chamado antes de cada mensagem (ex.: renovar uma reserva).
+        """
+        messages = list(messages)
+        results = [None] * len(messages)
+        if not messages:
+            return results
+
+        try:
+            self.breaker.before_call()
+        except CircuitOpen as e:
+            return [e] * len(messages)
+
+        self._slots.acquire()
+        session = None
+        try:
+            try:
+                session = self._acquire()
+            except CONNECTION_ERRORS as e:
+                self.breaker.failure()
+                return [e] * len(messages)
+
+            for i, (to_email, *content) in enumerate(messages):
+                if before_each is not None:
+                    before_each(i)
+                try:
+                    # Mensagem que nem dá para montar (ex.: quebra de linha no
+                    # assunto, texto com surrogate) falha sozinha, sem tocar na sessão
+                    message = self._build_message(to_email, *content)
+                except Exception as e:
+                    results[i] = e
+                    continue
+                try:
+                    self._deliver(session, to_email, message)
+                except MESSAGE_ERRORS as e:
+                    # Recusa da mensagem (ex.: destinatário inválido); a sessão continua boa
+                    results[i] = e
+                except CONNECTION_ERRORS as e:
+                    # Servidor fora: não adianta tentar o resto do lote agora
+                    self.breaker.failure()
+                    self._close(session)
+                    session = None
+                    results[i:] = [e] * (len(messages) - i)
+                    break
+                except Exception as e:
+                    # Erro do lado do cliente no meio da transação (ex.: endereço
+                    # não ASCII no RCPT): só esta mensagem falha; o RSET limpa a
+                    # transação para as próximas
+                    results[i] = e
+                    try:
+                        session.smtp.rset()
+                    except CONNECTION_ERRORS as e:
+                        self.breaker.failure()
+                        self._close(session)
+                        session = None
+                        results[i + 1:] = [e] * (len(messages) - i - 1)
+                        break
+                    continue
+                self.breaker.success()
+        finally:
+            if session is not None:
+                self._release(session)
+            self.breaker.release()
+            self._slots.release()
+
+        with self._lock:
+            failed = sum(1 for r in results if r is not None)
+            self.stats['sent'] += len(results) - failed
+            self.stats['failed'] += failed
+        return results
+
+    def send(self, to_email, subject, body, html=None):
+        """Envia uma mensagem. Levanta a exceção do envio em caso de falha."""
+        error = self.send_many([(to_email, subject, body, html)])[0]
+        if error is not None:
+            raise error
+
+
+def transport_from_env():
+    """Cria um transporte com as configurações do .env."""
+    smtp_server = os.getenv('SMTP_SERVER')
+    sender_email = os.getenv('SENDER_EMAIL')
+    if not all([smtp_server, sender_email]):
+        raise EmailConfigError("As variáveis de ambiente SMTP não foram definidas.")
+    max_rate = float(os.getenv('SMTP_MAX_PER_SECOND', 0))
+    return SMTPTransport(
+        smtp_server,
+        int(os.getenv('SMTP_PORT', 587)),
+        sender_email,
+        # Sem senha, envia sem login (relay interno ou servidor local de testes)
+        password=os.getenv('SENDER_PASSWORD') or None,
+        starttls=os.getenv('SMTP_STARTTLS', '1').lower() not in ('0', 'false', 'no'),
+        timeout=float(os.getenv('SMTP_TIMEOUT', 30)),
+        pool_size=int(os.getenv('SMTP_POOL_SIZE', 4)),
+        idle_timeout=float(os.getenv('SMTP_IDLE_TIMEOUT', 60)),
+        max_per_session=int(os.getenv('SMTP_MAX_PER_SESSION', 100)),
+        failure_threshold=int(os.getenv('SMTP_CIRCUIT_THRESHOLD', 5)),
+        reset_timeout=float(os.getenv('SMTP_CIRCUIT_RESET', 30)),
+        rate_limiter=TokenBucket(max_rate, float(os.getenv('SMTP_BURST', 0)) or None) if max_rate > 0 else None,
+    )
+
+
+_transport = None
+_transport_pid = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Transporte do processo atual (recriado após um fork: sockets não são compartilhados)."""
+    global _transport, _transport_pid
+    if _transport is None or _transport_pid != os.getpid():
+        with _transport_lock:
+            if _transport is None or _transport_pid != os.getpid():
+                _transport = transport_from_env()
+                _transport_pid = os.getpid()
+    return _transport
+
+
+def send_email(to_email, subject, body, html=None):
+    """
+    Envia um e-mail pelo transporte compartilhado. Levanta exceção se o
+    envio falhar, para que o despachante da fila possa tentar de novo.
+    """
+    get_transport().send(to_email, subject, body, html)
+
+
+def send_many(messages):
+    """Envia um lote de (destinatario, assunto, corpo[, html]); ver SMTPTransport.send_many."""
+    return get_transport().send_many(messages)
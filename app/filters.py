@@ -0,0 +1,196 @@
+# app/filters.py
+"""
+Filtros declarativos para as listagens.
+
+Cada filtro sabe ler o seu parâmetro da query string, validar o valor e
+gerar um predicado SQL que pode ser atendido por um índice. O nome do
+índice fica declarado junto do filtro, para que `check_indexes` confirme
+que todos os índices necessários existem no banco.
+"""
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+
+def _raw_values(args, param):
+    """Valores do parâmetro, aceitando dict simples ou MultiDict (?x=1&x=2)."""
+    if hasattr(args, 'getlist'):
+        values = args.getlist(param)
+    else:
+        value = args.get(param)
+        values = [] if value is None else (value if isinstance(value, (list, tuple)) else [value])
+    return [v for v in values if v is not None and str(v).strip() != '']
+
+
+def _convert(value, kind, param):
+    try:
+        if kind is int:
+            return int(value)
+        if kind is date:
+            return value if isinstance(value, date) else date.fromisoformat(str(value))
+        if kind is Decimal:
+            number = Decimal(str(value))
+            # NaN/sNaN/Infinity: não comparam entre si e não fazem sentido num filtro
+            if not number.is_finite():
+                raise ValueError(value)
+            return number
+        return str(value)
+    except (ValueError, TypeError, InvalidOperation):
+        raise ValueError(f'Valor inválido para o filtro "{param}": {value}')
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class Filter:
+    """Base: subclasses implementam `build(args)` -> (sql, params) ou None."""
+
+    def __init__(self, param, column, index, kind=str):
+        self.param = param
+        self.column = column
+        self.index = index
+        self.kind = kind
+
+    def params(self):
+        return (self.param,)
+
+    def _single(self, args):
+        values = _raw_values(args, self.param)
+        if not values:
+            return None
+        if len(values) > 1:
+            raise ValueError(f'O filtro "{self.param}" aceita apenas um valor')
+        return _convert(values[0], self.kind, self.param)
+
+    def build(self, args):
+        raise NotImplementedError
+
+
+class Equals(Filter):
+    """coluna = valor"""
+
+    def build(self, args):
+        value = self._single(args)
+        if value is None:
+            return None
+        return f"{self.column} = %s", [value]
+
+
+class InList(Filter):
+    """coluna = ANY(valores); aceita ?x=1&x=2 e ?x=1,2."""
+
+    def build(self, args):
+        values = []
+        for raw in _raw_values(args, self.param):
+            parts = raw.split(',') if isinstance(raw, str) else [raw]
+            values.extend(_convert(p.strip() if isinstance(p, str) else p, self.kind, self.param)
+                          for p in parts if str(p).strip())
+        if not values:
+            return None
+        if len(values) == 1:
+            return f"{self.column} = %s", values
+        return f"{self.column} = ANY(%s)", [values]
+
+
+class CaseInsensitiveMatch(Filter):
+    """
+    Igualdade exata (parâmetro `<param>_exato`) ou prefixo (`<param>`) sem
+    diferenciar maiúsculas, sobre lower(coluna). Um índice
+    `lower(coluna) text_pattern_ops` atende os dois casos.
+    """
+
+    def params(self):
+        return (self.param, f'{self.param}_exato')
+
+    def build(self, args):
+        exact = _raw_values(args, f'{self.param}_exato')
+        if exact:
+            return f"lower({self.column}) = lower(%s)", [str(exact[0])]
+        value = self._single(args)
+        if value is None:
+            return None
+        return f"lower({self.column}) LIKE %s", [_escape_like(value.lower()) + '%']
+
+
+class Contains(Filter):
+    """coluna ILIKE '%valor%', atendido por um índice GIN de trigramas."""
+
+    def build(self, args):
+        value = self._single(args)
+        if value is None:
+            return None
+        return f"{self.column} ILIKE %s", [f"%{_escape_like(value)}%"]
+
+
+class Range(Filter):
+    """Intervalo fechado com os parâmetros `<param>_min`/`<param>_max` (ou sufixos informados)."""
+
+    def __init__(self, param, column, index, kind, suffixes=('_min', '_max')):
+        super().__init__(param, column, index, kind)
+        self.low_param = param + suffixes[0]
+        self.high_param = param + suffixes[1]
+
+    def params(self):
+        return (self.low_param, self.high_param)
+
+    def build(self, args):
+        clauses, params = [], []
+        for param, operator in ((self.low_param, '>='), (self.high_param, '<=')):
+            values = _raw_values(args, param)
+            if values:
+                clauses.append(f"{self.column} {operator} %s")
+                params.append(_convert(values[0], self.kind, param))
+        if len(params) == 2 and params[0] > params[1]:
+            raise ValueError(f'Intervalo inválido: "{self.low_param}" maior que "{self.high_param}"')
+        if not clauses:
+            return None
+        return " AND ".join(clauses), params
+
+
+class Year(Filter):
+    """Ano de uma coluna de data, reescrito como intervalo [1º/jan, 1º/jan do ano seguinte)."""
+
+    def __init__(self, param, column, index):
+        super().__init__(param, column, index, int)
+
+    def build(self, args):
+        year = self._single(args)
+        if year is None:
+            return None
+        if not 1 <= year <= 9998:
+            raise ValueError(f'Valor inválido para o filtro "{self.param}": {year}')
+        return f"{self.column} >= %s AND {self.column} < %s", [date(year, 1, 1), date(year + 1, 1, 1)]
+
+
+def apply_filters(filters, args):
+    """
+    Aplica os filtros declarados aos argumentos recebidos. Retorna
+    (clausulas, params). Levanta ValueError com mensagem para o cliente.
+    """
+    clauses, params = [], []
+    if not args:
+        return clauses, params
+    for filter_ in filters:
+        built = filter_.build(args)
+        if built:
+            sql, values = built
+            clauses.append(sql)
+            params.extend(values)
+    return clauses, params
+
+
+def check_indexes(conn, table, filters):
+    """
+    Confere se os índices declarados pelos filtros existem e são válidos.
+    Retorna a lista de (parametro, indice) que estão faltando.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT i.relname
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_class t ON t.oid = x.indrelid
+            WHERE t.relname = %s AND x.indisvalid
+        """, (table,))
+        existing = {row[0] for row in cursor.fetchall()}
+    return [(f.param, f.index) for f in filters if f.index not in existing]
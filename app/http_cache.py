@@ -0,0 +1,23 @@
+# app/http_cache.py
+import os
+from flask import current_app, request, jsonify
+
+# Por quanto tempo o navegador pode reutilizar os dados de referência sem revalidar
+REFERENCE_MAX_AGE = int(os.getenv('REFERENCE_CACHE_MAX_AGE', 60))
+
+
+def conditional_json(etag, build_payload, max_age=REFERENCE_MAX_AGE):
+    """
+    Resposta JSON com ETag forte e Cache-Control. Se o cliente enviar
+    If-None-Match com a versão atual, responde 304 sem montar o corpo.
+    `build_payload` só é chamado quando o corpo é de fato necessário.
+    """
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build_payload())
+    response.set_etag(etag)
+    # 'private': as rotas exigem JWT, então só o cache do próprio navegador pode guardar
+    response.headers['Cache-Control'] = f'private, max-age={max_age}'
+    response.headers['Vary'] = 'Authorization'
+    return response
@@ -0,0 +1,269 @@
+# app/migrations.py
+"""
+Migrações versionadas do esquema.
+
+Cada migração é um arquivo `DB/migrations/NNNN_descricao.sql`, aplicado em
+ordem de versão e registrado na tabela `schema_migrations` com o checksum
+(sha256) do arquivo e o tempo de execução. Uma migração já aplicada cujo
+arquivo foi alterado depois é reportada e interrompe o processo.
+
+Por padrão a migração roda numa única transação. Arquivos que começam com
+`-- migrate: no-transaction` rodam em autocommit, um comando por vez — é o
+modo necessário para `CREATE INDEX CONCURRENTLY`, que não bloqueia escritas
+na tabela mas não pode rodar dentro de uma transação.
+"""
+import hashlib
+import os
+import re
+import time
+import psycopg2
+from . import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', 'DB', 'migrations')
+
+NO_TRANSACTION_HEADER = '-- migrate: no-transaction'
+
+# Chave do advisory lock que impede dois processos migrando ao mesmo tempo
+MIGRATION_LOCK_KEY = 7_311_902_001
+
+_FILENAME_RE = re.compile(r'^(\d{4})_([\w-]+)\.sql$')
+_CONCURRENT_INDEX_RE = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?("?[\w.]+"?)',
+    re.IGNORECASE
+)
+
+
+class MigrationError(Exception):
+    """Erro ao carregar, verificar ou aplicar uma migração."""
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        content = f.read()
+    return content.decode('utf-8'), hashlib.sha256(content).hexdigest()
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Lista as migrações do diretório, ordenadas por versão."""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME_RE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(
+                f"Versão {version} duplicada: {migrations[version]['arquivo']} e {filename}"
+            )
+        sql, checksum = _read(os.path.join(directory, filename))
+        migrations[version] = {
+            'versao': version,
+            'nome': match.group(2),
+            'arquivo': filename,
+            'sql': sql,
+            'checksum': checksum,
+            'transacional': not sql.lstrip().startswith(NO_TRANSACTION_HEADER),
+        }
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def split_statements(sql):
+    """
+    Separa um script em comandos pelo ';', ignorando os que aparecem dentro
+    de strings, identificadores entre aspas, comentários e corpos $tag$...$tag$.
+    """
+    statements, current = [], []
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch == '-' and sql.startswith('--', i):
+            end = sql.find('\n', i)
+            end = n if end == -1 else end
+            current.append(sql[i:end])
+            i = end
+            continue
+        if ch == '/' and sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            current.append(sql[i:end])
+            i = end
+            continue
+        if ch in ("'", '"'):
+            end = i + 1
+            while end < n:
+                if sql[end] == ch:
+                    if end + 1 < n and sql[end + 1] == ch:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+            continue
+        if ch == '$':
+            tag = re.match(r'\$[A-Za-z_]*\$', sql[i:])
+            if tag:
+                end = sql.find(tag.group(0), i + len(tag.group(0)))
+                end = n if end == -1 else end + len(tag.group(0))
+                current.append(sql[i:end])
+                i = end
+                continue
+        if ch == ';':
+            statements.append(''.join(current))
+            current = []
+            i += 1
+            continue
+        current.append(ch)
+        i += 1
+    statements.append(''.join(current))
+    return [s.strip() for s in statements if _has_code(s)]
+
+
+def _has_code(statement):
+    without_comments = re.sub(r'--[^\n]*', '', statement)
+    return without_comments.strip() != ''
+
+
+def connect():
+    """Conexão dedicada (fora do pool), pois alterna o modo autocommit."""
+    return psycopg2.connect(**db.connection_params())
+
+
+def ensure_table(conn):
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                versao integer PRIMARY KEY,
+                nome varchar NOT NULL,
+                checksum char(64) NOT NULL,
+                aplicada_em timestamp NOT NULL DEFAULT now(),
+                duracao_ms integer NOT NULL
+            )
+        """)
+
+
+def applied(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT versao, nome, checksum, aplicada_em, duracao_ms FROM schema_migrations ORDER BY versao")
+        return {
+            row[0]: {'versao': row[0], 'nome': row[1], 'checksum': row[2],
+                     'aplicada_em': row[3], 'duracao_ms': row[4]}
+            for row in cursor.fetchall()
+        }
+
+
+def status(conn, migrations=None):
+    """
+    Situação de cada migração: 'aplicada', 'pendente', 'alterada' (o arquivo
+    mudou depois de aplicado) ou 'ausente' (registrada, mas sem arquivo).
+    """
+    migrations = discover() if migrations is None else migrations
+    done = applied(conn)
+    result = []
+    for m in migrations:
+        record = done.get(m['versao'])
+        if record is None:
+            state = 'pendente'
+        elif record['checksum'] != m['checksum']:
+            state = 'alterada'
+        else:
+            state = 'aplicada'
+        result.append({'versao': m['versao'], 'nome': m['nome'], 'estado': state,
+                       'aplicada_em': record and record['aplicada_em'],
+                       'duracao_ms': record and record['duracao_ms']})
+    known = {m['versao'] for m in migrations}
+    for version, record in done.items():
+        if version not in known:
+            result.append({'versao': version, 'nome': record['nome'], 'estado': 'ausente',
+                           'aplicada_em': record['aplicada_em'], 'duracao_ms': record['duracao_ms']})
+    return sorted(result, key=lambda r: r['versao'])
+
+
+def _drop_invalid_index(cursor, statement):
+    """
+    Um CREATE INDEX CONCURRENTLY interrompido deixa um índice inválido com o
+    nome final, e o IF NOT EXISTS passaria a ignorá-lo. Remove-o antes de recriar.
+    """
+    match = _CONCURRENT_INDEX_RE.search(statement)
+    if not match:
+        return
+    name = match.group(1).strip('"')
+    cursor.execute("""
+        SELECT 1 FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE i.relname = %s AND NOT x.indisvalid
+    """, (name,))
+    if cursor.fetchone():
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def _record(cursor, migration, duration_ms):
+    cursor.execute(
+        "INSERT INTO schema_migrations (versao, nome, checksum, duracao_ms) VALUES (%s, %s, %s, %s)",
+        (migration['versao'], migration['nome'], migration['checksum'], duration_ms)
+    )
+
+
+def apply_migration(conn, migration):
+    """Aplica uma migração e a registra. Retorna a duração em milissegundos."""
+    started = time.monotonic()
+    if migration['transacional']:
+        conn.autocommit = False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(migration['sql'])
+                duration_ms = int((time.monotonic() - started) * 1000)
+                _record(cursor, migration, duration_ms)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
+        return duration_ms
+
+    # Sem transação: cada comando é confirmado ao terminar. Os scripts desse
+    # modo devem ser idempotentes (IF NOT EXISTS) para poderem ser repetidos.
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        for statement in split_statements(migration['sql']):
+            _drop_invalid_index(cursor, statement)
+            cursor.execute(statement)
+        duration_ms = int((time.monotonic() - started) * 1000)
+        _record(cursor, migration, duration_ms)
+    return duration_ms
+
+
+def migrate(conn, target=None, log=print):
+    """
+    Aplica as migrações pendentes até `target` (inclusive). Recusa-se a
+    continuar se alguma migração aplicada tiver sido alterada.
+    Retorna a lista de (versao, nome, duracao_ms) aplicadas.
+    """
+    ensure_table(conn)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+    try:
+        migrations = discover()
+        states = status(conn, migrations)
+        changed = [s for s in states if s['estado'] == 'alterada']
+        if changed:
+            names = ', '.join(f"{s['versao']:04d}_{s['nome']}" for s in changed)
+            raise MigrationError(f"Migrações aplicadas foram alteradas depois de aplicadas: {names}")
+
+        pending = {s['versao'] for s in states if s['estado'] == 'pendente'}
+        done = []
+        for m in migrations:
+            if m['versao'] not in pending or (target is not None and m['versao'] > target):
+                continue
+            log(f"Aplicando {m['arquivo']}...")
+            try:
+                duration_ms = apply_migration(conn, m)
+            except psycopg2.Error as e:
+                raise MigrationError(f"Falha ao aplicar {m['arquivo']}: {e}") from e
+            log(f"  {m['arquivo']} aplicada em {duration_ms} ms")
+            done.append((m['versao'], m['nome'], duration_ms))
+        return done
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
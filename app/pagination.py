@@ -0,0 +1,189 @@
+# app/pagination.py
+import base64
+import binascii
+import json
+import math
+import os
+import threading
+import time
+
+
+def encode_cursor(sort_spec, values):
+    """
+    Gera um cursor opaco a partir dos valores da chave de ordenação da
+    última linha da página (ex.: [data_fim, id]).
+    """
+    payload = json.dumps({'s': sort_spec, 'k': values}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort_spec, key_types=(str, int)):
+    """
+    Lê um cursor gerado por encode_cursor. `key_types` dá o tipo de cada
+    valor da chave da listagem (padrão: [coluna ordenada, id]). Levanta
+    ValueError se o cursor for inválido ou tiver sido gerado para outra
+    ordenação.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = payload['k']
+        spec = payload['s']
+    except (ValueError, KeyError, TypeError, binascii.Error, UnicodeError):
+        raise ValueError('Cursor de paginação inválido.')
+
+    if spec != sort_spec:
+        raise ValueError('O cursor não corresponde à ordenação solicitada.')
+    if (not isinstance(values, list) or len(values) != len(key_types)
+            or not all(isinstance(v, t) for v, t in zip(values, key_types))):
+        raise ValueError('Cursor de paginação inválido.')
+    return values
+
+
+def parse_page_args(args):
+    """
+    Lê page, per_page, after e count da query string. Levanta ValueError
+    com a mensagem de erro para o cliente.
+    """
+    try:
+        page = int(args.get('page', 1))
+        per_page = int(args.get('per_page', 10))
+    except (ValueError, TypeError):
+        raise ValueError('Parâmetros de paginação inválidos. Devem ser números inteiros.')
+
+    return max(1, page), max(1, per_page), args.get('after') or None, parse_count_mode(args)
+
+
+def build_pagination(page_info, rows, page, per_page, after=None, sort_spec=None, key_fn=None):
+    """
+    Monta o bloco 'pagination' das listagens. `next_cursor` permite seguir
+    para a próxima página com ?after=, tanto no modo por página quanto no
+    modo por cursor; listagens sem `key_fn` não oferecem cursor.
+    """
+    total_items = page_info['total_items']
+    total_pages = None
+    if total_items is not None:
+        total_pages = math.ceil(total_items / per_page) if total_items > 0 else 1
+    next_cursor = None
+    if key_fn is not None and page_info['has_more'] and rows:
+        next_cursor = encode_cursor(sort_spec, key_fn(rows[-1]))
+
+    pagination = {
+        'total_items': total_items,
+        'total_pages': total_pages,
+        'count': page_info['count'],
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+    }
+    if after is None:
+        pagination['current_page'] = page
+    return pagination
+
+
+# --- Contagem de itens ---
+
+# 'auto': conta junto com a página (COUNT(*) OVER ()) quando há filtros;
+# sem filtros usa uma contagem em cache ou a estimativa do planejador.
+COUNT_MODES = ('auto', 'exact', 'estimate', 'none')
+
+COUNT_CACHE_TTL = float(os.getenv('PAGINATION_COUNT_CACHE_TTL', 60))
+# Acima deste número de linhas estimadas não vale a pena contar de verdade
+EXACT_COUNT_LIMIT = int(os.getenv('PAGINATION_EXACT_COUNT_LIMIT', 50000))
+
+_count_cache = {}
+_count_cache_lock = threading.Lock()
+_COUNT_CACHE_MAX_ENTRIES = 512
+
+
+def parse_count_mode(args):
+    count = args.get('count', 'auto').lower()
+    if count not in COUNT_MODES:
+        raise ValueError(f"Parâmetro count inválido. Use um de: {', '.join(COUNT_MODES)}.")
+    return count
+
+
+def _exact_count(cursor, base_query, params):
+    cursor.execute(f"SELECT COUNT(*) AS total {base_query}", tuple(params))
+    row = cursor.fetchone()
+    return row['total'] if isinstance(row, dict) else row[0]
+
+
+def _planner_estimate(cursor, base_query, params):
+    cursor.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 {base_query}", tuple(params))
+    row = cursor.fetchone()
+    plan = row['QUERY PLAN'] if isinstance(row, dict) else row[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _cached_count(cursor, base_query, params, cache_key):
+    """
+    Contagem para listagens sem filtros seletivos. Devolve (total, tipo):
+    uma contagem exata recém-feita, o valor em cache ou, para tabelas
+    grandes, a estimativa do planejador.
+    """
+    key = (cache_key, base_query, repr(params))
+    now = time.monotonic()
+    with _count_cache_lock:
+        cached = _count_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0], 'estimated'
+
+    estimate = _planner_estimate(cursor, base_query, params)
+    if estimate > EXACT_COUNT_LIMIT:
+        return estimate, 'estimated'
+
+    total = _exact_count(cursor, base_query, params)
+    with _count_cache_lock:
+        if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.clear()
+        _count_cache[key] = (total, now + COUNT_CACHE_TTL)
+    return total, 'exact'
+
+
+def fetch_page(cursor, select_sql, base_query, params, order_sql, limit, offset=0,
+               seek_sql='', seek_params=(), count='auto', filtered=False, cache_key=None):
+    """
+    Executa a consulta de uma página e calcula o total conforme `count`,
+    sem repetir a consulta inteira só para contar quando dá para evitar.
+
+    Retorna (linhas, page_info) com page_info = {'total_items', 'count',
+    'has_more'}; 'count' vale 'exact', 'estimated' ou 'none'.
+    """
+    # Com cursor (seek) a contagem em janela veria só as linhas depois do cursor
+    window = not seek_sql and (count == 'exact' or (count == 'auto' and filtered))
+    window_sql = ", COUNT(*) OVER () AS _total" if window else ""
+
+    # Busca uma linha a mais para saber se existe próxima página
+    cursor.execute(
+        f"{select_sql}{window_sql} {base_query} {seek_sql} {order_sql} LIMIT %s OFFSET %s",
+        tuple(params) + tuple(seek_params) + (limit + 1, offset)
+    )
+    rows = cursor.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if window:
+        if rows:
+            total = rows[0]['_total']
+            for row in rows:
+                row.pop('_total', None)
+        elif offset == 0:
+            total = 0
+        else:
+            # Página além do fim: a janela não trouxe linhas para informar o total
+            total = _exact_count(cursor, base_query, params)
+        return rows, {'total_items': total, 'count': 'exact', 'has_more': has_more}
+
+    if count == 'none':
+        return rows, {'total_items': None, 'count': 'none', 'has_more': has_more}
+    if count == 'exact':
+        total = _exact_count(cursor, base_query, params)
+        return rows, {'total_items': total, 'count': 'exact', 'has_more': has_more}
+    if count == 'estimate':
+        total = _planner_estimate(cursor, base_query, params)
+        return rows, {'total_items': total, 'count': 'estimated', 'has_more': has_more}
+
+    total, kind = _cached_count(cursor, base_query, params, cache_key)
+    return rows, {'total_items': total, 'count': kind, 'has_more': has_more}
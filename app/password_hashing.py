@@ -0,0 +1,118 @@
+# app/password_hashing.py
+"""
+Hash de senhas fora das threads da aplicação.
+
+O cálculo do hash (scrypt/pbkdf2) é caro de propósito e segura o GIL; por
+isso roda num pool de processos limitado (PASSWORD_HASH_WORKERS). O método
+e o custo vêm de PASSWORD_HASH_METHOD, no formato do Werkzeug (ex.:
+"scrypt:32768:8:1" ou "pbkdf2:sha256:600000"). Hashes gerados com outro
+método/custo são refeitos no login (ver verify_and_update).
+
+PASSWORD_HASH_TIMEOUT limita a espera da requisição, não o cálculo: um hash
+que ainda está na fila é cancelado, mas um que já começou vai até o fim no
+processo do pool (não há como interrompê-lo). Por isso a vaga dele em
+PASSWORD_HASH_MAX_PENDING só é liberada quando ele termina de fato, e o
+trabalho acumulado continua limitado mesmo com timeouts seguidos.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+# 0 = calcula na própria thread (útil em desenvolvimento e nos comandos do flask)
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+# Quantos hashes podem estar em andamento/na fila por processo da aplicação
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', PASSWORD_HASH_WORKERS * 8))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+
+class HashingBusy(Exception):
+    """Fila de hashes cheia ou tempo esgotado; o cliente deve tentar de novo."""
+
+
+# --- Funções executadas nos processos do pool ---
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify_and_update(stored_hash, password, method):
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if _method_of(stored_hash) != _normalized_method(method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+def _method_of(stored_hash):
+    return stored_hash.split('$', 1)[0]
+
+
+_normalized = {}
+
+def _normalized_method(method):
+    """Método com os parâmetros explícitos, como o Werkzeug grava no hash ("scrypt" -> "scrypt:32768:8:1")."""
+    if method not in _normalized:
+        _normalized[method] = _method_of(generate_password_hash('', method=method))
+    return _normalized[method]
+
+
+# --- Pool de processos ---
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(max(1, PASSWORD_HASH_MAX_PENDING))
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                # 'spawn': os processos filhos não herdam threads nem conexões do worker
+                _executor = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _run(fn, *args):
+    if PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _pending.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+        raise HashingBusy('Muitas operações de senha em andamento')
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        _pending.release()
+        raise
+    # Libera a vaga quando o hash termina ou é cancelado, não quando a espera esgota
+    future.add_done_callback(lambda _: _pending.release())
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        # Só cancela se ainda não começou; em andamento, vai até o fim
+        future.cancel()
+        raise HashingBusy('Tempo esgotado calculando o hash da senha')
+
+
+def hash_password(password):
+    """Gera o hash da senha com o método configurado."""
+    return _run(_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(stored_hash, password):
+    return _run(check_password_hash, stored_hash, password)
+
+
+def verify_and_update(stored_hash, password):
+    """
+    Confere a senha e, se o hash guardado usa outro método/custo, já devolve
+    o hash novo — tudo numa única ida ao pool. Retorna (ok, novo_hash ou None).
+    """
+    return _run(_verify_and_update, stored_hash, password, PASSWORD_HASH_METHOD)
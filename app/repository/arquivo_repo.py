@@ -1,7 +1,7 @@
 # app/repository/arquivo_repo.py
 import os 
 from psycopg2.extras import RealDictCursor
-from app.db import get_db_connection
+from app.db import get_db_connection, commit, rollback, after_commit
 
 def create_arquivo(nome_arquivo, path_armazenamento, tipo_arquivo, tamanho_bytes, contrato_id):
     """Insere um novo registro de arquivo no banco e retorna o objeto criado."""
@@ -15,9 +15,9 @@ def create_arquivo(nome_arquivo, path_armazenamento, tipo_arquivo, tamanho_bytes
     try:
         cursor.execute(sql, (nome_arquivo, path_armazenamento, tipo_arquivo, tamanho_bytes, contrato_id))
         new_arquivo = cursor.fetchone()
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -66,14 +66,16 @@ def delete_arquivo(arquivo_id):
         # 4. Deleta o registro do arquivo da tabela 'arquivo'
         cursor.execute("DELETE FROM arquivo WHERE id = %s", (arquivo_id,))
 
-        # 5. Deleta o arquivo físico do disco
+        # 5. Deleta o arquivo físico do disco, só depois que a exclusão for confirmada
         filepath = arquivo['path_armazenamento']
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        def remove_file():
+            if os.path.exists(filepath):
+                os.remove(filepath)
+        after_commit(remove_file)
 
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         
         raise Exception(f"Erro inesperado no repositório ao deletar arquivo: {e}")
     finally:
@@ -1,7 +1,8 @@
 # app/repository/contratado_repo.py
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from app.db import get_db_connection
+from app.db import get_db_connection, commit, rollback
+from app.pagination import fetch_page
 
 def create_contratado(nome, email, cnpj, cpf, telefone):
     conn = get_db_connection()
@@ -14,15 +15,16 @@ def create_contratado(nome, email, cnpj, cpf, telefone):
     try:
         cursor.execute(sql, (nome, email, cnpj, cpf, telefone))
         new_contratado = cursor.fetchone()
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
     return new_contratado
 
-def get_all_contratados(filters=None, limit=10, offset=0):
+def get_all_contratados(filters=None, limit=10, offset=0, after=None, count='auto'):
+    """Lista contratados ativos por nome. `after` = [nome, id] ativa a paginação por cursor."""
     conn = get_db_connection()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     
@@ -33,17 +35,20 @@ def get_all_contratados(filters=None, limit=10, offset=0):
         base_query += " AND nome ILIKE %s"
         params.append(f"%{filters['nome']}%")
     
-    count_sql = f"SELECT COUNT(id) AS total {base_query}"
-    cursor.execute(count_sql, tuple(params))
-    total_items = cursor.fetchone()['total']
+    seek_sql = ""
+    seek_params = ()
+    if after is not None:
+        seek_sql = "AND (nome, id) > (%s, %s)"
+        seek_params = tuple(after)
+        offset = 0
 
-    data_sql = f"SELECT * {base_query} ORDER BY nome LIMIT %s OFFSET %s"
-    
-    paginated_params = tuple(params) + (limit, offset)
-    cursor.execute(data_sql, paginated_params)
-    contratados = cursor.fetchall()
+    contratados, page_info = fetch_page(
+        cursor, "SELECT *", base_query, params, "ORDER BY nome, id",
+        limit, offset, seek_sql, seek_params,
+        count=count, filtered=bool(params), cache_key='contratado'
+    )
     cursor.close()
-    return contratados, total_items
+    return contratados, page_info
 
 def find_contratado_by_id(contratado_id):
     conn = get_db_connection()
@@ -63,9 +68,9 @@ def update_contratado(contratado_id, data):
     try:
         cursor.execute(sql, values)
         updated_contratado = cursor.fetchone()
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -77,9 +82,9 @@ def delete_contratado(contratado_id):
     sql = "UPDATE contratado SET ativo = FALSE WHERE id = %s"
     try:
         cursor.execute(sql, (contratado_id,))
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -1,6 +1,25 @@
 # app/repository/contrato_repo.py
+from datetime import date
+from decimal import Decimal
 from psycopg2.extras import RealDictCursor
-from app.db import get_db_connection
+import os
+from app.db import get_db_connection, commit, rollback, after_commit
+from app.cache import TTLCache
+from app.pagination import fetch_page
+from app.repository.lembrete_repo import reagendar_contrato
+from app.filters import Equals, InList, CaseInsensitiveMatch, Contains, Range, Year, apply_filters
+
+# Colunas devolvidas pela API. Listadas uma a uma para que colunas internas
+# (ex.: o tsvector "busca" da migração 0003) não saiam nas respostas.
+COLUNAS = (
+    'id', 'nr_contrato', 'objeto', 'valor_anual', 'valor_global', 'base_legal',
+    'data_inicio', 'data_fim', 'termos_contratuais', 'contratado_id',
+    'modalidade_id', 'status_id', 'gestor_id', 'fiscal_id',
+    'fiscal_substituto_id', 'pae', 'doe', 'data_doe', 'documento', 'ativo',
+    'created_at', 'updated_at'
+)
+_RETURNING = ", ".join(COLUNAS)
+_COLUNAS_C = ", ".join(f"c.{coluna}" for coluna in COLUNAS)
 
 def create_contrato(data):
     conn = get_db_connection()
@@ -26,21 +45,63 @@ def create_contrato(data):
     sql = f"""
         INSERT INTO contrato ({", ".join(query_fields)})
         VALUES ({", ".join(query_values_placeholder)})
-        RETURNING *
+        RETURNING {_RETURNING}
     """
     
     try:
         cursor.execute(sql, tuple(query_values))
         new_contrato = cursor.fetchone()
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
     return new_contrato
 
-def get_all_contratos(filters=None, order_by='c.data_fim DESC', limit=10, offset=0):
+# Colunas aceitas para ordenação da listagem; o id entra sempre como desempate
+SORT_FIELDS = {'data_inicio', 'data_fim'}
+
+# Filtros da listagem de contratos e os índices (DB/migrations) que os atendem
+FILTERS = [
+    Equals('gestor_id', 'c.gestor_id', 'idx_contrato_gestor_data_fim', int),
+    Equals('fiscal_id', 'c.fiscal_id', 'idx_contrato_fiscal_data_fim', int),
+    InList('contratado_id', 'c.contratado_id', 'idx_contrato_contratado_ativo', int),
+    InList('modalidade_id', 'c.modalidade_id', 'idx_contrato_modalidade_ativo', int),
+    InList('status_id', 'c.status_id', 'idx_contrato_status_ativo', int),
+    CaseInsensitiveMatch('nr_contrato', 'c.nr_contrato', 'idx_contrato_nr_contrato_lower'),
+    CaseInsensitiveMatch('pae', 'c.pae', 'idx_contrato_pae_lower'),
+    Contains('objeto', 'c.objeto', 'idx_contrato_objeto_trgm'),
+    Year('ano', 'c.data_inicio', 'idx_contrato_data_inicio_ativo'),
+    Range('data_fim', 'c.data_fim', 'idx_contrato_data_fim_ativo', date, suffixes=('_de', '_ate')),
+    Range('valor_global', 'c.valor_global', 'idx_contrato_valor_global_ativo', Decimal),
+]
+
+def visibility_clause(scope):
+    """
+    Predicado SQL com os contratos que o usuário pode ver. `scope` é
+    {'usuario_id', 'perfil'} (ver auth_decorators.current_scope); None não
+    restringe, para uso interno. Administrador vê todos, Gestor os que
+    gerencia e Fiscal aqueles em que é fiscal ou substituto.
+    """
+    if scope is None or scope['perfil'] == 'Administrador':
+        return None, []
+    if scope['perfil'] == 'Fiscal':
+        return "(c.fiscal_id = %s OR c.fiscal_substituto_id = %s)", [scope['usuario_id'], scope['usuario_id']]
+    if scope['perfil'] == 'Gestor':
+        return "c.gestor_id = %s", [scope['usuario_id']]
+    return "FALSE", []
+
+def get_all_contratos(filters=None, sort_by='data_fim', order='DESC', limit=10, offset=0, after=None,
+                      count='auto', scope=None):
+    """
+    Lista contratos ativos. `filters` pode ser um dict ou request.args; só
+    os parâmetros declarados em FILTERS são considerados. Com `after`
+    (valores [chave, id] da última linha da página anterior) usa paginação
+    por cursor: a consulta busca a partir da chave em vez de pular `offset`
+    linhas. `count` segue os modos de app.pagination.fetch_page e `scope`
+    limita aos contratos visíveis para o usuário (visibility_clause).
+    """
     conn = get_db_connection()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
 
@@ -53,68 +114,111 @@ def get_all_contratos(filters=None, order_by='c.data_fim DESC', limit=10, offset
     
     where_clauses = ["c.ativo = TRUE"]
     params = []
+    scope_sql, scope_params = visibility_clause(scope)
+    if scope_sql:
+        where_clauses.append(scope_sql)
+        params.extend(scope_params)
+    filter_clauses, filter_params = apply_filters(FILTERS, filters)
+    where_clauses.extend(filter_clauses)
+    params.extend(filter_params)
 
-    if filters:
-        
-        if filters.get('gestor_id'):
-            where_clauses.append("c.gestor_id = %s")
-            params.append(filters['gestor_id'])
-        if filters.get('fiscal_id'):
-            where_clauses.append("c.fiscal_id = %s")
-            params.append(filters['fiscal_id'])
-        if filters.get('contratado_id'):
-            where_clauses.append("c.contratado_id = %s")
-            params.append(filters['contratado_id'])
-        if filters.get('modalidade_id'):
-            where_clauses.append("c.modalidade_id = %s")
-            params.append(filters['modalidade_id'])
-        if filters.get('objeto'):
-            where_clauses.append("c.objeto ILIKE %s")
-            params.append(f"%{filters['objeto']}%")
-        if filters.get('nr_contrato'):
-            where_clauses.append("c.nr_contrato ILIKE %s")
-            params.append(f"%{filters['nr_contrato']}%")
-        if filters.get('status_id'):
-            where_clauses.append("c.status_id = %s")
-            params.append(filters['status_id'])
-        if filters.get('pae'):
-            where_clauses.append("c.pae ILIKE %s")
-            params.append(f"%{filters['pae']}%")
-        
-        if filters.get('ano'):
-            where_clauses.append("EXTRACT(YEAR FROM c.data_inicio) = %s")
-            params.append(filters['ano'])
+    if sort_by not in SORT_FIELDS or order not in ('ASC', 'DESC'):
+        raise ValueError(f"Ordenação inválida: {sort_by} {order}")
 
     if where_clauses:
         base_query += " WHERE " + " AND ".join(where_clauses)
 
-    count_sql = f"SELECT COUNT(c.id) AS total {base_query}"
-    cursor.execute(count_sql, tuple(params))
-    total_items = cursor.fetchone()['total']
+    seek_sql = ""
+    seek_params = ()
+    if after is not None:
+        comparator = '<' if order == 'DESC' else '>'
+        seek_sql = f"AND (c.{sort_by}, c.id) {comparator} (%s::date, %s)"
+        seek_params = tuple(after)
+        offset = 0
 
-    data_sql = f"""
+    select_sql = """
         SELECT
             c.id, c.nr_contrato, c.objeto, c.data_inicio, c.data_fim, c.pae,
             ct.nome as contratado_nome, m.nome as modalidade_nome, s.nome as status_nome
-        {base_query}
-        ORDER BY {order_by}
-        LIMIT %s OFFSET %s
     """
-    paginated_params = tuple(params) + (limit, offset)
-    cursor.execute(data_sql, paginated_params)
-    contratos = cursor.fetchall()
-    
+    contratos, page_info = fetch_page(
+        cursor, select_sql, base_query, params,
+        f"ORDER BY c.{sort_by} {order}, c.id {order}",
+        limit, offset, seek_sql, seek_params,
+        count=count, filtered=len(where_clauses) > 1, cache_key='contrato'
+    )
     cursor.close()
 
-    return contratos, total_items
+    return contratos, page_info
+
+def _html_escape_sql(expr):
+    """Expressão SQL que escapa `expr` para uso como texto HTML."""
+    for char, entity in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;')):
+        expr = f"replace({expr}, '{char}', '{entity}')"
+    return expr
 
-def find_contrato_by_id(contrato_id):
+def search_contratos(termo, limit=10, offset=0, scope=None):
+    """
+    Busca textual (configuração 'portuguese') em nr_contrato, objeto,
+    termos_contratuais e nome do contratado, ordenada por relevância.
+    Os trechos destacados só são gerados para as linhas da página. Eles são
+    HTML: o texto do contrato é escapado antes do ts_headline, de modo que só
+    as marcações <mark> dele chegam como tags.
+    """
     conn = get_db_connection()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
 
     sql = """
         SELECT
-            c.*,
+            p.id, p.nr_contrato, p.objeto, p.data_inicio, p.data_fim, p.pae,
+            p.contratado_nome, p.modalidade_nome, p.status_nome, p.rank, p._total,
+            ts_headline('portuguese', {objeto_html}, p.query,
+                        'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MinWords=5, MaxWords=25') AS objeto_destaque,
+            ts_headline('portuguese', {termos_html}, p.query,
+                        'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MinWords=5, MaxWords=25') AS termos_destaque
+        FROM (
+            SELECT
+                c.id, c.nr_contrato, c.objeto, c.termos_contratuais, c.data_inicio, c.data_fim, c.pae,
+                ct.nome as contratado_nome, m.nome as modalidade_nome, s.nome as status_nome,
+                q.query, ts_rank_cd(c.busca, q.query) AS rank,
+                COUNT(*) OVER () AS _total
+            FROM contrato c
+            CROSS JOIN websearch_to_tsquery('portuguese', %s) AS q(query)
+            LEFT JOIN contratado ct ON c.contratado_id = ct.id
+            LEFT JOIN modalidade m ON c.modalidade_id = m.id
+            LEFT JOIN status s ON c.status_id = s.id
+            WHERE c.ativo = TRUE AND c.busca @@ q.query {scope_sql}
+            ORDER BY rank DESC, c.id DESC
+            LIMIT %s OFFSET %s
+        ) p
+        ORDER BY p.rank DESC, p.id DESC
+    """
+    scope_sql, scope_params = visibility_clause(scope)
+    sql = sql.format(
+        scope_sql=f"AND {scope_sql}" if scope_sql else "",
+        objeto_html=_html_escape_sql("p.objeto"),
+        termos_html=_html_escape_sql("coalesce(p.termos_contratuais, '')"),
+    )
+    # Busca uma linha a mais para saber se existe próxima página
+    cursor.execute(sql, (termo, *scope_params, limit + 1, offset))
+    contratos = cursor.fetchall()
+    cursor.close()
+
+    has_more = len(contratos) > limit
+    contratos = contratos[:limit]
+    total_items = contratos[0]['_total'] if contratos else (0 if offset == 0 else None)
+    for contrato in contratos:
+        contrato.pop('_total', None)
+    count_kind = 'exact' if total_items is not None else 'none'
+    return contratos, {'total_items': total_items, 'count': count_kind, 'has_more': has_more}
+
+def find_contrato_by_id(contrato_id, scope=None):
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    sql = f"""
+        SELECT
+            {_COLUNAS_C},
             ct.nome AS contratado_nome, ct.cnpj AS contratado_cnpj,
             m.nome AS modalidade_nome,
             s.nome AS status_nome,
@@ -132,23 +236,161 @@ def find_contrato_by_id(contrato_id):
         LEFT JOIN arquivo doc ON c.documento::int = doc.id
         WHERE c.id = %s AND c.ativo = TRUE
     """
-    cursor.execute(sql, (contrato_id,))
+    scope_sql, scope_params = visibility_clause(scope)
+    if scope_sql:
+        sql += f" AND {scope_sql}"
+    cursor.execute(sql, (contrato_id, *scope_params))
     contrato = cursor.fetchone()
     cursor.close()
     return contrato
 
+# Coleções que podem ser agregadas ao detalhe do contrato (?include=...).
+# Cada entrada vira uma subconsulta json_agg na mesma instrução SQL.
+DETALHE_INCLUDES = {
+    'relatorios': ('relatorios_fiscais', """
+        SELECT COALESCE(json_agg(r ORDER BY r.data_envio DESC), '[]'::json)
+        FROM (
+            SELECT
+                rf.id, rf.mes_competencia, rf.observacoes_fiscal,
+                rf.created_at as data_envio, u.nome as enviado_por,
+                s.nome as status_relatorio, a.id as arquivo_id, a.nome_arquivo
+            FROM relatoriofiscal rf
+            LEFT JOIN usuario u ON rf.fiscal_usuario_id = u.id
+            LEFT JOIN statusrelatorio s ON rf.status_id = s.id
+            LEFT JOIN arquivo a ON rf.arquivo_id = a.id
+            WHERE rf.contrato_id = c.id
+        ) r
+    """),
+    'pendencias': ('pendencias', """
+        SELECT COALESCE(json_agg(p ORDER BY p.data_prazo ASC), '[]'::json)
+        FROM (
+            SELECT
+                pr.*,
+                sp.nome as status_nome,
+                u.nome as criado_por_nome
+            FROM pendenciarelatorio pr
+            LEFT JOIN statuspendencia sp ON pr.status_pendencia_id = sp.id
+            LEFT JOIN usuario u ON pr.criado_por_usuario_id = u.id
+            WHERE pr.contrato_id = c.id
+        ) p
+    """),
+    'arquivos': ('arquivos', """
+        SELECT COALESCE(json_agg(a ORDER BY a.created_at DESC), '[]'::json)
+        FROM (
+            SELECT id, nome_arquivo, tipo_arquivo, tamanho_bytes, created_at
+            FROM arquivo
+            WHERE contrato_id = c.id
+        ) a
+    """),
+}
+
+def find_contrato_detalhado(contrato_id, include, scope=None):
+    """
+    Busca o contrato com as coleções pedidas em `include` (chaves de
+    DETALHE_INCLUDES) numa única ida ao banco.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    agregados = "".join(
+        f",\n            ({DETALHE_INCLUDES[nome][1]}) AS {DETALHE_INCLUDES[nome][0]}"
+        for nome in DETALHE_INCLUDES if nome in include
+    )
+
+    sql = f"""
+        SELECT
+            {_COLUNAS_C},
+            ct.nome AS contratado_nome, ct.cnpj AS contratado_cnpj,
+            m.nome AS modalidade_nome,
+            s.nome AS status_nome,
+            gestor.nome AS gestor_nome,
+            fiscal.nome AS fiscal_nome,
+            fiscal_sub.nome AS fiscal_substituto_nome,
+            doc.nome_arquivo AS documento_nome_arquivo{agregados}
+        FROM contrato c
+        LEFT JOIN contratado ct ON c.contratado_id = ct.id
+        LEFT JOIN modalidade m ON c.modalidade_id = m.id
+        LEFT JOIN status s ON c.status_id = s.id
+        LEFT JOIN usuario gestor ON c.gestor_id = gestor.id
+        LEFT JOIN usuario fiscal ON c.fiscal_id = fiscal.id
+        LEFT JOIN usuario fiscal_sub ON c.fiscal_substituto_id = fiscal_sub.id
+        LEFT JOIN arquivo doc ON c.documento::int = doc.id
+        WHERE c.id = %s AND c.ativo = TRUE
+    """
+    scope_sql, scope_params = visibility_clause(scope)
+    if scope_sql:
+        sql += f" AND {scope_sql}"
+    cursor.execute(sql, (contrato_id, *scope_params))
+    contrato = cursor.fetchone()
+    cursor.close()
+    return contrato
+
+def contrato_exists(contrato_id, scope=None):
+    """
+    Verifica se um contrato ativo existe (e é visível para `scope`), sem
+    carregar os seus relacionamentos.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    sql = "SELECT 1 FROM contrato c WHERE c.id = %s AND c.ativo = TRUE"
+    scope_sql, scope_params = visibility_clause(scope)
+    if scope_sql:
+        sql += f" AND {scope_sql}"
+    cursor.execute(sql, (contrato_id, *scope_params))
+    exists = cursor.fetchone() is not None
+    cursor.close()
+    return exists
+
+# Responsáveis por contrato ativo (contrato_id -> gestor, fiscal, substituto),
+# usados nas verificações de permissão por contrato
+MEMBER_COLUMNS = {'gestor_id', 'fiscal_id', 'fiscal_substituto_id'}
+_membros_cache = TTLCache(ttl=float(os.getenv('CONTRACT_MEMBERSHIP_CACHE_TTL', 60)), maxsize=20000)
+
+def _forget_membros(contrato_id):
+    _membros_cache.pop(int(contrato_id))
+    after_commit(lambda: _membros_cache.pop(int(contrato_id)))
+
+def find_membros(contrato_id):
+    """
+    Gestor, fiscal e fiscal substituto de um contrato ativo, ou None se ele
+    não existir. Fica em cache por worker; update/delete do contrato descartam a entrada.
+    """
+    contrato_id = int(contrato_id)
+    membros = _membros_cache.get(contrato_id)
+    if membros is not None:
+        return membros
+
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute(
+        "SELECT gestor_id, fiscal_id, fiscal_substituto_id FROM contrato WHERE id = %s AND ativo = TRUE",
+        (contrato_id,)
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None:
+        return None
+    membros = dict(row)
+    _membros_cache.set(contrato_id, membros)
+    return membros
+
 def update_contrato(contrato_id, data):
     conn = get_db_connection()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     update_fields = [f"{key} = %s" for key in data.keys()]
-    sql = f"UPDATE contrato SET {', '.join(update_fields)} WHERE id = %s RETURNING *"
+    sql = f"UPDATE contrato SET {', '.join(update_fields)} WHERE id = %s RETURNING {_RETURNING}"
     values = list(data.values()) + [contrato_id]
     try:
         cursor.execute(sql, values)
         updated_contrato = cursor.fetchone()
-        conn.commit()
+        if MEMBER_COLUMNS & data.keys() or 'ativo' in data:
+            _forget_membros(contrato_id)
+        if 'modalidade_id' in data:
+            # Os lembretes ainda não enviados seguem a política da nova modalidade
+            reagendar_contrato(contrato_id)
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -160,9 +402,10 @@ def delete_contrato(contrato_id):
     sql = "UPDATE contrato SET ativo = FALSE WHERE id = %s"
     try:
         cursor.execute(sql, (contrato_id,))
-        conn.commit()
+        _forget_membros(contrato_id)
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
\ No newline at end of file
@@ -0,0 +1,85 @@
+# app/repository/job_run_repo.py
+from psycopg2.extras import RealDictCursor
+from app.db import get_db_connection, commit, rollback
+from app.pagination import fetch_page
+
+STATUS = ('executando', 'sucesso', 'erro')
+
+_COLUNAS = """id, job, agendada_para, recuperacao, executor, status, iniciada_em, terminada_em,
+    linhas_processadas, emails_enviados, erro"""
+
+def iniciar(job, agendada_para=None, recuperacao=False, executor=None):
+    """
+    Registra o início de uma execução e confirma na hora, antes do trabalho
+    da tarefa: a linha fica mesmo que a tarefa falhe ou o processo morra.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO job_runs (job, agendada_para, recuperacao, executor) VALUES (%s, %s, %s, %s) RETURNING id",
+            (job, agendada_para, recuperacao, executor)
+        )
+        run_id = cursor.fetchone()[0]
+        commit(conn)
+    except Exception as e:
+        rollback(conn)
+        raise e
+    finally:
+        cursor.close()
+    return run_id
+
+def finalizar(run_id, status, linhas_processadas=0, emails_enviados=0, erro=None):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            UPDATE job_runs
+            SET status = %s, terminada_em = now(), linhas_processadas = %s, emails_enviados = %s, erro = %s
+            WHERE id = %s
+        """, (status, linhas_processadas, emails_enviados, erro, run_id))
+        commit(conn)
+    except Exception as e:
+        rollback(conn)
+        raise e
+    finally:
+        cursor.close()
+
+def ultimo_sucesso(job):
+    """Início da última execução bem-sucedida de `job`, ou None."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT iniciada_em FROM job_runs WHERE job = %s AND status = 'sucesso' ORDER BY id DESC LIMIT 1",
+        (job,)
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+def get_all_job_runs(filters=None, limit=10, offset=0, after=None, count='auto'):
+    """Execuções mais recentes primeiro. `after` = [id] ativa a paginação por cursor."""
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    base_query = "FROM job_runs WHERE TRUE"
+    params = []
+    for campo in ('job', 'status'):
+        if filters and filters.get(campo):
+            base_query += f" AND {campo} = %s"
+            params.append(filters[campo])
+
+    seek_sql = ""
+    seek_params = ()
+    if after is not None:
+        seek_sql = "AND id < %s"
+        seek_params = tuple(after)
+        offset = 0
+
+    runs, page_info = fetch_page(
+        cursor, f"SELECT {_COLUNAS}", base_query, params, "ORDER BY id DESC",
+        limit, offset, seek_sql, seek_params,
+        count=count, filtered=bool(params), cache_key='job_runs'
+    )
+    cursor.close()
+    return runs, page_info
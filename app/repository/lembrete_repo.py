@@ -0,0 +1,159 @@
+# app/repository/lembrete_repo.py
+import os
+from datetime import date
+from psycopg2.extras import RealDictCursor
+from app.db import get_db_connection, commit, rollback
+
+# Dias antes do prazo em que o fiscal é lembrado, para modalidades sem política própria
+DIAS_LEMBRETE_PADRAO = [int(d) for d in os.getenv('LEMBRETE_DIAS_PADRAO', '15,5,3,0').split(',') if d.strip()]
+
+# Uma linha por dia de antecedência da política da modalidade do contrato;
+# datas de envio que já passaram ficam de fora
+_AGENDAR_SQL = """
+    INSERT INTO lembrete_pendencia (pendencia_id, dias_antes, data_envio)
+    SELECT p.id, d.dias, p.data_prazo - d.dias
+    FROM pendenciarelatorio p
+    JOIN contrato c ON c.id = p.contrato_id
+    JOIN modalidade m ON m.id = c.modalidade_id
+    CROSS JOIN LATERAL unnest(COALESCE(m.dias_lembrete, %(padrao)s::integer[])) AS d(dias)
+    WHERE {where} AND p.data_prazo - d.dias >= CURRENT_DATE
+    ON CONFLICT (pendencia_id, dias_antes) DO NOTHING
+"""
+
+def agendar_lembretes(pendencia_id):
+    """
+    Cria a agenda de lembretes de uma pendência. Não confirma a transação:
+    é chamada por create_pendencia, antes do commit da criação.
+    """
+    conn = get_db_connection()
+    with conn.cursor() as cursor:
+        cursor.execute(_AGENDAR_SQL.format(where="p.id = %(pendencia_id)s"),
+                       {'padrao': DIAS_LEMBRETE_PADRAO, 'pendencia_id': pendencia_id})
+        return cursor.rowcount
+
+def _reagendar(filtro, params):
+    """
+    Refaz os lembretes ainda não enviados das pendências cujos contratos
+    atendem `filtro` (SQL sobre p = pendência e c = contrato). Lembretes já
+    enviados são mantidos; só pendências em 'Pendente' ganham agenda nova.
+    """
+    conn = get_db_connection()
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            DELETE FROM lembrete_pendencia l
+            USING pendenciarelatorio p, contrato c
+            WHERE l.pendencia_id = p.id AND c.id = p.contrato_id
+              AND {filtro} AND l.enviado_em IS NULL
+        """, params)
+        where = f"""{filtro} AND p.status_pendencia_id IN (
+            SELECT id FROM statuspendencia WHERE nome = 'Pendente')"""
+        cursor.execute(_AGENDAR_SQL.format(where=where), dict(params, padrao=DIAS_LEMBRETE_PADRAO))
+        return cursor.rowcount
+
+def reagendar_modalidade(modalidade_id):
+    """
+    Refaz a agenda dos contratos da modalidade depois de uma mudança de
+    política. Não confirma a transação: roda junto com a alteração da modalidade.
+    """
+    return _reagendar("c.modalidade_id = %(modalidade_id)s", {'modalidade_id': modalidade_id})
+
+def reagendar_contrato(contrato_id):
+    """
+    Refaz a agenda de um contrato que mudou de modalidade. Também não
+    confirma a transação: roda junto com a alteração do contrato.
+    """
+    return _reagendar("c.id = %(contrato_id)s", {'contrato_id': contrato_id})
+
+def descartar_obsoletos(dia):
+    """
+    Apaga lembretes não enviados com data de envio até `dia` que não servem
+    mais: a pendência saiu de 'Pendente' ou o prazo já passou. Sem isso eles
+    ficariam para sempre na busca de atrasados. Não confirma a transação.
+    """
+    conn = get_db_connection()
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            DELETE FROM lembrete_pendencia l
+            USING pendenciarelatorio pr, statuspendencia sp
+            WHERE l.pendencia_id = pr.id AND sp.id = pr.status_pendencia_id
+              AND l.enviado_em IS NULL AND l.data_envio <= %(dia)s
+              AND (pr.data_prazo < %(dia)s OR sp.nome <> 'Pendente')
+        """, {'dia': dia})
+        return cursor.rowcount
+
+def lembretes_devidos_por_fiscal(dia):
+    """
+    Lembretes não enviados com envio marcado até `dia` (inclusive), de
+    pendências que continuam com status 'Pendente'. Dias perdidos (agendador
+    parado no horário) entram na mesma consulta; se uma pendência acumulou
+    mais de um lembrete, vai um só, com todos os ids em `lembrete_ids`.
+
+    Agrupados por fiscal: uma linha por fiscal, com a preferência de envio
+    dele e a lista `lembretes` em ordem de prazo. As linhas de
+    lembrete_pendencia ficam bloqueadas até o fim da transação (SKIP LOCKED:
+    uma execução simultânea não as repete).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    sql = """
+        WITH devidos AS (
+            SELECT l.id AS lembrete_id, l.dias_antes, l.pendencia_id
+            FROM lembrete_pendencia l
+            JOIN pendenciarelatorio pr ON pr.id = l.pendencia_id
+            JOIN statuspendencia sp ON sp.id = pr.status_pendencia_id
+            WHERE l.data_envio <= %(dia)s AND l.enviado_em IS NULL
+              AND pr.data_prazo >= %(dia)s AND sp.nome = 'Pendente'
+            FOR UPDATE OF l SKIP LOCKED
+        ), por_pendencia AS (
+            SELECT
+                array_agg(d.lembrete_id ORDER BY d.lembrete_id) AS lembrete_ids,
+                min(d.dias_antes) AS dias_antes,
+                pr.id AS pendencia_id, pr.descricao, pr.data_prazo,
+                pr.data_prazo - %(dia)s AS dias_restantes,
+                c.nr_contrato, c.fiscal_id
+            FROM devidos d
+            JOIN pendenciarelatorio pr ON pr.id = d.pendencia_id
+            JOIN contrato c ON c.id = pr.contrato_id
+            GROUP BY pr.id, c.id
+        )
+        SELECT
+            u.id AS fiscal_id, u.nome AS fiscal_nome, u.email AS fiscal_email,
+            u.preferencia_lembrete,
+            json_agg(json_build_object(
+                'lembrete_ids', p.lembrete_ids, 'dias_antes', p.dias_antes,
+                'pendencia_id', p.pendencia_id, 'descricao', p.descricao,
+                'data_prazo', p.data_prazo, 'dias_restantes', p.dias_restantes,
+                'nr_contrato', p.nr_contrato
+            ) ORDER BY p.data_prazo, p.nr_contrato, p.pendencia_id) AS lembretes
+        FROM por_pendencia p
+        JOIN usuario u ON u.id = p.fiscal_id
+        GROUP BY u.id
+        ORDER BY u.id
+    """
+    cursor.execute(sql, {'dia': dia})
+    fiscais = cursor.fetchall()
+    cursor.close()
+    for fiscal in fiscais:
+        # json_agg devolve as datas como texto
+        for lembrete in fiscal['lembretes']:
+            lembrete['data_prazo'] = date.fromisoformat(lembrete['data_prazo'])
+    return fiscais
+
+def marcar_enviados(lembrete_ids):
+    """
+    Registra os lembretes como enviados e confirma a transação — junto com
+    os e-mails colocados na fila por quem chamou.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE lembrete_pendencia SET enviado_em = now() WHERE id = ANY(%s) AND enviado_em IS NULL",
+            (list(lembrete_ids),)
+        )
+        commit(conn)
+    except Exception as e:
+        rollback(conn)
+        raise e
+    finally:
+        cursor.close()
@@ -1,6 +1,8 @@
 # app/repository/modalidade_repo.py
 from psycopg2.extras import RealDictCursor
-from app.db import get_db_connection
+from app.db import get_db_connection, commit, rollback
+from app.cache import modalidades
+from app.repository.lembrete_repo import reagendar_modalidade
 
 def create_modalidade(nome):
     conn = get_db_connection()
@@ -8,29 +10,20 @@ def create_modalidade(nome):
     try:
         cursor.execute("INSERT INTO modalidade (nome) VALUES (%s) RETURNING *", (nome,))
         new_item = cursor.fetchone()
-        conn.commit()
+        modalidades.changed()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
     return new_item
 
 def get_all_modalidades():
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM modalidade WHERE ativo = TRUE ORDER BY nome")
-    items = cursor.fetchall()
-    cursor.close()
-    return items
+    return modalidades.all()
   
 def find_modalidade_by_id(modalidade_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM modalidade WHERE id = %s AND ativo = TRUE", (modalidade_id,))
-    item = cursor.fetchone()
-    cursor.close()
-    return item
+    return modalidades.by_id(modalidade_id)
 
 def update_modalidade(modalidade_id, nome):
     conn = get_db_connection()
@@ -38,9 +31,10 @@ def update_modalidade(modalidade_id, nome):
     try:
         cursor.execute("UPDATE modalidade SET nome = %s WHERE id = %s RETURNING *", (nome, modalidade_id))
         updated_item = cursor.fetchone()
-        conn.commit()
+        modalidades.changed()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -52,9 +46,31 @@ def delete_modalidade(modalidade_id):
     sql = "UPDATE modalidade SET ativo = FALSE WHERE id = %s"
     try:
         cursor.execute(sql, (modalidade_id,))
-        conn.commit()
+        modalidades.changed()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
-        cursor.close()
\ No newline at end of file
+        cursor.close()
+
+def update_dias_lembrete(modalidade_id, dias_lembrete):
+    """
+    Define a política de lembretes da modalidade (dias antes do prazo; None
+    volta ao padrão) e refaz a agenda das pendências que ainda não foram lembradas.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cursor.execute("UPDATE modalidade SET dias_lembrete = %s WHERE id = %s RETURNING *",
+                       (dias_lembrete, modalidade_id))
+        updated_item = cursor.fetchone()
+        modalidades.changed()
+        reagendar_modalidade(modalidade_id)
+        commit(conn)
+    except Exception as e:
+        rollback(conn)
+        raise e
+    finally:
+        cursor.close()
+    return updated_item
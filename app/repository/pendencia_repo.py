@@ -1,6 +1,7 @@
 # app/repository/pendencia_repo.py
 from psycopg2.extras import RealDictCursor
-from app.db import get_db_connection
+from app.db import get_db_connection, commit, rollback
+from app.repository.lembrete_repo import agendar_lembretes
 
 def create_pendencia(contrato_id, data):
     """Cria uma nova pendência para um contrato."""
@@ -20,9 +21,11 @@ def create_pendencia(contrato_id, data):
             data['criado_por_usuario_id']
         ))
         new_pendencia = cursor.fetchone()
-        conn.commit()
+        # Agenda dos lembretes de prazo, confirmada junto com a pendência
+        agendar_lembretes(new_pendencia['id'])
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -56,9 +59,9 @@ def update_pendencia_status(pendencia_id, status_id):
     try:
         cursor.execute(sql, (status_id, pendencia_id))
         updated_pendencia = cursor.fetchone()
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -1,6 +1,7 @@
 # app/repository/perfil_repo.py
 from psycopg2.extras import RealDictCursor
-from app.db import get_db_connection
+from app.db import get_db_connection, commit, rollback
+from app.cache import perfis
 
 def create_perfil(nome):
     conn = get_db_connection()
@@ -8,27 +9,18 @@ def create_perfil(nome):
     try:
         cursor.execute("INSERT INTO perfil (nome) VALUES (%s) RETURNING *", (nome,))
         new_item = cursor.fetchone()
-        conn.commit()
+        perfis.changed()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
     return new_item
 
 def get_all_perfis():
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM perfil ORDER BY nome")
-    items = cursor.fetchall()
-    cursor.close()
-    return items
+    return perfis.all()
 
 def find_perfil_by_id(perfil_id):
-    """Busca um perfil pelo seu ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM perfil WHERE id = %s", (perfil_id,))
-    perfil = cursor.fetchone()
-    cursor.close()
-    return perfil
\ No newline at end of file
+    """Busca um perfil pelo seu ID (em cache)."""
+    return perfis.by_id(perfil_id)
\ No newline at end of file
@@ -1,6 +1,6 @@
 # app/repository/relatorio_repo.py
 from psycopg2.extras import RealDictCursor
-from app.db import get_db_connection
+from app.db import get_db_connection, commit, rollback
 
 def create_relatorio(data):
     """Cria um novo registro de relatório fiscal."""
@@ -22,9 +22,9 @@ def create_relatorio(data):
             data.get('pendencia_id')
         ))
         new_relatorio = cursor.fetchone()
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -43,9 +43,9 @@ def analise_relatorio(relatorio_id, aprovador_id, status_id, observacoes):
     try:
         cursor.execute(sql, (status_id, aprovador_id, observacoes, relatorio_id))
         updated_relatorio = cursor.fetchone()
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -68,9 +68,9 @@ def update_relatorio_reenvio(relatorio_id, novo_arquivo_id, observacoes_fiscal):
     try:
         cursor.execute(sql, (novo_arquivo_id, observacoes_fiscal, status_pendente_analise_id, relatorio_id))
         updated_relatorio = cursor.fetchone()
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
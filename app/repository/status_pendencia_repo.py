@@ -1,6 +1,7 @@
 # app/repository/status_pendencia_repo.py
 from psycopg2.extras import RealDictCursor
-from app.db import get_db_connection
+from app.db import get_db_connection, commit, rollback
+from app.cache import status_pendencia
 
 def create_statuspendencia(nome):
     """Cria um novo status de pendência."""
@@ -9,9 +10,10 @@ def create_statuspendencia(nome):
     try:
         cursor.execute("INSERT INTO statuspendencia (nome) VALUES (%s) RETURNING *", (nome,))
         new_item = cursor.fetchone()
-        conn.commit()
+        status_pendencia.changed()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -19,30 +21,15 @@ def create_statuspendencia(nome):
 
 def find_statuspendencia_by_id(status_id):
     """Busca um status de pendência específico pelo ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM statuspendencia WHERE id = %s", (status_id,))
-    item = cursor.fetchone()
-    cursor.close()
-    return item
+    return status_pendencia.by_id(status_id)
   
 def get_all_statuspendencia():
     """Busca todos os status de pendência."""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM statuspendencia ORDER BY nome")
-    items = cursor.fetchall()
-    cursor.close()
-    return items
+    return status_pendencia.all()
 
 def find_statuspendencia_by_name(nome):
     """Busca um status de pendência pelo nome."""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM statuspendencia WHERE nome = %s", (nome,))
-    item = cursor.fetchone()
-    cursor.close()
-    return item
+    return status_pendencia.by_name(nome)
 
 def update_pendencia_status(pendencia_id, status_id):
     """Atualiza o status de uma pendência específica."""
@@ -52,9 +39,9 @@ def update_pendencia_status(pendencia_id, status_id):
     try:
         cursor.execute(sql, (status_id, pendencia_id))
         updated_pendencia = cursor.fetchone()
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
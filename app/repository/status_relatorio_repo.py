@@ -1,6 +1,7 @@
 # app/repository/status_relatorio_repo.py
 from psycopg2.extras import RealDictCursor
-from app.db import get_db_connection
+from app.db import get_db_connection, commit, rollback
+from app.cache import status_relatorio
 
 def create_statusrelatorio(nome):
     conn = get_db_connection()
@@ -8,9 +9,10 @@ def create_statusrelatorio(nome):
     try:
         cursor.execute("INSERT INTO statusrelatorio (nome) VALUES (%s) RETURNING *", (nome,))
         new_item = cursor.fetchone()
-        conn.commit()
+        status_relatorio.changed()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -18,28 +20,13 @@ def create_statusrelatorio(nome):
 
 def get_all_statusrelatorio():
     """Busca todos os status de relatório."""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM statusrelatorio ORDER BY nome")
-    items = cursor.fetchall()
-    cursor.close()
-    return items
+    return status_relatorio.all()
 
 def find_statusrelatorio_by_id(status_id):
     """Busca um status de relatório específico pelo ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM statusrelatorio WHERE id = %s", (status_id,))
-    item = cursor.fetchone()
-    cursor.close()
-    return item
+    return status_relatorio.by_id(status_id)
 
 
 def find_statusrelatorio_by_name(nome):
     """Busca um status de relatório pelo nome."""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM statusrelatorio WHERE nome = %s", (nome,))
-    item = cursor.fetchone()
-    cursor.close()
-    return item
\ No newline at end of file
+    return status_relatorio.by_name(nome)
\ No newline at end of file
@@ -1,6 +1,7 @@
 # app/repository/status_repo.py
 from psycopg2.extras import RealDictCursor
-from app.db import get_db_connection
+from app.db import get_db_connection, commit, rollback
+from app.cache import status as status_cache
 
 def create_status(nome):
     conn = get_db_connection()
@@ -8,29 +9,20 @@ def create_status(nome):
     try:
         cursor.execute("INSERT INTO status (nome) VALUES (%s) RETURNING *", (nome,))
         new_item = cursor.fetchone()
-        conn.commit()
+        status_cache.changed()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
     return new_item
 
 def get_all_status():
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM status WHERE ativo = TRUE ORDER BY nome")
-    items = cursor.fetchall()
-    cursor.close()
-    return items
+    return status_cache.all()
   
 def find_status_by_id(status_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM status WHERE id = %s AND ativo = TRUE", (status_id,))
-    item = cursor.fetchone()
-    cursor.close()
-    return item
+    return status_cache.by_id(status_id)
 
 def update_status(status_id, nome):
     conn = get_db_connection()
@@ -38,9 +30,10 @@ def update_status(status_id, nome):
     try:
         cursor.execute("UPDATE status SET nome = %s WHERE id = %s RETURNING *", (nome, status_id))
         updated_item = cursor.fetchone()
-        conn.commit()
+        status_cache.changed()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -52,9 +45,10 @@ def delete_status(status_id):
     sql = "UPDATE status SET ativo = FALSE WHERE id = %s"
     try:
         cursor.execute(sql, (status_id,))
-        conn.commit()
+        status_cache.changed()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
\ No newline at end of file
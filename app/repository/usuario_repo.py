@@ -1,7 +1,31 @@
 # app/repository/usuario_repo.py
 import psycopg2
 from psycopg2.extras import RealDictCursor 
-from app.db import get_db_connection
+import os
+from app.db import get_db_connection, commit, rollback, after_commit
+from app.cache import TTLCache
+from app.pagination import fetch_page
+
+# Dados de /auth/profile por id de usuário; descartados quando o usuário muda
+_profile_cache = TTLCache(ttl=float(os.getenv('USER_CACHE_TTL', 300)), maxsize=4096)
+
+# Versão atual dos tokens por usuário (-1 = inativo). TTL curto: é o atraso
+# máximo para uma desativação feita em outro worker valer neste
+_token_version_cache = TTLCache(ttl=float(os.getenv('TOKEN_VERSION_CACHE_TTL', 10)), maxsize=10000)
+
+# Alterações de usuário que invalidam os tokens já emitidos
+_REVOKING_FIELDS = {'perfil_id', 'senha', 'ativo'}
+
+# Como os lembretes de prazo do dia chegam: um resumo ou um e-mail por pendência
+PREFERENCIAS_LEMBRETE = ('resumo', 'individual')
+
+def _forget_profile(user_id):
+    _profile_cache.pop(int(user_id))
+    after_commit(lambda: _profile_cache.pop(int(user_id)))
+
+def _forget_token_version(user_id):
+    _token_version_cache.pop(int(user_id))
+    after_commit(lambda: _token_version_cache.pop(int(user_id)))
 
 def create_user(nome, email, cpf, matricula, senha_hash, perfil_id):
     conn = get_db_connection()
@@ -16,9 +40,9 @@ def create_user(nome, email, cpf, matricula, senha_hash, perfil_id):
     try:
         cursor.execute(sql, (nome, email, cpf, matricula, senha_hash, perfil_id))
         new_user = cursor.fetchone()
-        conn.commit()
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -34,7 +58,8 @@ def find_user_by_email(email):
     cursor.close()
     return user
 
-def get_all_users(filters=None, limit=10, offset=0): 
+def get_all_users(filters=None, limit=10, offset=0, after=None, count='auto'): 
+    """Lista usuários ativos por nome. `after` = [nome, id] ativa a paginação por cursor."""
     conn = get_db_connection()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     
@@ -45,17 +70,20 @@ def get_all_users(filters=None, limit=10, offset=0):
         base_query += " AND nome ILIKE %s"
         params.append(f"%{filters['nome']}%")
 
-    count_sql = f"SELECT COUNT(id) AS total {base_query}"
-    cursor.execute(count_sql, tuple(params))
-    total_items = cursor.fetchone()['total']
+    seek_sql = ""
+    seek_params = ()
+    if after is not None:
+        seek_sql = "AND (nome, id) > (%s, %s)"
+        seek_params = tuple(after)
+        offset = 0
 
-    data_sql = f"SELECT id, nome, cpf, email, matricula, perfil_id {base_query} ORDER BY nome LIMIT %s OFFSET %s"
-    
-    paginated_params = tuple(params) + (limit, offset)
-    cursor.execute(data_sql, paginated_params)
-    users = cursor.fetchall()
+    users, page_info = fetch_page(
+        cursor, "SELECT id, nome, cpf, email, matricula, perfil_id", base_query, params, "ORDER BY nome, id",
+        limit, offset, seek_sql, seek_params,
+        count=count, filtered=bool(params), cache_key='usuario'
+    )
     cursor.close()
-    return users, total_items
+    return users, page_info
 
 def find_user_by_id(user_id):
     conn = get_db_connection()
@@ -70,14 +98,20 @@ def update_user(user_id, data):
     conn = get_db_connection()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     update_fields = [f"{key} = %s" for key in data.keys()]
+    revoke_tokens = bool(_REVOKING_FIELDS & data.keys())
+    if revoke_tokens:
+        update_fields.append("token_versao = token_versao + 1")
     sql = f"UPDATE usuario SET {', '.join(update_fields)} WHERE id = %s RETURNING id, nome, email, cpf, matricula, perfil_id"
     values = list(data.values()) + [user_id]
     try:
         cursor.execute(sql, values)
         updated_user = cursor.fetchone()
-        conn.commit()
+        _forget_profile(user_id)
+        if revoke_tokens:
+            _forget_token_version(user_id)
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -86,12 +120,14 @@ def update_user(user_id, data):
 def delete_user(user_id):
     conn = get_db_connection()
     cursor = conn.cursor()
-    sql = "UPDATE usuario SET ativo = FALSE WHERE id = %s"
+    sql = "UPDATE usuario SET ativo = FALSE, token_versao = token_versao + 1 WHERE id = %s"
     try:
         cursor.execute(sql, (user_id,))
-        conn.commit()
+        _forget_profile(user_id)
+        _forget_token_version(user_id)
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
@@ -109,28 +145,125 @@ def find_user_for_auth(user_id):
     cursor.close()
     return user
 
-def update_password(user_id, new_password_hash):
+def update_password(user_id, new_password_hash, revoke_tokens=False):
     """
-    Atualiza apenas a senha de um usuário.
+    Atualiza apenas a senha de um usuário. Com `revoke_tokens` (reset pelo
+    administrador) os tokens já emitidos para o usuário deixam de valer.
     """
     conn = get_db_connection()
     cursor = conn.cursor()
     sql = "UPDATE usuario SET senha = %s WHERE id = %s"
+    if revoke_tokens:
+        sql = "UPDATE usuario SET senha = %s, token_versao = token_versao + 1 WHERE id = %s"
     try:
         cursor.execute(sql, (new_password_hash, user_id))
-        conn.commit()
+        if revoke_tokens:
+            _forget_token_version(user_id)
+        commit(conn)
+    except Exception as e:
+        rollback(conn)
+        raise e
+    finally:
+        cursor.close()
+
+def find_preferencia_lembrete(user_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    sql = "SELECT preferencia_lembrete FROM usuario WHERE id = %s AND ativo = TRUE"
+    cursor.execute(sql, (user_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+def update_preferencia_lembrete(user_id, preferencia):
+    """Define se o usuário recebe os lembretes do dia num resumo ou um a um."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    sql = "UPDATE usuario SET preferencia_lembrete = %s WHERE id = %s AND ativo = TRUE"
+    try:
+        cursor.execute(sql, (preferencia, user_id))
+        commit(conn)
+    except Exception as e:
+        rollback(conn)
+        raise e
+    finally:
+        cursor.close()
+
+def rehash_password(user_id, old_hash, new_hash):
+    """
+    Troca o hash da senha pelo mesmo segredo com parâmetros novos (login).
+    Só atualiza se o hash não mudou nesse meio tempo; não mexe na versão dos tokens.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    sql = "UPDATE usuario SET senha = %s WHERE id = %s AND senha = %s"
+    try:
+        cursor.execute(sql, (new_hash, user_id, old_hash))
+        commit(conn)
     except Exception as e:
-        conn.rollback()
+        rollback(conn)
         raise e
     finally:
         cursor.close()
 
 def find_user_by_email_for_auth(email):
-    """Busca um usuário pelo email, incluindo a senha para autenticação."""
+    """
+    Busca um usuário ativo pelo email, incluindo a senha e o nome do perfil,
+    numa única consulta (índice em usuario.email).
+    """
     conn = get_db_connection()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
-    sql = "SELECT id, nome, cpf, email, senha, perfil_id FROM usuario WHERE email = %s"
+    sql = """
+        SELECT u.id, u.nome, u.cpf, u.email, u.senha, u.perfil_id, u.token_versao, p.nome AS perfil_nome
+        FROM usuario u
+        LEFT JOIN perfil p ON u.perfil_id = p.id
+        WHERE u.email = %s AND u.ativo = TRUE
+    """
     cursor.execute(sql, (email,))
     user = cursor.fetchone()
     cursor.close()
-    return user
\ No newline at end of file
+    return user
+
+def find_user_profile(user_id):
+    """
+    Dados de /auth/profile (usuário ativo + nome do perfil). Fica em cache
+    por usuário; na falta, uma única consulta com o perfil.
+    """
+    user_id = int(user_id)
+    cached = _profile_cache.get(user_id)
+    if cached is not None:
+        return dict(cached)
+
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    sql = """
+        SELECT u.id, u.nome, u.email, u.perfil_id, p.nome AS perfil_nome
+        FROM usuario u
+        LEFT JOIN perfil p ON u.perfil_id = p.id
+        WHERE u.id = %s AND u.ativo = TRUE
+    """
+    cursor.execute(sql, (user_id,))
+    user = cursor.fetchone()
+    cursor.close()
+    if user is None:
+        return None
+    _profile_cache.set(user_id, dict(user))
+    return dict(user)
+
+def get_token_version(user_id, refresh=False):
+    """
+    Versão atual dos tokens do usuário, ou None se ele estiver inativo ou
+    não existir. Fica em cache por alguns segundos (TOKEN_VERSION_CACHE_TTL);
+    `refresh` ignora o cache.
+    """
+    user_id = int(user_id)
+    version = None if refresh else _token_version_cache.get(user_id)
+    if version is None:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT token_versao FROM usuario WHERE id = %s AND ativo = TRUE", (user_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        version = row[0] if row else -1
+        _token_version_cache.set(user_id, version)
+    return None if version < 0 else version
@@ -0,0 +1,42 @@
+from flask import Blueprint, request, jsonify
+from app import db, pagination
+from app.auth_decorators import admin_required
+from app.repository import job_run_repo
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+@bp.route('/db-pool', methods=['GET'])
+@admin_required()
+def db_pool_stats():
+    """Métricas do pool de conexões deste worker (uso, espera e latência de retirada)."""
+    return jsonify(db.get_pool_stats()), 200
+
+@bp.route('/job-runs', methods=['GET'])
+@admin_required()
+def list_job_runs():
+    """Histórico das tarefas agendadas, mais recentes primeiro (?job=, ?status=)."""
+    filters = {k: request.args.get(k) for k in ('job', 'status') if request.args.get(k)}
+    if filters.get('status') and filters['status'] not in job_run_repo.STATUS:
+        return jsonify({'error': f"Status inválido. Use um de: {', '.join(job_run_repo.STATUS)}."}), 400
+
+    try:
+        page, per_page, after, count = pagination.parse_page_args(request.args)
+        after_key = pagination.decode_cursor(after, 'id:DESC', key_types=(int,)) if after else None
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+
+    runs, page_info = job_run_repo.get_all_job_runs(
+        filters=filters,
+        limit=per_page,
+        offset=(page - 1) * per_page,
+        after=after_key,
+        count=count
+    )
+
+    return jsonify({
+        'data': runs,
+        'pagination': pagination.build_pagination(
+            page_info, runs, page, per_page, after, 'id:DESC',
+            lambda item: [item['id']]
+        )
+    }), 200
@@ -3,7 +3,7 @@ import os
 from flask import Blueprint, send_from_directory, current_app, abort, jsonify
 from app.repository import arquivo_repo
 from flask_jwt_extended import jwt_required
-from app.auth_decorators import admin_required
+from app.auth_decorators import admin_required, contrato_membership
 
 bp = Blueprint('arquivos', __name__, url_prefix='/arquivos')
 
@@ -16,6 +16,10 @@ def download_file(arquivo_id):
         if not arquivo or not arquivo.get('path_armazenamento'):
             abort(404, description="Arquivo não encontrado no banco de dados.")
 
+        erro = contrato_membership(arquivo['contrato_id'], 'gestor', 'fiscal', 'fiscal_substituto')
+        if erro is not None:
+            return erro
+
         path_completo = arquivo['path_armazenamento']
         nome_original = arquivo['nome_arquivo']
         
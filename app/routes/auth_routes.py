@@ -1,13 +1,12 @@
 # app/routes/auth_routes.py
 from flask import Blueprint, request, jsonify
-from werkzeug.security import check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity
-from app.repository import usuario_repo, perfil_repo
+from app.repository import usuario_repo
+from app import token_revocation
+from app.password_hashing import verify_and_update, HashingBusy
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
-BLACKLIST = set()
-
 @bp.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -18,14 +17,30 @@ def login():
     senha = data['senha']
 
     usuario = usuario_repo.find_user_by_email_for_auth(email)
+    if not usuario:
+        return jsonify({"error": "Credenciais inválidas"}), 401
 
-    if not usuario or not check_password_hash(usuario['senha'], senha):
+    try:
+        senha_ok, novo_hash = verify_and_update(usuario['senha'], senha)
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503
+    if not senha_ok:
         return jsonify({"error": "Credenciais inválidas"}), 401
 
-    perfil = perfil_repo.find_perfil_by_id(usuario['perfil_id'])
-    perfil_nome = perfil['nome'] if perfil else 'Desconhecido'
+    if novo_hash:
+        # Hash com método/custo antigo: atualiza sem invalidar os tokens do usuário
+        usuario_repo.rehash_password(usuario['id'], usuario['senha'], novo_hash)
+
+    perfil_nome = usuario['perfil_nome'] or 'Desconhecido'
 
-    additional_claims = {"perfil": perfil_nome}
+    # O token já leva os dados do perfil; o frontend pode lê-los sem chamar /auth/profile
+    additional_claims = {
+        "perfil": perfil_nome,
+        "perfil_id": usuario['perfil_id'],
+        "nome": usuario['nome'],
+        "email": usuario['email'],
+        "ver": usuario['token_versao'],
+    }
     access_token = create_access_token(identity=str(usuario['id']), additional_claims=additional_claims)
 
     return jsonify({
@@ -40,28 +55,27 @@ def login():
 @bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    jti = get_jwt()['jti']
-    BLACKLIST.add(jti)
+    token_revocation.revoke_token(get_jwt())
     return jsonify({"msg": "Logout bem-sucedido"}), 200
 
 @bp.route('/profile', methods=['GET'])
 @jwt_required()
 def profile():
     current_user_id = get_jwt_identity()
-    usuario = usuario_repo.find_user_by_id(current_user_id)
+
+    # Cadastro em cache (sem consulta na maioria das chamadas): confirma que o
+    # usuário segue ativo e reflete alterações feitas depois da emissão do token
+    usuario = usuario_repo.find_user_profile(current_user_id)
 
     if not usuario:
         return jsonify({'error': 'Usuário não encontrado'}), 404
-        
-    perfil = perfil_repo.find_perfil_by_id(usuario['perfil_id'])
-    perfil_nome = perfil['nome'] if perfil else 'Desconhecido'
-    
+
     perfil_info = {
         'id': usuario['id'],
         'nome': usuario['nome'],
         'email': usuario['email'],
-        'perfil': perfil_nome,
-        'ativo': True 
+        'perfil': usuario['perfil_nome'] or 'Desconhecido',
+        'ativo': True
     }
 
     return jsonify(perfil_info), 200
\ No newline at end of file
@@ -1,9 +1,9 @@
 # app/routes/contratado_routes.py
 from flask import Blueprint, request, jsonify
+from app import pagination
 from app.repository import contratado_repo, contrato_repo
 from flask_jwt_extended import jwt_required
 from app.auth_decorators import admin_required
-import math
 
 bp = Blueprint('contratados', __name__, url_prefix='/contratados')
 
@@ -35,31 +35,27 @@ def list_all():
         filters['nome'] = nome_query
     
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-    except (ValueError, TypeError):
-        return jsonify({'error': 'Parâmetros de paginação inválidos. Devem ser números inteiros.'}), 400
+        page, per_page, after, count = pagination.parse_page_args(request.args)
+        after_key = pagination.decode_cursor(after, 'nome:ASC') if after else None
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
 
-    page = max(1, page)
-    per_page = max(1, per_page)
     offset = (page - 1) * per_page
     
-    contratados, total_items = contratado_repo.get_all_contratados(
+    contratados, page_info = contratado_repo.get_all_contratados(
         filters=filters,
         limit=per_page,
-        offset=offset
+        offset=offset,
+        after=after_key,
+        count=count
     )
-    
-    total_pages = math.ceil(total_items / per_page) if total_items > 0 else 1
 
     return jsonify({
         'data': contratados,
-        'pagination': {
-            'total_items': total_items,
-            'total_pages': total_pages,
-            'current_page': page,
-            'per_page': per_page
-        }
+        'pagination': pagination.build_pagination(
+            page_info, contratados, page, per_page, after, 'nome:ASC',
+            lambda item: [item['nome'], item['id']]
+        )
     }), 200
 
 @bp.route('/<int:id>', methods=['GET'])
@@ -92,8 +88,8 @@ def delete(id):
     if contratado_repo.find_contratado_by_id(id) is None:
         return jsonify({'error': 'Contratado não encontrado'}), 404
 
-    contratos_associados, total_items = contrato_repo.get_all_contratos(filters={'contratado_id': id})
-    if total_items > 0:
+    contratos_associados, _ = contrato_repo.get_all_contratos(filters={'contratado_id': id}, count='none')
+    if contratos_associados:
         return jsonify({
             'error': 'Este contratado não pode ser excluído pois está associado a um ou mais contratos.',
             'contratos': [{'id': c['id'], 'nr_contrato': c['nr_contrato']} for c in contratos_associados]
@@ -1,11 +1,12 @@
 # app/routes/contrato_routes.py
-import math
 import os
+from datetime import date
 from flask import Blueprint, request, jsonify, current_app
-from app.email_utils import send_email
+from app import pagination
+from app.email_outbox import enqueue_notification
 from app.repository import contrato_repo, contratado_repo, modalidade_repo, relatorio_repo, status_repo, usuario_repo, arquivo_repo
 from flask_jwt_extended import jwt_required
-from app.auth_decorators import admin_required
+from app.auth_decorators import admin_required, current_scope
 
 from .relatorio_routes import _handle_file_upload 
 
@@ -41,31 +42,9 @@ def create():
     
     try:
         new_contrato = contrato_repo.create_contrato(data)
-        
-       
-        subject_gestor = "Você foi designado como Gestor de um novo contrato"
-        body_gestor = f"""
-        Olá, {gestor['nome']},
-
-        Você foi designado como gestor do seguinte contrato:
-        - Número: {new_contrato.get('nr_contrato')}
-        - Objeto: {new_contrato.get('objeto')}
-
-        Por favor, acesse o sistema SIGESCON para mais detalhes.
-        """
-        send_email(gestor['email'], subject_gestor, body_gestor)
-
-        subject_fiscal = "Você foi designado como Fiscal de um novo contrato"
-        body_fiscal = f"""
-        Olá, {fiscal['nome']},
-
-        Você foi designado como fiscal do seguinte contrato:
-        - Número: {new_contrato.get('nr_contrato')}
-        - Objeto: {new_contrato.get('objeto')}
-
-        Por favor, acesse o sistema SIGESCON para mais detalhes.
-        """
-        send_email(fiscal['email'], subject_fiscal, body_fiscal)
+
+        enqueue_notification(gestor['email'], 'contrato_designacao', nome=gestor['nome'], papel='Gestor', contrato=new_contrato)
+        enqueue_notification(fiscal['email'], 'contrato_designacao', nome=fiscal['nome'], papel='Fiscal', contrato=new_contrato)
         
         # A lógica de upload continua a mesma, pois só será acionada por requisições form-data
         if 'documentos_contrato' in request.files:
@@ -101,62 +80,95 @@ def create():
 @bp.route('', methods=['GET'])
 @jwt_required()
 def list_all():
-    filters = {
-        'gestor_id': request.args.get('gestor_id'),
-        'fiscal_id': request.args.get('fiscal_id'),
-        'objeto': request.args.get('objeto'),
-        'nr_contrato': request.args.get('nr_contrato'),
-        'status_id': request.args.get('status_id'),
-        'pae': request.args.get('pae'),
-        'ano': request.args.get('ano')
-    }
-    active_filters = {k: v for k, v in filters.items() if v is not None}
-
     sort_by = request.args.get('sortBy', 'data_fim')
     order = request.args.get('order', 'desc').upper()
 
-    allowed_sort_fields = {'data_inicio', 'data_fim'}
-    if sort_by not in allowed_sort_fields:
+    if sort_by not in contrato_repo.SORT_FIELDS:
         sort_by = 'data_fim'
 
     if order not in ['ASC', 'DESC']:
         order = 'DESC'
     
-    order_by_clause = f"c.{sort_by} {order}"
+    sort_spec = f"{sort_by}:{order}"
     
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-    except (ValueError, TypeError):
-        return jsonify({'error': 'Parâmetros de paginação inválidos. Devem ser números inteiros.'}), 400
+        page, per_page, after, count = pagination.parse_page_args(request.args)
+        after_key = pagination.decode_cursor(after, sort_spec) if after else None
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+
+    if after_key is not None:
+        try:
+            date.fromisoformat(after_key[0])
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Cursor de paginação inválido.'}), 400
 
-    page = max(1, page)
-    per_page = max(1, per_page)
     offset = (page - 1) * per_page
     
-    contratos, total_items = contrato_repo.get_all_contratos(
-        filters=active_filters,
-        order_by=order_by_clause,
-        limit=per_page,
-        offset=offset
-    )
-    
-    total_pages = math.ceil(total_items / per_page) if total_items > 0 else 1
+    # Os filtros aceitos (e seus formatos) estão declarados em contrato_repo.FILTERS
+    try:
+        contratos, page_info = contrato_repo.get_all_contratos(
+            filters=request.args,
+            sort_by=sort_by,
+            order=order,
+            limit=per_page,
+            offset=offset,
+            after=after_key,
+            count=count,
+            scope=current_scope()
+        )
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
 
     return jsonify({
         'data': contratos,
-        'pagination': {
-            'total_items': total_items,
-            'total_pages': total_pages,
-            'current_page': page,
-            'per_page': per_page
-        }
+        'pagination': pagination.build_pagination(
+            page_info, contratos, page, per_page, after, sort_spec,
+            lambda c: [c[sort_by], c['id']]
+        )
+    }), 200
+
+@bp.route('/busca', methods=['GET'])
+@jwt_required()
+def search():
+    """Busca textual ranqueada em contratos: ?q=termos&page=&per_page="""
+    termo = (request.args.get('q') or '').strip()
+    if not termo:
+        return jsonify({'error': 'Informe o termo de busca no parâmetro "q".'}), 400
+    if len(termo) > 200:
+        return jsonify({'error': 'O termo de busca deve ter no máximo 200 caracteres.'}), 400
+
+    try:
+        page, per_page, _, _ = pagination.parse_page_args(request.args)
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+
+    contratos, page_info = contrato_repo.search_contratos(
+        termo, limit=per_page, offset=(page - 1) * per_page, scope=current_scope()
+    )
+    return jsonify({
+        'data': contratos,
+        'pagination': pagination.build_pagination(page_info, contratos, page, per_page)
     }), 200
 
 @bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
 def get_by_id(id):
-    contrato = contrato_repo.find_contrato_by_id(id)
+    # ?include=relatorios,pendencias,arquivos monta o contrato completo numa única consulta
+    include_param = request.args.get('include')
+    if include_param is not None:
+        include = {item.strip() for item in include_param.split(',') if item.strip()}
+        invalidos = include - set(contrato_repo.DETALHE_INCLUDES)
+        if invalidos:
+            return jsonify({'error': f'Valores inválidos em include: {", ".join(sorted(invalidos))}. '
+                                     f'Permitidos: {", ".join(contrato_repo.DETALHE_INCLUDES)}'}), 400
+
+        contrato = contrato_repo.find_contrato_detalhado(id, include, scope=current_scope())
+        if not contrato:
+            return jsonify({'error': 'Contrato não encontrado'}), 404
+        return jsonify(contrato), 200
+
+    contrato = contrato_repo.find_contrato_by_id(id, scope=current_scope())
     if not contrato:
         return jsonify({'error': 'Contrato não encontrado'}), 404
     
@@ -217,7 +229,7 @@ def delete(id):
 @bp.route('/<int:contrato_id>/arquivos', methods=['GET'])
 @jwt_required()
 def list_contract_files(contrato_id):
-    if contrato_repo.find_contrato_by_id(contrato_id) is None:
+    if not contrato_repo.contrato_exists(contrato_id, scope=current_scope()):
         return jsonify({'error': 'Contrato não encontrado'}), 404
     
     try:
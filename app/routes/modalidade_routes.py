@@ -1,8 +1,10 @@
 # app/routes/modalidade_routes.py
 from flask import Blueprint, request, jsonify
-from app.repository import modalidade_repo, contrato_repo
+from app.repository import modalidade_repo, contrato_repo, lembrete_repo
 from flask_jwt_extended import jwt_required
 from app.auth_decorators import admin_required
+from app import cache
+from app.http_cache import conditional_json
 
 bp = Blueprint('modalidades', __name__, url_prefix='/modalidades')
 
@@ -22,8 +24,7 @@ def create():
 @bp.route('', methods=['GET'])
 @jwt_required()
 def list_all():
-    items = modalidade_repo.get_all_modalidades()
-    return jsonify(items), 200
+    return conditional_json(cache.modalidades.version(), modalidade_repo.get_all_modalidades)
 
 @bp.route('/<int:id>', methods=['PATCH'])
 @admin_required()
@@ -41,13 +42,53 @@ def update(id):
     except Exception as e:
         return jsonify({'error': f'Erro ao atualizar modalidade: {e}'}), 409
 
+@bp.route('/<int:id>/lembretes', methods=['GET'])
+@jwt_required()
+def get_lembretes(id):
+    """Política de lembretes de prazo da modalidade (dias antes do prazo)."""
+    modalidade = modalidade_repo.find_modalidade_by_id(id)
+    if modalidade is None:
+        return jsonify({'error': 'Modalidade não encontrada'}), 404
+    dias = modalidade.get('dias_lembrete')
+    return jsonify({
+        'modalidade_id': id,
+        'dias_antes': dias if dias is not None else lembrete_repo.DIAS_LEMBRETE_PADRAO,
+        'padrao': dias is None,
+    }), 200
+
+@bp.route('/<int:id>/lembretes', methods=['PUT'])
+@admin_required()
+def update_lembretes(id):
+    """
+    Define em quantos dias antes do prazo o fiscal é lembrado das pendências
+    dos contratos desta modalidade. {"dias_antes": null} volta ao padrão.
+    """
+    data = request.get_json()
+    if not data or 'dias_antes' not in data:
+        return jsonify({'error': 'O campo "dias_antes" é obrigatório'}), 400
+    dias = data['dias_antes']
+    if dias is not None:
+        if (not isinstance(dias, list) or not dias
+                or not all(isinstance(d, int) and not isinstance(d, bool) and 0 <= d <= 365 for d in dias)):
+            return jsonify({'error': '"dias_antes" deve ser uma lista de inteiros entre 0 e 365'}), 400
+        dias = sorted(set(dias), reverse=True)
+
+    if modalidade_repo.find_modalidade_by_id(id) is None:
+        return jsonify({'error': 'Modalidade não encontrada'}), 404
+
+    try:
+        updated_item = modalidade_repo.update_dias_lembrete(id, dias)
+        return jsonify(updated_item), 200
+    except Exception as e:
+        return jsonify({'error': f'Erro ao atualizar os lembretes da modalidade: {e}'}), 500
+
 @bp.route('/<int:id>', methods=['DELETE'])
 @admin_required()
 def delete(id):
     if modalidade_repo.find_modalidade_by_id(id) is None:
         return jsonify({'error': 'Modalidade não encontrada'}), 404
 
-    contratos_associados, _ = contrato_repo.get_all_contratos(filters={'modalidade_id': id})
+    contratos_associados, _ = contrato_repo.get_all_contratos(filters={'modalidade_id': id}, count='none')
     if contratos_associados:
         return jsonify({
             'error': 'Esta modalidade não pode ser excluída pois está associada a um ou mais contratos.',
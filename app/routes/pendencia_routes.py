@@ -1,9 +1,9 @@
 # app/routes/pendencia_routes.py
 from flask import Blueprint, request, jsonify
-from app.email_utils import send_email
+from app.email_outbox import enqueue_notification
 from app.repository import pendencia_repo, contrato_repo, usuario_repo, status_pendencia_repo
 from flask_jwt_extended import jwt_required
-from app.auth_decorators import admin_required
+from app.auth_decorators import admin_required, current_scope
 
 bp = Blueprint('pendencias', __name__, url_prefix='/contratos/<int:contrato_id>/pendencias')
 
@@ -18,16 +18,13 @@ def create(contrato_id):
         if field not in data:
             return jsonify({'error': f'O campo "{field}" é obrigatório'}), 400
 
-    if contrato_repo.find_contrato_by_id(contrato_id) is None:
+    contrato = contrato_repo.find_contrato_by_id(contrato_id)
+    if not contrato:
         return jsonify({'error': 'Contrato não encontrado'}), 404
     if usuario_repo.find_user_by_id(data['criado_por_usuario_id']) is None:
         return jsonify({'error': 'Usuário criador não encontrado'}), 404
     if status_pendencia_repo.find_statuspendencia_by_id(data['status_pendencia_id']) is None:
         return jsonify({'error': 'Status de pendência não encontrado'}), 404
-
-    contrato = contrato_repo.find_contrato_by_id(contrato_id)
-    if not contrato:
-        return jsonify({'error': 'Contrato não encontrado'}), 404
     
     try:
         new_pendencia = pendencia_repo.create_pendencia(contrato_id, data)
@@ -35,18 +32,8 @@ def create(contrato_id):
         # --- IMPLEMENTAÇÃO DO EMAIL ---
         fiscal = usuario_repo.find_user_by_id(contrato['fiscal_id'])
         if fiscal:
-            subject = "Nova pendência de relatório registrada para você"
-            body = f"""
-            Olá, {fiscal['nome']},
-
-            Uma nova pendência de relatório foi registrada para o contrato '{contrato['nr_contrato']}':
-
-            - Descrição: {new_pendencia['descricao']}
-            - Prazo para envio: {new_pendencia['data_prazo'].strftime('%d/%m/%Y')}
-
-            Por favor, acesse o sistema para submeter o relatório.
-            """
-            send_email(fiscal['email'], subject, body)
+            enqueue_notification(fiscal['email'], 'pendencia_nova', nome=fiscal['nome'],
+                                 contrato=contrato, pendencia=new_pendencia)
         # --- IMPLEMENTAÇÃO DO EMAIL ---
         return jsonify(new_pendencia), 201
     except Exception as e:
@@ -56,7 +43,7 @@ def create(contrato_id):
 @jwt_required()
 def list_all(contrato_id):
     """Lista todas as pendências do contrato especificado na URL."""
-    if contrato_repo.find_contrato_by_id(contrato_id) is None:
+    if not contrato_repo.contrato_exists(contrato_id, scope=current_scope()):
         return jsonify({'error': 'Contrato não encontrado'}), 404
         
     pendencias = pendencia_repo.get_pendencias_by_contrato_id(contrato_id)
@@ -3,6 +3,8 @@ from flask import Blueprint, request, jsonify
 from app.repository import perfil_repo
 from flask_jwt_extended import jwt_required
 from app.auth_decorators import admin_required
+from app import cache
+from app.http_cache import conditional_json
 
 bp = Blueprint('perfis', __name__, url_prefix='/perfis')
 
@@ -21,5 +23,4 @@ def create():
 @bp.route('', methods=['GET'])
 @jwt_required()
 def list_all():
-    items = perfil_repo.get_all_perfis()
-    return jsonify(items), 200
\ No newline at end of file
+    return conditional_json(cache.perfis.version(), perfil_repo.get_all_perfis)
\ No newline at end of file
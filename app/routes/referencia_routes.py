@@ -0,0 +1,23 @@
+# app/routes/referencia_routes.py
+from flask import Blueprint
+from flask_jwt_extended import jwt_required
+from app import cache
+from app.http_cache import conditional_json
+
+bp = Blueprint('referencias', __name__, url_prefix='/referencias')
+
+@bp.route('', methods=['GET'])
+@jwt_required()
+def list_all():
+    """
+    Todas as tabelas de apoio num único payload, com uma versão combinada
+    (também enviada como ETag) para o frontend carregar tudo de uma vez.
+    """
+    versao = cache.combined_version()
+
+    def build_payload():
+        payload = {name: table.all() for name, table in cache.LOOKUP_TABLES.items()}
+        payload['versao'] = versao
+        return payload
+
+    return conditional_json(versao, build_payload)
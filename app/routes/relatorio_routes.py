@@ -5,8 +5,8 @@ from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from app.repository import relatorio_repo, arquivo_repo, contrato_repo, status_pendencia_repo, usuario_repo, status_relatorio_repo, pendencia_repo
 from flask_jwt_extended import jwt_required
-from app.auth_decorators import admin_required, fiscal_required
-from app.email_utils import send_email
+from app.auth_decorators import admin_required, fiscal_required, current_scope, contrato_member_required
+from app.email_outbox import enqueue_notification
 
 bp = Blueprint('relatorios', __name__, url_prefix='/contratos/<int:contrato_id>/relatorios')
 
@@ -38,10 +38,8 @@ def _handle_file_upload(contrato_id, file):
 
 @bp.route('', methods=['POST'])
 @fiscal_required()
+@contrato_member_required('fiscal', 'fiscal_substituto')
 def submit_relatorio(contrato_id):
-    if contrato_repo.find_contrato_by_id(contrato_id) is None:
-        return jsonify({'error': 'Contrato não encontrado'}), 404
-        
     form_data = request.form
     
     if 'pendencia_id' not in form_data:
@@ -95,8 +93,10 @@ def submit_relatorio(contrato_id):
 
 @bp.route('/<int:relatorio_id>', methods=['PUT'])
 @fiscal_required()
+@contrato_member_required('fiscal', 'fiscal_substituto')
 def reenviar_relatorio(contrato_id, relatorio_id):
-    if relatorio_repo.find_relatorio_by_id(relatorio_id) is None:
+    relatorio = relatorio_repo.find_relatorio_by_id(relatorio_id)
+    if relatorio is None or relatorio['contrato_id'] != contrato_id:
         return jsonify({'error': 'Relatório a ser atualizado não encontrado'}), 404
     
     if 'arquivo' not in request.files:
@@ -163,18 +163,9 @@ def analisar_relatorio(contrato_id, relatorio_id):
             contrato = contrato_repo.find_contrato_by_id(contrato_id)
 
             if fiscal and contrato:
-                subject = f"Relatório Rejeitado - Contrato {contrato['nr_contrato']}"
-                body = f"""
-                Olá, {fiscal['nome']},
-
-                O seu relatório referente ao mês de competência {relatorio_original['mes_competencia'].strftime('%m/%Y')} para o contrato '{contrato['nr_contrato']}' foi rejeitado.
-
-                Motivo da rejeição:
-                "{relatorio_atualizado['observacoes_aprovador']}"
-
-                Por favor, realize as correções necessárias e reenvie o relatório através do sistema.
-                """
-                send_email(fiscal['email'], subject, body)
+                enqueue_notification(fiscal['email'], 'relatorio_rejeitado', nome=fiscal['nome'],
+                                     contrato=contrato, relatorio=relatorio_original,
+                                     observacoes=relatorio_atualizado['observacoes_aprovador'])
         
         return jsonify(relatorio_atualizado), 200
     except Exception as e:
@@ -184,7 +175,7 @@ def analisar_relatorio(contrato_id, relatorio_id):
 @jwt_required()
 def list_relatorios(contrato_id):
     """Lista todos os relatórios de um contrato específico."""
-    if contrato_repo.find_contrato_by_id(contrato_id) is None:
+    if not contrato_repo.contrato_exists(contrato_id, scope=current_scope()):
         return jsonify({'error': 'Contrato não encontrado'}), 404
     
     try:
@@ -3,6 +3,8 @@ from flask import Blueprint, request, jsonify
 from app.repository import status_pendencia_repo
 from flask_jwt_extended import jwt_required
 from app.auth_decorators import admin_required
+from app import cache
+from app.http_cache import conditional_json
 
 bp = Blueprint('statuspendencia', __name__, url_prefix='/statuspendencia')
 
@@ -21,5 +23,4 @@ def create():
 @bp.route('', methods=['GET'])
 @jwt_required()
 def list_all():
-    items = status_pendencia_repo.get_all_statuspendencia()
-    return jsonify(items), 200
\ No newline at end of file
+    return conditional_json(cache.status_pendencia.version(), status_pendencia_repo.get_all_statuspendencia)
\ No newline at end of file
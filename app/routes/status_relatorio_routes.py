@@ -3,6 +3,8 @@ from flask import Blueprint, request, jsonify
 from app.repository import status_relatorio_repo
 from flask_jwt_extended import jwt_required
 from app.auth_decorators import admin_required
+from app import cache
+from app.http_cache import conditional_json
 
 bp = Blueprint('statusrelatorio', __name__, url_prefix='/statusrelatorio')
 
@@ -22,5 +24,4 @@ def create():
 @bp.route('', methods=['GET'])
 @jwt_required()
 def list_all():
-    items = status_relatorio_repo.get_all_statusrelatorio()
-    return jsonify(items), 200
\ No newline at end of file
+    return conditional_json(cache.status_relatorio.version(), status_relatorio_repo.get_all_statusrelatorio)
\ No newline at end of file
@@ -3,6 +3,8 @@ from flask import Blueprint, request, jsonify
 from app.repository import status_repo, contrato_repo
 from flask_jwt_extended import jwt_required
 from app.auth_decorators import admin_required
+from app import cache
+from app.http_cache import conditional_json
 
 bp = Blueprint('status', __name__, url_prefix='/status')
 
@@ -21,8 +23,7 @@ def create():
 @bp.route('', methods=['GET'])
 @jwt_required()
 def list_all():
-    items = status_repo.get_all_status()
-    return jsonify(items), 200
+    return conditional_json(cache.status.version(), status_repo.get_all_status)
 
 @bp.route('/<int:id>', methods=['PATCH'])
 @admin_required()
@@ -46,7 +47,7 @@ def delete(id):
     if status_repo.find_status_by_id(id) is None:
         return jsonify({'error': 'Status não encontrado'}), 404
 
-    contratos_associados, _ = contrato_repo.get_all_contratos(filters={'status_id': id})
+    contratos_associados, _ = contrato_repo.get_all_contratos(filters={'status_id': id}, count='none')
     if contratos_associados:
         return jsonify({
             'error': 'Este status não pode ser excluído pois está associado a um ou mais contratos.',
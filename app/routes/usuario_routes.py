@@ -1,10 +1,10 @@
 # app/routes/usuario_routes.py
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from app import pagination
+from app.password_hashing import hash_password, verify_password, HashingBusy
 from app.repository import usuario_repo
 from flask_jwt_extended import jwt_required, get_jwt
-from app.auth_decorators import admin_required
-import math
+from app.auth_decorators import admin_required, current_scope
 
 bp = Blueprint('usuarios', __name__, url_prefix='/usuarios')
 
@@ -17,7 +17,10 @@ def create():
     
     nome, email, senha = data['nome'], data['email'], data['senha']
     cpf, matricula, perfil_id = data.get('cpf'), data.get('matricula'), data.get('perfil_id', 1)
-    senha_hash = generate_password_hash(senha)
+    try:
+        senha_hash = hash_password(senha)
+    except HashingBusy as e:
+        return jsonify({'error': str(e)}), 503
 
     try:
         new_user = usuario_repo.create_user(nome, email, cpf, matricula, senha_hash, perfil_id)
@@ -34,31 +37,27 @@ def list_all():
         filters['nome'] = nome_query
         
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-    except (ValueError, TypeError):
-        return jsonify({'error': 'Parâmetros de paginação inválidos. Devem ser números inteiros.'}), 400
+        page, per_page, after, count = pagination.parse_page_args(request.args)
+        after_key = pagination.decode_cursor(after, 'nome:ASC') if after else None
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
 
-    page = max(1, page)
-    per_page = max(1, per_page)
     offset = (page - 1) * per_page
     
-    users, total_items = usuario_repo.get_all_users(
+    users, page_info = usuario_repo.get_all_users(
         filters=filters,
         limit=per_page,
-        offset=offset
+        offset=offset,
+        after=after_key,
+        count=count
     )
-    
-    total_pages = math.ceil(total_items / per_page) if total_items > 0 else 1
 
     return jsonify({
         'data': users,
-        'pagination': {
-            'total_items': total_items,
-            'total_pages': total_pages,
-            'current_page': page,
-            'per_page': per_page
-        }
+        'pagination': pagination.build_pagination(
+            page_info, users, page, per_page, after, 'nome:ASC',
+            lambda item: [item['nome'], item['id']]
+        )
     }), 200
 
 @bp.route('/<int:id>', methods=['GET'])
@@ -78,7 +77,10 @@ def update(id):
     if usuario_repo.find_user_by_id(id) is None:
         return jsonify({'error': 'Usuário não encontrado'}), 404
     if 'senha' in data and data['senha']:
-        data['senha'] = generate_password_hash(data['senha'])
+        try:
+            data['senha'] = hash_password(data['senha'])
+        except HashingBusy as e:
+            return jsonify({'error': str(e)}), 503
     try:
         updated_user = usuario_repo.update_user(id, data)
         return jsonify(updated_user), 200
@@ -96,6 +98,42 @@ def delete(id):
     except Exception as e:
         return jsonify({'error': f'Erro ao deletar usuário: {e}'}), 500
 
+def _pode_alterar(id):
+    scope = current_scope()
+    return scope['usuario_id'] == id or scope['perfil'] == 'Administrador'
+
+@bp.route('/<int:id>/lembretes', methods=['GET'])
+@jwt_required()
+def get_lembretes(id):
+    """Como o usuário recebe os lembretes de prazo: 'resumo' ou 'individual'."""
+    if not _pode_alterar(id):
+        return jsonify({'error': 'Acesso restrito ao próprio usuário e a administradores'}), 403
+    preferencia = usuario_repo.find_preferencia_lembrete(id)
+    if preferencia is None:
+        return jsonify({'error': 'Usuário não encontrado'}), 404
+    return jsonify({'usuario_id': id, 'preferencia': preferencia}), 200
+
+@bp.route('/<int:id>/lembretes', methods=['PUT'])
+@jwt_required()
+def update_lembretes(id):
+    """
+    {"preferencia": "resumo"} junta os lembretes do dia num único e-mail;
+    "individual" envia um e-mail por pendência. O próprio usuário ou um
+    administrador podem alterar.
+    """
+    if not _pode_alterar(id):
+        return jsonify({'error': 'Acesso restrito ao próprio usuário e a administradores'}), 403
+    data = request.get_json()
+    if not data or data.get('preferencia') not in usuario_repo.PREFERENCIAS_LEMBRETE:
+        return jsonify({'error': '"preferencia" deve ser "resumo" ou "individual"'}), 400
+    if usuario_repo.find_user_by_id(id) is None:
+        return jsonify({'error': 'Usuário não encontrado'}), 404
+    try:
+        usuario_repo.update_preferencia_lembrete(id, data['preferencia'])
+        return jsonify({'usuario_id': id, 'preferencia': data['preferencia']}), 200
+    except Exception as e:
+        return jsonify({'error': f'Erro ao atualizar a preferência de lembretes: {e}'}), 500
+
 @bp.route('/<int:id>/resetar-senha', methods=['PATCH'])
 @admin_required()
 def admin_reset_password(id):
@@ -107,9 +145,12 @@ def admin_reset_password(id):
         return jsonify({'error': 'Usuário não encontrado'}), 404
     
     try:
-        nova_senha_hash = generate_password_hash(data['nova_senha'])
-        usuario_repo.update_password(id, nova_senha_hash)
+        nova_senha_hash = hash_password(data['nova_senha'])
+        # As sessões abertas com a senha antiga são encerradas
+        usuario_repo.update_password(id, nova_senha_hash, revoke_tokens=True)
         return jsonify({'message': 'Senha resetada com sucesso pelo administrador.'}), 200
+    except HashingBusy as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': f'Erro ao resetar senha: {e}'}), 500
 
@@ -125,12 +166,14 @@ def user_change_password(id):
         if user is None:
             return jsonify({'error': 'Usuário não encontrado'}), 404
 
-        if not check_password_hash(user['senha'], data['senha_antiga']):
+        if not verify_password(user['senha'], data['senha_antiga']):
             return jsonify({'error': 'Senha antiga incorreta'}), 401
         
-        nova_senha_hash = generate_password_hash(data['nova_senha'])
+        nova_senha_hash = hash_password(data['nova_senha'])
         usuario_repo.update_password(id, nova_senha_hash)
         
         return jsonify({'message': 'Senha alterada com sucesso.'}), 200
+    except HashingBusy as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': f'Erro ao alterar senha: {e}'}), 500
\ No newline at end of file
@@ -0,0 +1,241 @@
+# app/scheduler.py
+"""
+Tarefas agendadas (lembretes de prazo) e a escolha do processo que as roda.
+
+Qualquer número de réplicas idênticas pode executar `flask scheduler`. Todas
+disputam um advisory lock do Postgres (SCHEDULER_LOCK_KEY) numa conexão
+dedicada, e só quem o obtém agenda as tarefas; as demais ficam de reserva,
+tentando de novo a cada SCHEDULER_LEADER_RETRY segundos. O lock é de sessão:
+se o líder morrer ou perder a conexão, o Postgres o libera e uma reserva
+assume. O líder confere a própria conexão no mesmo intervalo e, se ela cair,
+para as tarefas e volta a disputar.
+
+Cada execução roda num contexto de aplicação próprio, com a conexão do pool
+devolvida no teardown. Mesmo que duas réplicas rodem a tarefa juntas (ex.:
+durante uma troca de líder), os lembretes não se repetem:
+lembretes_devidos_por_fiscal usa SKIP LOCKED e o envio é registrado na mesma
+transação que coloca os e-mails na fila.
+
+As tarefas em si são definidas aqui, no código; o que precisa sobreviver a
+reinícios fica no banco. Cada execução é registrada em job_runs (início,
+fim, linhas processadas, e-mails, erro; GET /admin/job-runs), e a agenda de
+lembretes guarda o que falta enviar. Ao assumir, o líder confere em job_runs
+se o horário do dia passou sem execução e, nesse caso, recupera na hora
+todos os dias perdidos numa única consulta.
+"""
+import os
+import socket
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import psycopg2
+from apscheduler.schedulers.background import BackgroundScheduler
+from app import db
+from app.email_outbox import enqueue_email
+from app.email_templates import render_many
+from app.repository import job_run_repo, lembrete_repo
+
+# Chave do advisory lock que elege o agendador ativo
+SCHEDULER_LOCK_KEY = int(os.getenv('SCHEDULER_LOCK_KEY', 7_311_902_002))
+LEADER_RETRY = float(os.getenv('SCHEDULER_LEADER_RETRY', 15))
+TIMEZONE = os.getenv('SCHEDULER_TIMEZONE', 'America/Sao_Paulo')
+
+# Nome da tarefa em job_runs e horário diário
+CHECK_DEADLINES = 'check_deadlines'
+CHECK_DEADLINES_HOUR, CHECK_DEADLINES_MINUTE = 8, 0
+
+# Identifica a réplica em job_runs.executor
+EXECUTOR = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def verificar_prazos(dia):
+    """
+    Coloca na fila os lembretes de prazo devidos até `dia`. A agenda (tabela
+    lembrete_pendencia) é montada quando a pendência é criada; aqui só
+    buscamos os lembretes ainda não enviados, já agrupados por fiscal
+    (usuario.preferencia_lembrete: 'resumo' ou 'individual'). Retorna
+    (lembretes processados, e-mails colocados na fila).
+    """
+    lembrete_repo.descartar_obsoletos(dia)
+    fiscais = lembrete_repo.lembretes_devidos_por_fiscal(dia)
+
+    # Um resumo por fiscal com mais de um lembrete no dia, a não ser que
+    # o fiscal prefira um e-mail por pendência
+    resumos = [f for f in fiscais if f['preferencia_lembrete'] == 'resumo' and len(f['lembretes']) > 1]
+    em_resumo = {f['fiscal_id'] for f in resumos}
+    individuais = [(f, l) for f in fiscais if f['fiscal_id'] not in em_resumo for l in f['lembretes']]
+
+    # Modelos compilados uma vez para o lote inteiro
+    emails = render_many('lembrete_resumo', [{'nome': f['fiscal_nome'], 'lembretes': f['lembretes']} for f in resumos])
+    for f, email in zip(resumos, emails):
+        enqueue_email(f['fiscal_email'], email.assunto, email.texto, email.html)
+    emails = render_many('lembrete_prazo', [dict(l, nome=f['fiscal_nome']) for f, l in individuais])
+    for (f, _), email in zip(individuais, emails):
+        enqueue_email(f['fiscal_email'], email.assunto, email.texto, email.html)
+
+    # Confirma os e-mails na fila junto com o registro de envio: rodar de
+    # novo no mesmo dia não repete lembretes
+    lembrete_ids = [i for f in fiscais for l in f['lembretes'] for i in l['lembrete_ids']]
+    lembrete_repo.marcar_enviados(lembrete_ids)
+    return len(lembrete_ids), len(resumos) + len(individuais)
+
+
+def check_deadlines(agendada_para=None, recuperacao=False):
+    """
+    Tarefa diária dos lembretes, registrada em job_runs. Precisa de um
+    contexto de aplicação. O envio em si é do despachante (flask
+    email-dispatcher), em paralelo e com teto de msg/s.
+    """
+    print("Executando verificação de prazos de pendências..." + (" (recuperação)" if recuperacao else ""))
+    inicio = time.monotonic()
+    run_id = job_run_repo.iniciar(CHECK_DEADLINES, agendada_para, recuperacao, EXECUTOR)
+    conn = db.get_db_connection()
+    try:
+        # O dia do agendamento (SCHEDULER_TIMEZONE), não o do relógio do servidor
+        lembretes, emails = verificar_prazos(datetime.now(ZoneInfo(TIMEZONE)).date())
+    except Exception as e:
+        db.rollback(conn)
+        job_run_repo.finalizar(run_id, 'erro', erro=str(e))
+        print(f"ERRO ao executar a verificação de prazos: {e}")
+        return
+    job_run_repo.finalizar(run_id, 'sucesso', lembretes, emails)
+    print(f"{lembretes} lembrete(s) colocado(s) na fila em {emails} e-mail(s) "
+          f"em {time.monotonic() - inicio:.2f}s.")
+
+
+def horario_perdido(agora=None):
+    """
+    True se o horário de hoje da verificação de prazos já passou sem uma
+    execução bem-sucedida (ex.: nenhum agendador ativo às 08:00).
+    """
+    tz = ZoneInfo(TIMEZONE)
+    agora = agora or datetime.now(tz)
+    horario = agora.replace(hour=CHECK_DEADLINES_HOUR, minute=CHECK_DEADLINES_MINUTE, second=0, microsecond=0)
+    if agora < horario:
+        return False
+    ultimo = job_run_repo.ultimo_sucesso(CHECK_DEADLINES)
+    return ultimo is None or ultimo.astimezone(tz) < horario
+
+
+class LeaderLock:
+    """
+    Advisory lock de sessão numa conexão dedicada (fora do pool, que
+    reaproveitaria a sessão em outras transações). Fechar a conexão libera o lock.
+    """
+
+    def __init__(self, key=SCHEDULER_LOCK_KEY):
+        self.key = key
+        self.held = False
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(**db.connection_params())
+            self._conn.autocommit = True
+        return self._conn
+
+    def try_acquire(self):
+        """Tenta virar líder sem esperar. Retorna True se o lock é deste processo."""
+        try:
+            with self._connection().cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.key,))
+                self.held = cursor.fetchone()[0]
+        except psycopg2.Error:
+            self.close()
+        return self.held
+
+    def still_held(self):
+        """O lock dura enquanto a sessão durar: confere se ela continua viva."""
+        if not self.held:
+            return False
+        try:
+            with self._conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except psycopg2.Error:
+            self.close()
+            return False
+
+    def close(self):
+        self.held = False
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+        self._conn = None
+
+
+def _in_app_context(app, job):
+    def run(**kwargs):
+        with app.app_context():
+            job(**kwargs)
+    run.__name__ = job.__name__
+    return run
+
+
+def _check_deadlines_scheduled(app):
+    run = _in_app_context(app, check_deadlines)
+
+    def scheduled():
+        agendada_para = datetime.now(ZoneInfo(TIMEZONE)).replace(
+            hour=CHECK_DEADLINES_HOUR, minute=CHECK_DEADLINES_MINUTE, second=0, microsecond=0)
+        run(agendada_para=agendada_para)
+    return scheduled
+
+
+def start_jobs(app):
+    """
+    Agenda as tarefas num BackgroundScheduler e o inicia. Se o horário de
+    hoje já passou sem execução registrada em job_runs (o agendador estava
+    parado ou em troca de líder), dispara uma recuperação na hora: a
+    consulta dos lembretes pega de uma vez todos os dias em atraso.
+    """
+    scheduler = BackgroundScheduler(timezone=TIMEZONE)
+    # misfire_grace_time=None: um disparo atrasado (processo suspenso, fila
+    # de execução cheia) ainda roda, uma vez só (coalesce)
+    scheduler.add_job(_check_deadlines_scheduled(app), 'cron',
+                      hour=CHECK_DEADLINES_HOUR, minute=CHECK_DEADLINES_MINUTE,
+                      id=CHECK_DEADLINES, max_instances=1, coalesce=True, misfire_grace_time=None)
+    with app.app_context():
+        perdido = horario_perdido()
+    if perdido:
+        scheduler.add_job(_in_app_context(app, check_deadlines), kwargs={'recuperacao': True},
+                          id=f"{CHECK_DEADLINES}_recuperacao", max_instances=1)
+    scheduler.start()
+    return scheduler
+
+
+def run_scheduler(app, log=print):
+    """
+    Disputa a liderança e, enquanto for líder, roda as tarefas agendadas.
+    Bloqueia até ser interrompido.
+    """
+    lock = LeaderLock()
+    scheduler = None
+    waiting = False
+    try:
+        while True:
+            if scheduler is None:
+                if lock.try_acquire():
+                    try:
+                        scheduler = start_jobs(app)
+                    except psycopg2.Error as e:
+                        # Sem consultar job_runs não dá para saber se há dias perdidos
+                        log(f"Erro de banco ao iniciar o agendador: {e}")
+                        lock.close()
+                        time.sleep(LEADER_RETRY)
+                        continue
+                    waiting = False
+                    log(f"Agendador ativo neste processo (pid {os.getpid()}).")
+                elif not waiting:
+                    waiting = True
+                    log(f"Agendador em reserva: outro processo está ativo ou o banco não respondeu "
+                        f"(nova tentativa a cada {LEADER_RETRY:.0f}s).")
+            elif not lock.still_held():
+                scheduler.shutdown(wait=False)
+                scheduler = None
+                log("Conexão do agendador com o banco perdida; tarefas suspensas até recuperar a liderança.")
+                continue
+            time.sleep(LEADER_RETRY)
+    finally:
+        if scheduler is not None:
+            scheduler.shutdown()
+        lock.close()
@@ -1,6 +1,6 @@
 # app/seeder.py
 import os
-from werkzeug.security import generate_password_hash
+from app.password_hashing import hash_password
 from app.db import get_db_connection
 
 
@@ -48,7 +48,7 @@ def seed_data():
             if cursor.fetchone() is None:
                 print(f"Criando usuário Administrador ({admin_email})...")
                 admin_pass = os.getenv('ADMIN_PASSWORD')
-                senha_hash = generate_password_hash(admin_pass)
+                senha_hash = hash_password(admin_pass)
                 
                 # Pega o ID do perfil 'Administrador'
                 cursor.execute("SELECT id FROM perfil WHERE nome = 'Administrador'")
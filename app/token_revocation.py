@@ -0,0 +1,289 @@
+# app/token_revocation.py
+"""
+Revogação de tokens JWT (logout).
+
+Os `jti` revogados ficam num armazenamento compartilhado (Postgres, tabela
+token_revogado) junto com a expiração do token. Cada worker mantém um filtro
+de Bloom com os jti revogados, sincronizado com o banco a cada
+REVOCATION_SYNC_INTERVAL segundos: um token que não está no filtro com
+certeza não foi revogado, então a grande maioria das requisições não faz
+consulta nenhuma. Quando o filtro responde "talvez", a resposta do banco
+fica num LRU local.
+
+Registros expirados são removidos por uma thread em segundo plano.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from app.cache import TTLCache
+from app.db import get_db_connection, get_pool, after_commit
+from app.repository import usuario_repo
+
+REVOCATION_BACKEND = os.getenv('TOKEN_REVOCATION_BACKEND', 'postgres')
+SYNC_INTERVAL = float(os.getenv('REVOCATION_SYNC_INTERVAL', 5))
+PRUNE_INTERVAL = float(os.getenv('REVOCATION_PRUNE_INTERVAL', 3600))
+BLOOM_CAPACITY = int(os.getenv('REVOCATION_BLOOM_CAPACITY', 100000))
+
+# A sincronização incremental relê uma janela para trás: uma transação que
+# começou antes da última leitura pode ter sido confirmada depois dela
+_SYNC_OVERLAP_SECONDS = 300
+
+
+class BloomFilter:
+    """Filtro de Bloom simples: sem falsos negativos, falsos positivos ~`error_rate`."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+# --- Armazenamentos ---
+
+class PostgresRevocationStore:
+    """Tabela token_revogado, compartilhada entre todos os workers."""
+
+    def revoke(self, jti, expires_at, usuario_id=None):
+        # Na conexão da requisição: o logout é confirmado junto com ela
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO token_revogado (jti, usuario_id, expira_em) VALUES (%s, %s, %s)
+                ON CONFLICT (jti) DO NOTHING
+            """, (jti, usuario_id, expires_at))
+
+    def is_revoked(self, jti):
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM token_revogado WHERE jti = %s AND expira_em > now()", (jti,))
+            return cursor.fetchone() is not None
+
+    def revoked_since(self, since):
+        """
+        Retorna (agora_no_banco, jtis) com os tokens ainda válidos revogados
+        depois de `since` (todos, se `since` for None).
+        """
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT now(), ARRAY(
+                    SELECT jti FROM token_revogado
+                    WHERE expira_em > now()
+                      AND (%s::timestamptz IS NULL OR revogado_em > %s::timestamptz - make_interval(secs => %s))
+                )
+            """, (since, since, _SYNC_OVERLAP_SECONDS))
+            now, jtis = cursor.fetchone()
+        return now, jtis
+
+    def prune(self):
+        """Remove os registros expirados. Roda fora de requisição, com conexão própria do pool."""
+        conn = get_pool().getconn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM token_revogado WHERE expira_em <= now()")
+                removed = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            get_pool().putconn(conn)
+        return removed
+
+
+class MemoryRevocationStore:
+    """Armazenamento no próprio processo, para desenvolvimento com um único worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {}
+
+    def revoke(self, jti, expires_at, usuario_id=None):
+        with self._lock:
+            self._items.setdefault(jti, (expires_at, datetime.now(timezone.utc)))
+
+    def is_revoked(self, jti):
+        with self._lock:
+            item = self._items.get(jti)
+        return item is not None and item[0] > datetime.now(timezone.utc)
+
+    def revoked_since(self, since):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            jtis = [jti for jti, (expires_at, revoked_at) in self._items.items()
+                    if expires_at > now and (since is None or revoked_at >= since)]
+        return now, jtis
+
+    def prune(self):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            expired = [jti for jti, (expires_at, _) in self._items.items() if expires_at <= now]
+            for jti in expired:
+                del self._items[jti]
+        return len(expired)
+
+
+STORES = {
+    'postgres': PostgresRevocationStore,
+    'memory': MemoryRevocationStore,
+}
+
+
+# --- Verificação local ---
+
+class RevocationChecker:
+    """Camada local (filtro de Bloom + LRU) sobre um armazenamento compartilhado."""
+
+    def __init__(self, store, sync_interval=SYNC_INTERVAL, prune_interval=PRUNE_INTERVAL,
+                 capacity=BLOOM_CAPACITY):
+        self.store = store
+        self.sync_interval = sync_interval
+        self.prune_interval = prune_interval
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity)
+        self._synced_at = None       # horário do banco na última sincronização
+        self._next_sync = 0.0
+        self._full_reload = True
+        self._revoked = TTLCache(ttl=86400, maxsize=10000)
+        # Respostas negativas valem só até a próxima sincronização
+        self._not_revoked = TTLCache(ttl=sync_interval, maxsize=10000)
+        self._pruner = None
+        self.stats = {'checks': 0, 'bloom_negative': 0, 'store_lookups': 0, 'syncs': 0}
+
+    def _sync_if_due(self):
+        if time.monotonic() < self._next_sync:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_sync:
+                return
+            full = self._full_reload
+            now, jtis = self.store.revoked_since(None if full else self._synced_at)
+            if full:
+                bloom = BloomFilter(max(self.capacity, len(jtis) * 2))
+                for jti in jtis:
+                    bloom.add(jti)
+                self._bloom = bloom
+                self._full_reload = False
+            else:
+                for jti in jtis:
+                    self._bloom.add(jti)
+            self._synced_at = now
+            self._next_sync = time.monotonic() + self.sync_interval
+            self.stats['syncs'] += 1
+
+    def is_revoked(self, jti):
+        self._ensure_pruner()
+        self.stats['checks'] += 1
+        if self._revoked.get(jti):
+            return True
+        self._sync_if_due()
+        if jti not in self._bloom:
+            self.stats['bloom_negative'] += 1
+            return False
+        if self._not_revoked.get(jti):
+            return False
+
+        self.stats['store_lookups'] += 1
+        revoked = self.store.is_revoked(jti)
+        (self._revoked if revoked else self._not_revoked).set(jti, True)
+        return revoked
+
+    def revoke(self, jti, expires_at, usuario_id=None):
+        self.store.revoke(jti, expires_at, usuario_id)
+
+        def remember():
+            self._bloom.add(jti)
+            self._revoked.set(jti, True)
+            self._not_revoked.pop(jti)
+        after_commit(remember)
+
+    def prune(self):
+        removed = self.store.prune()
+        # O filtro de Bloom não remove itens: reconstrói na próxima sincronização
+        with self._lock:
+            self._full_reload = True
+            self._next_sync = 0.0
+        return removed
+
+    def _ensure_pruner(self):
+        if self._pruner is not None and self._pruner.is_alive():
+            return
+        with self._lock:
+            if self._pruner is not None and self._pruner.is_alive():
+                return
+            logger = current_app.logger
+            self._pruner = threading.Thread(
+                target=self._prune_loop, args=(logger,), name='token-revocation-prune', daemon=True
+            )
+            self._pruner.start()
+
+    def _prune_loop(self, logger):
+        while True:
+            time.sleep(self.prune_interval)
+            try:
+                removed = self.prune()
+                if removed:
+                    logger.info(f"Revogação de tokens: {removed} registro(s) expirado(s) removido(s)")
+            except Exception as e:
+                logger.error(f"Erro ao remover tokens revogados expirados: {e}")
+
+
+_checker = None
+_checker_pid = None
+_checker_lock = threading.Lock()
+
+
+def get_checker():
+    """Verificador do processo atual (recriado após um fork, como o pool)."""
+    global _checker, _checker_pid
+    if _checker is None or _checker_pid != os.getpid():
+        with _checker_lock:
+            if _checker is None or _checker_pid != os.getpid():
+                if REVOCATION_BACKEND not in STORES:
+                    raise ValueError(f"TOKEN_REVOCATION_BACKEND inválido: {REVOCATION_BACKEND}")
+                _checker = RevocationChecker(STORES[REVOCATION_BACKEND]())
+                _checker_pid = os.getpid()
+    return _checker
+
+
+def revoke_token(jwt_payload):
+    """Revoga o token até a sua expiração natural."""
+    expires_at = datetime.fromtimestamp(jwt_payload['exp'], tz=timezone.utc)
+    usuario_id = int(jwt_payload['sub']) if jwt_payload.get('sub') else None
+    get_checker().revoke(jwt_payload['jti'], expires_at, usuario_id)
+
+
+def is_token_revoked(jwt_payload):
+    """
+    O token é recusado se foi revogado por logout ou se foi emitido antes da
+    versão atual dos tokens do usuário (desativação, troca de perfil, reset
+    de senha). Tokens sem o claim "ver" contam como versão 0.
+    """
+    if get_checker().is_revoked(jwt_payload['jti']):
+        return True
+    if not jwt_payload.get('sub'):
+        return False
+    token_version = jwt_payload.get('ver', 0)
+    current_version = usuario_repo.get_token_version(jwt_payload['sub'])
+    if current_version is not None and token_version > current_version:
+        # Versões só aumentam: o token é mais novo que o cache deste worker
+        current_version = usuario_repo.get_token_version(jwt_payload['sub'], refresh=True)
+    return current_version is None or token_version != current_version
@@ -0,0 +1,80 @@
+# benchmarks/email_render_benchmark.py
+"""
+Mede quantos e-mails de lembrete por segundo os modelos (app.email_templates)
+conseguem montar, comparando:
+
+  - render_many: modelos compilados uma vez, lote com contexto comum;
+  - render: uma chamada por mensagem, também com modelos em cache;
+  - sem cache: o modelo é lido e compilado de novo a cada mensagem, como
+    aconteceria sem o cache por processo.
+
+Não precisa do banco nem de servidor SMTP.
+
+Uso:
+    python benchmarks/email_render_benchmark.py
+    python benchmarks/email_render_benchmark.py --mensagens 20000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.email_templates import ASSUNTOS, EmailTemplates  # noqa: E402
+
+
+MODELO = 'lembrete_prazo'
+
+
+def reminder_contexts(count):
+    today = date.today()
+    for i in range(count):
+        dias = (15, 5, 3, 0)[i % 4]
+        yield {
+            'nome': f"Fiscal {i}",
+            'nr_contrato': f"{i:05d}/2025",
+            'descricao': f"Relatório mensal de execução do contrato {i}",
+            'dias_restantes': dias,
+            'data_prazo': today + timedelta(days=dias),
+        }
+
+
+def measure(label, fn, count):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28}{count / elapsed:>14.0f}{elapsed / count * 1e6:>14.1f}{elapsed:>12.2f}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mensagens', type=int, default=5000, help='Mensagens por medição')
+    parser.add_argument('--sem-cache', type=int, default=500,
+                        help='Mensagens na medição sem cache (é bem mais lenta)')
+    args = parser.parse_args()
+
+    contexts = list(reminder_contexts(args.mensagens))
+    templates = EmailTemplates()
+    started = time.perf_counter()
+    templates.preload()
+    print(f"Compilação de {len(ASSUNTOS)} modelos: {(time.perf_counter() - started) * 1000:.1f} ms (uma vez por processo)\n")
+    # Aquecimento: os filtros e o primeiro render de cada modelo ficam fora da medição
+    templates.render_many(MODELO, contexts[:100])
+
+    print(f"{'modo':<28}{'msg/s':>14}{'µs/msg':>14}{'total (s)':>12}")
+    measure('render_many (lote)', lambda: templates.render_many(MODELO, contexts), len(contexts))
+    measure('render (uma a uma)', lambda: [templates.render(MODELO, **c) for c in contexts], len(contexts))
+
+    uncached = contexts[:args.sem_cache]
+
+    def render_uncached():
+        for context in uncached:
+            # Instância nova a cada mensagem: lê e compila os modelos de novo
+            EmailTemplates().render(MODELO, **context)
+    measure('sem cache (recompila)', render_uncached, len(uncached))
+
+
+if __name__ == '__main__':
+    main()
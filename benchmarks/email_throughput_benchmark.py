@@ -0,0 +1,214 @@
+# benchmarks/email_throughput_benchmark.py
+"""
+Mede o caminho dos e-mails de lembrete até o servidor SMTP: mensagens por
+segundo e o tempo entre entrar na fila e ser aceita pelo servidor (p50, p95,
+p99). Usa o servidor local de smtp_sink.py, com latência e falhas
+configuráveis, então não precisa de credenciais.
+
+As mensagens são montadas como no agendador (email_templates.render_many)
+e entregues pelo email_utils.SMTPTransport em dois modos:
+
+  - individual: uma conexão por mensagem (como o send_email antigo);
+  - lote: sessões reaproveitadas e send_many em lotes de
+    EMAIL_OUTBOX_BATCH_SIZE, como o despachante da fila;
+  - paralelo: os mesmos lotes repartidos entre --workers threads que
+    dividem o pool de sessões, como o despachante com EMAIL_OUTBOX_WORKERS.
+    Com --limite, o transporte respeita um teto de msg/s (SMTP_MAX_PER_SECOND).
+
+Mensagens recusadas voltam para a fila e são tentadas de novo (sem a espera
+exponencial do despachante), até 5 tentativas.
+
+Com --banco, mede também o caminho completo pela tabela email_outbox
+(enqueue_email + despachante) no banco do .env. A fila precisa estar vazia:
+o benchmark se recusa a rodar se houver mensagens pendentes de verdade.
+
+Uso:
+    python benchmarks/email_throughput_benchmark.py
+    python benchmarks/email_throughput_benchmark.py --mensagens 2000 --latencia 0.02 --latencia-conexao 0.1 --falhas 0.05
+    python benchmarks/email_throughput_benchmark.py --workers 8 --limite 200
+    python benchmarks/email_throughput_benchmark.py --banco
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from smtp_sink import SMTPSink  # noqa: E402
+from app.email_templates import render_many  # noqa: E402
+from app.email_utils import SMTPTransport, TokenBucket  # noqa: E402
+from email_render_benchmark import reminder_contexts  # noqa: E402
+
+BENCH_DOMAIN = 'sigescon-bench.invalid'
+MAX_ATTEMPTS = 5
+
+
+def build_messages(count):
+    """(destinatario, assunto, texto, html) de `count` lembretes, como o agendador monta."""
+    contexts = list(reminder_contexts(count))
+    emails = render_many('lembrete_prazo', contexts)
+    return [(f"fiscal{i}@{BENCH_DOMAIN}", e.assunto, e.texto, e.html) for i, e in enumerate(emails)]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p * (len(values) - 1))))]
+
+
+def make_transport(host, port, **kwargs):
+    return SMTPTransport(host, port, 'sigescon@' + BENCH_DOMAIN, starttls=False, timeout=10, **kwargs)
+
+
+def deliver_individual(transport, messages):
+    failed = []
+    for message in messages:
+        try:
+            transport.send(*message)
+        except Exception:
+            failed.append(message)
+    return failed
+
+
+def deliver_batches(transport, messages, batch_size):
+    failed = []
+    for start in range(0, len(messages), batch_size):
+        batch = messages[start:start + batch_size]
+        results = transport.send_many(batch)
+        failed.extend(m for m, error in zip(batch, results) if error is not None)
+    return failed
+
+
+def deliver_parallel(executor, transport, messages, batch_size, workers):
+    """Reparte os lotes entre as threads; cada uma envia os seus em sequência."""
+    batches = [messages[start:start + batch_size] for start in range(0, len(messages), batch_size)]
+    futures = [executor.submit(deliver_batches, transport, [m for b in batches[w::workers] for m in b], batch_size)
+               for w in range(workers)]
+    return [m for future in futures for m in future.result()]
+
+
+def run_in_memory(label, sink, messages, deliver):
+    """Entrega `messages` com `deliver`, repetindo as recusadas, e mede no servidor."""
+    sink.clear()
+    enqueued_at = {}
+    started = time.perf_counter()
+    for message in messages:
+        enqueued_at[message[0]] = started
+    pending, attempts = messages, 0
+    while pending and attempts < MAX_ATTEMPTS:
+        pending = deliver(pending)
+        attempts += 1
+    elapsed = time.perf_counter() - started
+    report(label, sink, enqueued_at, elapsed, len(pending))
+
+
+def report(label, sink, enqueued_at, elapsed, lost):
+    latencies = [m.received_at - enqueued_at[m.rcpt_tos[0]] for m in sink.messages if m.rcpt_tos[0] in enqueued_at]
+    delivered = len(latencies)
+    print(f"{label:<14}{delivered:>11}{lost:>10}{delivered / elapsed:>10.0f}"
+          f"{percentile(latencies, 0.50) * 1000:>10.0f}{percentile(latencies, 0.95) * 1000:>10.0f}"
+          f"{percentile(latencies, 0.99) * 1000:>10.0f}{elapsed:>10.2f}")
+
+
+def run_outbox(sink, messages, transport):
+    """Caminho completo: enqueue_email no banco e despachante da fila."""
+    from app import create_app, db, email_outbox
+
+    app = create_app()
+    with app.app_context():
+        conn = db.get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM email_outbox WHERE status = 'pendente' AND destinatario NOT LIKE %s",
+                (f"%@{BENCH_DOMAIN}",)
+            )
+            if cursor.fetchone()[0]:
+                print("fila: há mensagens pendentes de verdade em email_outbox; medição pelo banco ignorada.")
+                return
+
+        sink.clear()
+        started = time.perf_counter()
+        for to_email, subject, body, html in messages:
+            email_outbox.enqueue_email(to_email, subject, body, html)
+        conn.commit()
+        # As mensagens só existem para o despachante depois do commit
+        enqueued_at = dict.fromkeys((m[0] for m in messages), time.perf_counter())
+
+        dispatcher = email_outbox.connect()
+        try:
+            # Sem espera exponencial no benchmark: reagenda as falhas para já
+            for _ in range(MAX_ATTEMPTS):
+                email_outbox.drain(dispatcher, transport, log=lambda *_: None)
+                with dispatcher.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE email_outbox SET proxima_tentativa_em = now()
+                        WHERE status = 'pendente' AND destinatario LIKE %s
+                    """, (f"%@{BENCH_DOMAIN}",))
+                    pending = cursor.rowcount
+                dispatcher.commit()
+                if not pending:
+                    break
+            elapsed = time.perf_counter() - started
+        finally:
+            with dispatcher.cursor() as cursor:
+                cursor.execute("DELETE FROM email_outbox WHERE destinatario LIKE %s", (f"%@{BENCH_DOMAIN}",))
+            dispatcher.commit()
+            dispatcher.close()
+        report('fila (banco)', sink, enqueued_at, elapsed, pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mensagens', type=int, default=1000)
+    parser.add_argument('--latencia', type=float, default=0.005, help='Segundos que o servidor leva para aceitar cada mensagem')
+    parser.add_argument('--latencia-conexao', type=float, default=0.05,
+                        help='Segundos até a saudação (simula TCP + TLS + login)')
+    parser.add_argument('--falhas', type=float, default=0.0, help='Fração de mensagens recusadas com 451')
+    parser.add_argument('--quedas', type=float, default=0.0, help='Fração de mensagens com a conexão derrubada')
+    parser.add_argument('--lote', type=int, default=int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50)))
+    parser.add_argument('--individual', type=int, default=200,
+                        help='Mensagens no modo individual (uma conexão por mensagem é lento)')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('EMAIL_OUTBOX_WORKERS', 4)),
+                        help='Threads no modo paralelo')
+    parser.add_argument('--limite', type=float, default=0.0, help='Teto de msg/s no modo paralelo (0 = sem limite)')
+    parser.add_argument('--banco', action='store_true', help='Mede também o caminho pela tabela email_outbox')
+    args = parser.parse_args()
+
+    messages = build_messages(args.mensagens)
+    sink = SMTPSink(latency=args.latencia, connect_latency=args.latencia_conexao,
+                    failure_rate=args.falhas, disconnect_rate=args.quedas, seed=42)
+    host, port = sink.start()
+    try:
+        print(f"Servidor de testes em {host}:{port}  |  latência {args.latencia * 1000:.0f} ms/msg, "
+              f"{args.latencia_conexao * 1000:.0f} ms/conexão, falhas {args.falhas:.0%}, quedas {args.quedas:.0%}\n")
+        print(f"{'modo':<14}{'entregues':>11}{'perdidas':>10}{'msg/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'total s':>10}")
+
+        individual = make_transport(host, port, max_per_session=1)
+        run_in_memory('individual', sink, messages[:args.individual],
+                      lambda pending: deliver_individual(individual, pending))
+
+        pooled = make_transport(host, port)
+        run_in_memory('lote', sink, messages, lambda pending: deliver_batches(pooled, pending, args.lote))
+
+        limiter = TokenBucket(args.limite) if args.limite > 0 else None
+        parallel = make_transport(host, port, pool_size=args.workers, rate_limiter=limiter)
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            run_in_memory(f"paralelo x{args.workers}", sink, messages,
+                          lambda pending: deliver_parallel(executor, parallel, pending, args.lote, args.workers))
+        print(f"\nsessões abertas: lote {pooled.stats['sessions_opened']} ({pooled.stats['reconnects']} reconexões), "
+              f"paralelo {parallel.stats['sessions_opened']} ({parallel.stats['reconnects']} reconexões)")
+        if limiter is not None:
+            print(f"teto do modo paralelo: {args.limite:.0f} msg/s")
+        parallel.close()
+
+        if args.banco:
+            run_outbox(sink, messages, make_transport(host, port))
+        pooled.close()
+    finally:
+        sink.stop()
+
+
+if __name__ == '__main__':
+    main()
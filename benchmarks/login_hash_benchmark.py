@@ -0,0 +1,92 @@
+# benchmarks/login_hash_benchmark.py
+"""
+Mede quantos logins por segundo o hash de senha permite, por núcleo e no
+total, para escolher o PASSWORD_HASH_METHOD que aguenta o pico de logins.
+
+O custo do login é dominado pela verificação do hash (o restante é uma
+consulta indexada), então o benchmark mede a verificação pelo mesmo pool de
+processos usado pela aplicação, incluindo o custo de comunicação.
+
+Uso:
+    python benchmarks/login_hash_benchmark.py
+    python benchmarks/login_hash_benchmark.py --methods scrypt:16384:8:1 pbkdf2:sha256:600000 --workers 4
+    python benchmarks/login_hash_benchmark.py --pico 1200 --janela 300   # 1200 logins em 5 minutos
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from werkzeug.security import generate_password_hash, check_password_hash  # noqa: E402
+
+DEFAULT_METHODS = ['scrypt:32768:8:1', 'scrypt:16384:8:1', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:260000']
+
+
+def measure_single(stored_hash, password, seconds):
+    """Verificações por segundo numa única thread."""
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        check_password_hash(stored_hash, password)
+        count += 1
+    elapsed = time.perf_counter() - started
+    return count / elapsed, elapsed / count * 1000
+
+
+def measure_pool(executor, stored_hash, password, seconds, in_flight):
+    """Verificações por segundo com o pool saturado (`in_flight` tarefas pendentes)."""
+    pending = set()
+    done_count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        while len(pending) < in_flight:
+            pending.add(executor.submit(check_password_hash, stored_hash, password))
+        done, pending = wait(pending, return_when='FIRST_COMPLETED')
+        done_count += len(done)
+    wait(pending)
+    done_count += len(pending)
+    return done_count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS, help='Métodos no formato do Werkzeug')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos do pool')
+    parser.add_argument('--seconds', type=float, default=3.0, help='Duração de cada medição')
+    parser.add_argument('--pico', type=int, help='Logins esperados no pico (ex.: 8h da manhã)')
+    parser.add_argument('--janela', type=float, default=60.0, help='Duração do pico em segundos')
+    args = parser.parse_args()
+
+    password = 'senha-de-teste-123'
+    print(f"CPUs: {os.cpu_count()}  |  processos no pool: {args.workers}")
+    print(f"{'método':<26}{'ms/login':>10}{'login/s/núcleo':>16}{'login/s total':>15}{'eficiência':>12}")
+
+    results = []
+    executor = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        # Aquece os processos (importação do werkzeug)
+        wait([executor.submit(check_password_hash, 'x', 'x') for _ in range(args.workers)])
+        for method in args.methods:
+            stored_hash = generate_password_hash(password, method=method)
+            per_core, ms = measure_single(stored_hash, password, args.seconds)
+            total = measure_pool(executor, stored_hash, password, args.seconds, args.workers * 2)
+            efficiency = total / (per_core * args.workers)
+            results.append((method, per_core, total))
+            print(f"{method:<26}{ms:>10.1f}{per_core:>16.1f}{total:>15.1f}{efficiency:>11.0%}")
+    finally:
+        executor.shutdown()
+
+    if args.pico:
+        needed = args.pico / args.janela
+        print(f"\nPico: {args.pico} logins em {args.janela:.0f}s = {needed:.1f} login/s")
+        for method, per_core, total in results:
+            cores = needed / per_core
+            status = 'OK' if total >= needed else 'insuficiente'
+            print(f"  {method:<26} precisa de ~{cores:.1f} núcleo(s) dedicados ao hash ({status} com {args.workers})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+# benchmarks/smtp_sink.py
+"""
+Servidor SMTP local que só recebe e guarda as mensagens (não entrega nada),
+para exercitar o envio de e-mails sem credenciais reais.
+
+Entende o suficiente do protocolo para o smtplib (EHLO/HELO, AUTH PLAIN
+aceitando qualquer senha, MAIL, RCPT, DATA, RSET, NOOP, QUIT; sem TLS) e
+permite simular um servidor ruim:
+
+  - latência ao conectar e ao aceitar cada mensagem;
+  - uma fração das mensagens recusada com erro temporário (451);
+  - uma fração das mensagens com a conexão derrubada no meio do DATA.
+
+Pode ser usado dentro de outro script (ver email_throughput_benchmark.py)
+ou sozinho, apontando a aplicação para ele:
+
+    python benchmarks/smtp_sink.py --porta 1025 --latencia 0.05 --falhas 0.1
+    # no .env: SMTP_SERVER=127.0.0.1, SMTP_PORT=1025, SMTP_STARTTLS=0, SENDER_PASSWORD vazio
+"""
+import argparse
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+
+ReceivedMessage = namedtuple('ReceivedMessage', 'mail_from rcpt_tos data received_at')
+
+
+class SMTPSink:
+    """
+    Servidor em segundo plano (thread com loop asyncio próprio). As mensagens
+    aceitas ficam em `messages`, com `received_at` em time.perf_counter().
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, connect_latency=0.0,
+                 failure_rate=0.0, disconnect_rate=0.0, seed=None, on_message=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.failure_rate = failure_rate
+        self.disconnect_rate = disconnect_rate
+        self.on_message = on_message
+        self.messages = []
+        self.stats = {'connections': 0, 'accepted': 0, 'rejected': 0, 'disconnected': 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Sobe o servidor e retorna (host, porta) depois que ele está ouvindo."""
+        self._thread = threading.Thread(target=self._run, name='smtp-sink', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self.host, self.port
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._server.close()
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def clear(self):
+        with self._lock:
+            self.messages.clear()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    # --- Protocolo ---
+
+    async def _handle(self, reader, writer):
+        self._count('connections')
+        try:
+            if self.connect_latency:
+                await asyncio.sleep(self.connect_latency)
+            writer.write(b'220 smtp-sink ESMTP\r\n')
+            mail_from, rcpt_tos = None, []
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                command, _, arg = line.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+                command = command.upper()
+
+                if command == 'EHLO':
+                    writer.write(b'250-smtp-sink\r\n250-8BITMIME\r\n250-AUTH PLAIN\r\n250 SIZE 10485760\r\n')
+                elif command == 'HELO':
+                    writer.write(b'250 smtp-sink\r\n')
+                elif command == 'AUTH':
+                    writer.write(b'235 2.7.0 Authentication successful\r\n')
+                elif command == 'MAIL':
+                    mail_from, rcpt_tos = arg.partition(':')[2].strip().strip('<>'), []
+                    writer.write(b'250 2.1.0 OK\r\n')
+                elif command == 'RCPT':
+                    rcpt_tos.append(arg.partition(':')[2].strip().strip('<>'))
+                    writer.write(b'250 2.1.5 OK\r\n')
+                elif command == 'DATA':
+                    writer.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                    await writer.drain()
+                    data = await self._read_data(reader)
+                    if data is None:
+                        return
+                    if not await self._finish_message(writer, mail_from, rcpt_tos, data):
+                        return
+                    mail_from, rcpt_tos = None, []
+                elif command == 'RSET':
+                    mail_from, rcpt_tos = None, []
+                    writer.write(b'250 2.0.0 OK\r\n')
+                elif command == 'NOOP':
+                    writer.write(b'250 2.0.0 OK\r\n')
+                elif command == 'QUIT':
+                    writer.write(b'221 2.0.0 Bye\r\n')
+                    await writer.drain()
+                    return
+                elif command == 'STARTTLS':
+                    writer.write(b'454 4.7.0 TLS not available\r\n')
+                else:
+                    writer.write(b'502 5.5.2 Command not recognized\r\n')
+                await writer.drain()
+        except ConnectionError:
+            return
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_data(reader):
+        lines = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                return None
+            if line == b'.\r\n':
+                return b''.join(lines)
+            # Desfaz o "dot-stuffing" do cliente
+            lines.append(line[1:] if line.startswith(b'..') else line)
+
+    async def _finish_message(self, writer, mail_from, rcpt_tos, data):
+        """Responde ao DATA. Retorna False se a conexão foi derrubada."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        draw = self._random.random()
+        if draw < self.disconnect_rate:
+            self._count('disconnected')
+            writer.transport.abort()
+            return False
+        if draw < self.disconnect_rate + self.failure_rate:
+            self._count('rejected')
+            writer.write(b'451 4.3.0 Falha temporaria simulada\r\n')
+            return True
+
+        message = ReceivedMessage(mail_from, list(rcpt_tos), data, time.perf_counter())
+        with self._lock:
+            self.messages.append(message)
+            self.stats['accepted'] += 1
+        if self.on_message is not None:
+            self.on_message(message)
+        writer.write(b'250 2.0.0 OK: queued\r\n')
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=1025)
+    parser.add_argument('--latencia', type=float, default=0.0, help='Segundos para aceitar cada mensagem')
+    parser.add_argument('--latencia-conexao', type=float, default=0.0, help='Segundos até a saudação inicial')
+    parser.add_argument('--falhas', type=float, default=0.0, help='Fração de mensagens recusadas com 451')
+    parser.add_argument('--quedas', type=float, default=0.0, help='Fração de mensagens com a conexão derrubada')
+    parser.add_argument('--salvar', help='Diretório onde gravar cada mensagem aceita como .eml')
+    args = parser.parse_args()
+
+    if args.salvar:
+        os.makedirs(args.salvar, exist_ok=True)
+
+    def on_message(message):
+        print(f"{time.strftime('%H:%M:%S')}  {message.mail_from} -> {', '.join(message.rcpt_tos)}  ({len(message.data)} bytes)")
+        if args.salvar:
+            name = f"{time.time():.6f}.eml"
+            with open(os.path.join(args.salvar, name), 'wb') as f:
+                f.write(message.data)
+
+    sink = SMTPSink(args.host, args.porta, latency=args.latencia, connect_latency=args.latencia_conexao,
+                    failure_rate=args.falhas, disconnect_rate=args.quedas, on_message=on_message)
+    host, port = sink.start()
+    print(f"Servidor SMTP de testes ouvindo em {host}:{port}. Pressione Ctrl+C para sair.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.stop()
+        print(f"\n{sink.stats}")
+
+
+if __name__ == '__main__':
+    main()
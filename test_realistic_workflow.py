@@ -377,6 +377,11 @@ class TestFullWorkflow(unittest.TestCase):
         self.assertEqual(r_gestor_vazio.status_code, 200)
         self.assertEqual(len(r_gestor_vazio.json()['data']), 0)
         print(" -> Filtro por ID de fiscal diferente retorna lista vazia, como esperado.")
+
+        # Valores não finitos nos filtros numéricos são recusados com 400.
+        for params in ({'valor_global_min': 'NaN', 'valor_global_max': '1'}, {'valor_global_min': 'sNaN'}):
+            r_nan = requests.get(f'{BASE_URL}/contratos', params=params, headers=self.admin_headers)
+            self.assertEqual(r_nan.status_code, 400)
         
     def test_07_password_management(self):
         """ Testa as rotas de alteração e reset de senha. """
@@ -413,6 +418,12 @@ class TestFullWorkflow(unittest.TestCase):
         self.assertEqual(r_login_reset.status_code, 200)
         print(" -> Login com a senha resetada funciona.")
 
+        # O reset pelo admin invalida os tokens emitidos antes dele
+        r_token_antigo = requests.get(f'{BASE_URL}/auth/profile', headers=fiscal_headers)
+        self.assertEqual(r_token_antigo.status_code, 401)
+        print(" -> Token antigo do fiscal foi invalidado pelo reset de senha.")
+        self.auth_tokens['fiscal'] = r_login_reset.json()['token']
+
     def test_08_advanced_error_handling(self):
         """ Testa cenários de erro mais complexos e regras de negócio. """
         print("\nPASSO 8: Testando tratamento de erros avançado.")
@@ -456,6 +467,13 @@ class TestFullWorkflow(unittest.TestCase):
         self.assertGreaterEqual(r_permissao.status_code, 400)
         self.assertLess(r_permissao.status_code, 500)
         print(" -> Fiscal foi bloqueado de interagir com um contrato que não é seu.")
+
+        # O contrato de outro fiscal não aparece nem na listagem nem no detalhe
+        r_detalhe_outro = requests.get(f'{BASE_URL}/contratos/{outro_contrato_id}', headers=fiscal_headers)
+        self.assertEqual(r_detalhe_outro.status_code, 404)
+        r_lista_fiscal = requests.get(f'{BASE_URL}/contratos?per_page=100', headers=fiscal_headers)
+        self.assertNotIn(outro_contrato_id, [c['id'] for c in r_lista_fiscal.json()['data']])
+        print(" -> Fiscal só enxerga os contratos em que é fiscal ou substituto.")
         
     def test_09_data_integrity_and_constraints(self):
         """ Testa a integridade dos dados, como a prevenção de exclusão de dados em uso e o soft delete. """
@@ -499,6 +517,150 @@ class TestFullWorkflow(unittest.TestCase):
         self.assertFalse(any(user['id'] == user_id_todelete for user in r_users_after))
         print(f" -> Usuário {user_id_todelete} não existe mais na lista após o soft delete, como esperado.")
 
+    def test_10_contract_detail_with_includes(self):
+        """ Testa o detalhe expandido do contrato (?include=...) numa única chamada. """
+        print("\nPASSO 10: Testando o detalhe expandido do contrato.")
+        self.assertIn('contrato', self.created_ids, "O contrato do teste de workflow não foi criado.")
+        contrato_id = self.created_ids['contrato']
+
+        r_detalhe = requests.get(f'{BASE_URL}/contratos/{contrato_id}?include=relatorios,pendencias,arquivos', headers=self.admin_headers)
+        self.assertEqual(r_detalhe.status_code, 200)
+        detalhe = r_detalhe.json()
+        self.assertEqual(detalhe['id'], contrato_id)
+        self.assertGreater(len(detalhe['relatorios_fiscais']), 0)
+        self.assertGreater(len(detalhe['pendencias']), 0)
+        self.assertGreater(len(detalhe['arquivos']), 0)
+        print(" -> Contrato retornado com relatórios, pendências e arquivos.")
+
+        r_invalido = requests.get(f'{BASE_URL}/contratos/{contrato_id}?include=inexistente', headers=self.admin_headers)
+        self.assertEqual(r_invalido.status_code, 400)
+        print(" -> Valor inválido em include é rejeitado.")
+
+    def test_11_cursor_pagination(self):
+        """ Testa a paginação por cursor (?after=) da listagem de contratos. """
+        print("\nPASSO 11: Testando a paginação por cursor.")
+        r_primeira = requests.get(f'{BASE_URL}/contratos?per_page=1&sortBy=data_inicio&order=asc', headers=self.admin_headers)
+        self.assertEqual(r_primeira.status_code, 200)
+        pagina = r_primeira.json()
+        self.assertEqual(len(pagina['data']), 1)
+
+        next_cursor = pagina['pagination']['next_cursor']
+        if next_cursor:
+            r_segunda = requests.get(f'{BASE_URL}/contratos?per_page=1&sortBy=data_inicio&order=asc&after={next_cursor}', headers=self.admin_headers)
+            self.assertEqual(r_segunda.status_code, 200)
+            self.assertNotEqual(r_segunda.json()['data'][0]['id'], pagina['data'][0]['id'])
+            print(" -> Segunda página obtida a partir do cursor.")
+
+            # Um cursor gerado para outra ordenação é rejeitado
+            r_outra_ordem = requests.get(f'{BASE_URL}/contratos?per_page=1&sortBy=data_fim&after={next_cursor}', headers=self.admin_headers)
+            self.assertEqual(r_outra_ordem.status_code, 400)
+
+        r_invalido = requests.get(f'{BASE_URL}/contratos?after=cursor-invalido', headers=self.admin_headers)
+        self.assertEqual(r_invalido.status_code, 400)
+        print(" -> Cursor inválido é rejeitado.")
+
+    def test_12_reminder_policy_per_modalidade(self):
+        """ Testa a política de lembretes de prazo por modalidade. """
+        print("\nPASSO 12: Testando a política de lembretes por modalidade.")
+        # Modalidade própria do teste: mudar a política reagenda as pendências de todos os seus contratos
+        r_modalidade = requests.post(f'{BASE_URL}/modalidades', json={"nome": f"WF Lembretes {generate_random_string()}"}, headers=self.admin_headers)
+        self.assertEqual(r_modalidade.status_code, 201)
+        modalidade_id = r_modalidade.json()['id']
+        self.__class__.created_ids['modalidade_lembretes'] = modalidade_id
+        url = f"{BASE_URL}/modalidades/{modalidade_id}/lembretes"
+
+        r_invalido = requests.put(url, json={"dias_antes": [-1]}, headers=self.admin_headers)
+        self.assertEqual(r_invalido.status_code, 400)
+        fiscal_headers = {'Authorization': f'Bearer {self.auth_tokens["fiscal"]}'}
+        r_fiscal = requests.put(url, json={"dias_antes": [7]}, headers=fiscal_headers)
+        self.assertEqual(r_fiscal.status_code, 403)
+
+        r_put = requests.put(url, json={"dias_antes": [0, 10, 10, 2]}, headers=self.admin_headers)
+        self.assertEqual(r_put.status_code, 200)
+        r_get = requests.get(url, headers=self.admin_headers)
+        self.assertEqual(r_get.json(), {'modalidade_id': modalidade_id, 'dias_antes': [10, 2, 0], 'padrao': False})
+        print(" -> Política própria da modalidade definida.")
+
+        r_reset = requests.put(url, json={"dias_antes": None}, headers=self.admin_headers)
+        self.assertEqual(r_reset.status_code, 200)
+        self.assertTrue(requests.get(url, headers=self.admin_headers).json()['padrao'])
+        print(" -> Modalidade voltou à política padrão.")
+
+    def test_13_reminder_digest_preference(self):
+        """ Testa a preferência de lembretes (resumo ou individual) do usuário. """
+        print("\nPASSO 13: Testando a preferência de lembretes do fiscal.")
+        url = f"{BASE_URL}/usuarios/{self.created_ids['fiscal']}/lembretes"
+        fiscal_headers = {'Authorization': f'Bearer {self.auth_tokens["fiscal"]}'}
+        gestor_headers = {'Authorization': f'Bearer {self.auth_tokens["gestor"]}'}
+
+        self.assertEqual(requests.get(url, headers=fiscal_headers).json()['preferencia'], 'resumo')
+        r_gestor = requests.put(url, json={"preferencia": "individual"}, headers=gestor_headers)
+        self.assertEqual(r_gestor.status_code, 403)
+        r_invalido = requests.put(url, json={"preferencia": "semanal"}, headers=fiscal_headers)
+        self.assertEqual(r_invalido.status_code, 400)
+
+        r_put = requests.put(url, json={"preferencia": "individual"}, headers=fiscal_headers)
+        self.assertEqual(r_put.status_code, 200)
+        self.assertEqual(requests.get(url, headers=self.admin_headers).json()['preferencia'], 'individual')
+        print(" -> Fiscal passou a receber um e-mail por pendência.")
+
+    def test_14_job_runs_history(self):
+        """ Testa o histórico das tarefas agendadas (somente administradores). """
+        print("\nPASSO 14: Testando o histórico de execuções do agendador.")
+        url = f"{BASE_URL}/admin/job-runs"
+        fiscal_headers = {'Authorization': f'Bearer {self.auth_tokens["fiscal"]}'}
+
+        self.assertEqual(requests.get(url, headers=fiscal_headers).status_code, 403)
+        self.assertEqual(requests.get(url, params={'status': 'talvez'}, headers=self.admin_headers).status_code, 400)
+
+        r_list = requests.get(url, params={'job': 'check_deadlines', 'per_page': 5}, headers=self.admin_headers)
+        self.assertEqual(r_list.status_code, 200)
+        self.assertIn('pagination', r_list.json())
+        self.assertTrue(all(run['job'] == 'check_deadlines' for run in r_list.json()['data']))
+        print(f" -> {len(r_list.json()['data'])} execução(ões) listada(s).")
+
+        r_pagina = requests.get(url, params={'per_page': 1}, headers=self.admin_headers)
+        self.assertEqual(r_pagina.status_code, 200)
+        pagina = r_pagina.json()
+        next_cursor = pagina['pagination']['next_cursor']
+        if next_cursor:
+            r_segunda = requests.get(url, params={'per_page': 1, 'after': next_cursor}, headers=self.admin_headers)
+            self.assertEqual(r_segunda.status_code, 200, f"Cursor recusado: {r_segunda.text}")
+            segunda = r_segunda.json()['data']
+            self.assertEqual(len(segunda), 1)
+            self.assertLess(segunda[0]['id'], pagina['data'][0]['id'])
+            print(" -> Segunda página obtida pelo cursor.")
+        self.assertEqual(requests.get(url, params={'after': 'cursor-invalido'}, headers=self.admin_headers).status_code, 400)
+
+    def test_15_contract_text_search(self):
+        """ Testa a busca textual de contratos e o escape dos trechos destacados. """
+        print("\nPASSO 15: Testando a busca textual de contratos.")
+        palavra = f"elevador{generate_random_string().lower()}"
+        form_data = {
+            "nr_contrato": f"WF-BUSCA-{generate_random_string()}",
+            "objeto": f"Manutenção de <b>{palavra}</b> & escadas rolantes",
+            "data_inicio": "2025-01-01", "data_fim": "2025-12-31",
+            "contratado_id": self.created_ids['contratado'], "modalidade_id": self.seed_ids['modalidade'],
+            "status_id": self.seed_ids['status_vigente'], "gestor_id": self.created_ids['gestor'],
+            "fiscal_id": self.created_ids['fiscal']
+        }
+        r_contrato = requests.post(f'{BASE_URL}/contratos', data=form_data, headers=self.admin_headers)
+        self.assertEqual(r_contrato.status_code, 201, f"Falha ao criar contrato: {r_contrato.text}")
+        self.assertNotIn('busca', r_contrato.json())
+        self.__class__.created_ids['contrato_busca'] = r_contrato.json()['id']
+
+        self.assertEqual(requests.get(f'{BASE_URL}/contratos/busca', params={'q': ' '}, headers=self.admin_headers).status_code, 400)
+
+        r_busca = requests.get(f'{BASE_URL}/contratos/busca', params={'q': palavra}, headers=self.admin_headers)
+        self.assertEqual(r_busca.status_code, 200)
+        encontrados = [c for c in r_busca.json()['data'] if c['id'] == self.created_ids['contrato_busca']]
+        self.assertEqual(len(encontrados), 1)
+        destaque = encontrados[0]['objeto_destaque']
+        self.assertIn('<mark>', destaque)
+        self.assertIn('&lt;b&gt;', destaque)
+        self.assertNotIn('<b>', destaque)
+        print(" -> Contrato encontrado; o texto do contrato vem escapado no destaque.")
+
     @classmethod
     def tearDownClass(cls):
         """ Limpa todos os recursos criados durante os testes. """
@@ -506,6 +668,8 @@ class TestFullWorkflow(unittest.TestCase):
         
         # A ordem de deleção é importante para evitar erros de chave estrangeira
         # Limpa contratos primeiro
+        if 'contrato_busca' in cls.created_ids:
+            requests.delete(f"{BASE_URL}/contratos/{cls.created_ids['contrato_busca']}", headers=cls.admin_headers)
         if 'contrato_integridade' in cls.created_ids:
              requests.delete(f"{BASE_URL}/contratos/{cls.created_ids['contrato_integridade']}", headers=cls.admin_headers)
         if 'outro_contrato' in cls.created_ids:
@@ -524,6 +688,9 @@ class TestFullWorkflow(unittest.TestCase):
             r = requests.delete(f"{BASE_URL}/usuarios/{cls.created_ids['fiscal']}", headers=cls.admin_headers)
             print(f"Usuário Fiscal ID {cls.created_ids['fiscal']} deletado (Status: {r.status_code}).")
         
+        if 'modalidade_lembretes' in cls.created_ids:
+            requests.delete(f"{BASE_URL}/modalidades/{cls.created_ids['modalidade_lembretes']}", headers=cls.admin_headers)
+
         # Finalmente, limpa contratados
         if 'contratado' in cls.created_ids:
             r = requests.delete(f"{BASE_URL}/contratados/{cls.created_ids['contratado']}", headers=cls.admin_headers)